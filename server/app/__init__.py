@@ -1,25 +1,49 @@
 from flask import Flask, jsonify
 from .config import Config
-from .extensions import db, jwt, migrate
-from .routes import auth_routes, chatbot_routes, voice_routes, admin_routes
+from .extensions import (
+    db, db_tuning, jwt, migrate, model_registry, prediction_cache, write_behind, voice_jobs,
+    password_hasher, login_limiter, profile_cache, shadow_scorer, metrics, advisor, chat_context,
+)
+from .routes import auth_routes, chatbot_routes, voice_routes, admin_routes, health_routes
+from .services.voice_services import InMemoryUploadRequest
+from .services.analytics import apply_rollups
+from .models import PredictionHistory
 from flask_cors import CORS
 
 def create_app(config_class=Config):
     app = Flask(__name__)
+    app.request_class = InMemoryUploadRequest
     app.config.from_object(config_class)
 
     origins = [app.config.get('FRONTEND_URL'), 'http://localhost:3000']
     CORS(app, origins=origins, supports_credentials=True)
 
-    db.init_app(app)
+    # request timers start before any other extension's hooks run
+    metrics.init_app(app)
+    # engine options, SQLite pragmas, replica bind and pool counters around db.init_app
+    db_tuning.init_app(app, db)
     jwt.init_app(app)
     migrate.init_app(app, db)
+    write_behind.init_app(app)
+    # analytics rollups are maintained by the same bulk insert that writes the history
+    write_behind.on_insert(PredictionHistory, apply_rollups)
+    voice_jobs.init_app(app)
+    password_hasher.init_app(app)
+    login_limiter.init_app(app)
+    profile_cache.init_app(app)
+    prediction_cache.init_app(app, model_registry)
+    shadow_scorer.init_app(app)
+    advisor.init_app(app)
+    chat_context.init_app(app)
+    # load model artifacts before the first request; the registry watches them afterwards
+    model_registry.init_app(app)
 
     # register route groups
     auth_routes.register_routes(app)
     chatbot_routes.register_routes(app)
     voice_routes.register_routes(app)
     admin_routes.register_routes(app)
+    health_routes.register_routes(app)
 
     @app.errorhandler(500)
     def internal_error(e):
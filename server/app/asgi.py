@@ -0,0 +1,239 @@
+import asyncio, json, time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+from asgiref.wsgi import WsgiToAsgi
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from app import create_app
+from app.config import Config
+from app.extensions import chat_context, db, db_tuning, metrics, model_registry, profile_cache, write_behind
+from app.models import PredictionHistory, User, PROFILE_FIELDS
+from app.routes.chatbot_routes import advise, history_row, parse_applicants, prediction_json
+from app.services.database import engine_options
+from app.services.micro_batcher import MicroBatcher
+from app.services.services_ml import score_cached, submit_shadow
+
+# ASGI serving mode:
+#
+#   cd server && uvicorn app.asgi:app --workers 4
+#
+# POST /api/predict, /api/predict/batch and /api/chat are served natively on the
+# event loop: profile rows come from an async engine (aiosqlite / asyncpg) and
+# concurrent single-row predicts are coalesced by a MicroBatcher into one
+# encoder + booster call on the inference executor. Every other route is the
+# regular Flask app behind WsgiToAsgi, so both modes answer the same API.
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+class HTTPError(Exception):
+    def __init__(self, status, payload):
+        super().__init__(status)
+        self.status = status
+        self.payload = payload
+
+def async_database_url(url):
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError("no async driver configured for %s" % url.get_backend_name())
+    return url.set(drivername=driver)
+
+def _json_body(body):
+    if not body:
+        return {}
+    try:
+        return json.loads(body)
+    except ValueError:
+        raise HTTPError(400, {"error": "invalid_json"})
+
+class AsyncApp:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        cfg = flask_app.config
+        self.executor = ThreadPoolExecutor(max_workers=cfg.get("ASYNC_INFERENCE_WORKERS", 2),
+                                           thread_name_prefix="inference")
+        self.batcher = MicroBatcher(self._score_batch, max_batch=cfg.get("MICRO_BATCH_MAX_ROWS", 256),
+                                    max_wait_ms=cfg.get("MICRO_BATCH_WAIT_MS", 2.0), executor=self.executor)
+        flask_app.extensions["micro_batcher"] = self.batcher
+        self.max_body = cfg.get("MAX_CONTENT_LENGTH")
+        self.origins = {o for o in (cfg.get("FRONTEND_URL"), "http://localhost:3000") if o}
+        self._engine = None
+        self.routes = {
+            "/api/predict": self.predict,
+            "/api/predict/batch": self.predict_batch,
+            "/api/chat": self.chat,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        handler = self.routes.get(scope.get("path")) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if handler is None:
+            return await self.wsgi(scope, receive, send)
+
+        start = time.perf_counter()
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        try:
+            body = await self._read_body(receive)
+            status, payload = await handler(headers, query, body)
+        except HTTPError as e:
+            status, payload = e.status, e.payload
+        except Exception:
+            self.flask_app.logger.exception("Async %s failed", scope.get("path"))
+            status, payload = 500, {"error": "internal_server_error"}
+        await self._send_json(send, status, payload, headers.get("origin"))
+        # same series as the Flask routes' request timer
+        metrics.observe("http_request_duration_seconds", time.perf_counter() - start,
+                        method="POST", route=scope["path"], status=status)
+
+    @property
+    def engine(self):
+        # created lazily inside the worker's event loop
+        if self._engine is None:
+            url = self.flask_app.config.get("ASYNC_DATABASE_URL")
+            if not url:
+                with self.flask_app.app_context():
+                    url = async_database_url(db.engine.url)
+            # same pool sizing and connection pragmas as the Flask engine
+            cfg = self.flask_app.config
+            self._engine = create_async_engine(url, **engine_options(cfg, url))
+            db_tuning.instrument("async", self._engine.sync_engine, cfg)
+        return self._engine
+
+    async def _read_body(self, receive):
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise HTTPError(400, {"error": "client_disconnected"})
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if self.max_body and size > self.max_body:
+                raise HTTPError(413, {"error": "payload_too_large"})
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    async def _send_json(self, send, status, payload, origin):
+        body = json.dumps(payload, sort_keys=True).encode("utf-8")
+        headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("ascii"))]
+        if origin in self.origins:
+            headers += [(b"access-control-allow-origin", origin.encode("latin-1")),
+                        (b"access-control-allow-credentials", b"true"), (b"vary", b"Origin")]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._engine is not None:
+                    await self._engine.dispose()
+                await asyncio.get_running_loop().run_in_executor(None, write_behind.flush)
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _identity(self, headers):
+        # optional JWT through flask-jwt-extended itself, exactly as @jwt_required(optional=True):
+        # access tokens only, blocklist/user-loader callbacks, and the JWTManager error responses
+        auth = headers.get("authorization")
+        if not auth:
+            return None
+        with self.flask_app.test_request_context(headers={"Authorization": auth}):
+            try:
+                verify_jwt_in_request(optional=True)
+                return get_jwt_identity()
+            except Exception as e:
+                response = self.flask_app.make_response(self.flask_app.handle_user_exception(e))
+                raise HTTPError(response.status_code, response.get_json())
+
+    def _explain_options(self, query):
+        explain = query.get("explain", ["1"])[-1].lower() not in ("0", "false", "no")
+        return explain, self.flask_app.config.get("SHAP_TOP_K", 3)
+
+    async def _profile(self, user_id):
+        start = time.perf_counter()
+        snapshot = profile_cache.peek(user_id)
+        if snapshot is None:
+            columns = [getattr(User, f) for f in PROFILE_FIELDS]
+            async with self.engine.connect() as conn:
+                row = (await conn.execute(select(*columns).where(User.id == int(user_id)))).first()
+            if row is None:
+                return {}
+            snapshot = profile_cache.put(int(user_id), row)
+        metrics.observe("stage_duration_seconds", time.perf_counter() - start, stage="profile_lookup")
+        return snapshot.as_dict()
+
+    def _score_batch(self, key, items):
+        # executor thread: one scoring call for the batch, then history + shadow for every row
+        _, explain, top_k = key
+        art = items[0][0]
+        records = [rec for _, _, rec in items]
+        results = score_cached(art, records, explain, top_k)
+        write_behind.submit_many(PredictionHistory, [history_row(uid, rec, res)
+                                                     for (_, uid, rec), res in zip(items, results)])
+
+        def record_shadow(shadow_results):
+            write_behind.submit_many(PredictionHistory, [history_row(uid, rec, res)
+                                                         for (_, uid, rec), res in zip(items, shadow_results)])
+        submit_shadow(art, records, explain, top_k, record_shadow)
+        return results
+
+    def _batch_key(self, user_id, query):
+        art = model_registry.route(user_id)
+        explain, top_k = self._explain_options(query)
+        return art, (art.version if art is not None else "stub", explain, top_k)
+
+    async def predict(self, headers, query, body):
+        user_id = self._identity(headers)
+        data = _json_body(body)
+        if not isinstance(data, dict):
+            raise HTTPError(400, {"error": "invalid_request", "detail": "expected a JSON object"})
+        merged = {}
+        if user_id:
+            merged.update(await self._profile(user_id))
+        merged.update(data["data"] if isinstance(data.get("data"), dict) else data)
+
+        art, key = self._batch_key(user_id, query)
+        result = await self.batcher.submit(key, (art, user_id, merged))
+        chat_context.record_prediction(user_id, result)
+        return 200, prediction_json(result)
+
+    async def predict_batch(self, headers, query, body):
+        user_id = self._identity(headers)
+        records, error = parse_applicants(_json_body(body), self.flask_app.config.get("PREDICT_BATCH_MAX_ROWS"))
+        if error:
+            raise HTTPError(error[1], error[0])
+        # already a batch: straight to the executor, no coalescing wait
+        art, key = self._batch_key(user_id, query)
+        results = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self._score_batch, key, [(art, user_id, rec) for rec in records])
+        return 200, {"count": len(results), "results": [prediction_json(res) for res in results]}
+
+    async def chat(self, headers, query, body):
+        user_id = self._identity(headers)
+        data = _json_body(body)
+        message = data.get("message") if isinstance(data, dict) else None
+        if not message:
+            raise HTTPError(400, {"error": "no_message"})
+        if not isinstance(message, str):
+            raise HTTPError(400, {"error": "invalid_message"})
+        bot_reply, meta = await asyncio.get_running_loop().run_in_executor(None, self._advise, user_id, message)
+        return 200, {"reply": bot_reply, "source": meta["source"]}
+
+    def _advise(self, user_id, message):
+        # a cold context reads the latest prediction through the Flask-SQLAlchemy session
+        with self.flask_app.app_context():
+            return advise(user_id, message)
+
+def create_asgi_app(config_class=Config):
+    return AsyncApp(create_app(config_class))
+
+app = create_asgi_app()
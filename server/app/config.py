@@ -1,4 +1,4 @@
-import os
+import os, json
 from dotenv import load_dotenv
 from datetime import timedelta
 
@@ -8,12 +8,97 @@ class Config:
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'change-me')
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///loan_ai.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # engine tuning (app.services.database); SQLALCHEMY_ENGINE_OPTIONS (JSON) overrides single keys
+    SQLALCHEMY_ENGINE_OPTIONS = json.loads(os.getenv('SQLALCHEMY_ENGINE_OPTIONS') or '{}')
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+    # PostgreSQL statement_timeout / MySQL max_execution_time per connection; 0 disables
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 0))
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    # read replica for history, admin listings and analytics; empty reads from the primary
+    DATABASE_READ_URL = os.getenv('DATABASE_READ_URL', '')
+    # ASGI mode (app.asgi): async driver URL, derived from DATABASE_URL when unset
+    ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL', '')
+    ASYNC_INFERENCE_WORKERS = int(os.getenv('ASYNC_INFERENCE_WORKERS', 2))
+    # single-row predicts arriving within MICRO_BATCH_WAIT_MS are scored in one call
+    MICRO_BATCH_WAIT_MS = float(os.getenv('MICRO_BATCH_WAIT_MS', 2.0))
+    MICRO_BATCH_MAX_ROWS = int(os.getenv('MICRO_BATCH_MAX_ROWS', 256))
     FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', './uploads/voice')
     MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 10*1024*1024))
+    # google (online), sphinx (offline, needs pocketsphinx) or stub
+    TRANSCRIBE_ENGINE = os.getenv('TRANSCRIBE_ENGINE', 'google')
+    VOICE_WORKERS = int(os.getenv('VOICE_WORKERS', 0)) or None
+    VOICE_MAX_PENDING = int(os.getenv('VOICE_MAX_PENDING', 64))
+    # uploads are decoded in memory; set to keep a content-addressed copy under UPLOAD_FOLDER
+    VOICE_STORE_UPLOADS = os.getenv('VOICE_STORE_UPLOADS', 'false').lower() in ('1', 'true', 'yes')
+    VOICE_RETENTION_DAYS = int(os.getenv('VOICE_RETENTION_DAYS', 30))
+    PREDICT_BATCH_MAX_ROWS = int(os.getenv('PREDICT_BATCH_MAX_ROWS', 100000))
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=7)
+    # werkzeug method string; stored hashes are upgraded on the next successful login
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    AUTH_HASH_WORKERS = int(os.getenv('AUTH_HASH_WORKERS', 2))
+    AUTH_HASH_MAX_PENDING = int(os.getenv('AUTH_HASH_MAX_PENDING', 8))
+    AUTH_HASH_QUEUE_TIMEOUT = float(os.getenv('AUTH_HASH_QUEUE_TIMEOUT', 1.0))
+    AUTH_MAX_ATTEMPTS = int(os.getenv('AUTH_MAX_ATTEMPTS', 5))
+    AUTH_ATTEMPT_WINDOW = int(os.getenv('AUTH_ATTEMPT_WINDOW', 300))
+    # mmap-able bundle (python -m app.services.artifact_bundle); used instead of the paths below when present
+    ARTIFACT_BUNDLE_PATH = os.getenv('ARTIFACT_BUNDLE_PATH', './models/bundle')
+    # seconds between checks for a new bundle version (0 disables hot reload); the file layout is read at startup
+    MODEL_RELOAD_INTERVAL = float(os.getenv('MODEL_RELOAD_INTERVAL', 10))
+    # candidate bundle: 'shadow' scores it in the background, 'split' serves it to MODEL_CANDIDATE_PERCENT of traffic
+    MODEL_CANDIDATE_PATH = os.getenv('MODEL_CANDIDATE_PATH', '')
+    MODEL_CANDIDATE_MODE = os.getenv('MODEL_CANDIDATE_MODE', 'shadow')
+    MODEL_CANDIDATE_PERCENT = float(os.getenv('MODEL_CANDIDATE_PERCENT', 0))
+    SHADOW_MAX_PENDING = int(os.getenv('SHADOW_MAX_PENDING', 256))
     MODEL_PATH = os.getenv('MODEL_PATH', './models/lightgbm.txt')
     TRANSFORMER_PATH = os.getenv('TRANSFORMER_PATH', './models/transformer.joblib')
+    # optional precompiled NumPy encoder; when present transformer.joblib is not unpickled
+    ENCODER_PATH = os.getenv('ENCODER_PATH', './models/encoder.npz')
+    # piecewise-linear calibration table; ISO_PATH is only read when it is missing
+    CALIBRATION_PATH = os.getenv('CALIBRATION_PATH', './models/calibration.npz')
     ISO_PATH = os.getenv('ISO_PATH', './models/isotonic.joblib')
-    SHAP_EXPLAINER_PATH = os.getenv('SHAP_EXPLAINER_PATH', './models/shap_explainer.joblib')
+    # declarative fallback scorer used while no model is loaded; app/data/rules.json when missing
+    RULES_PATH = os.getenv('RULES_PATH', './models/rules.json')
+    # per-stage latency histograms, served on /metrics
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    METRICS_BUCKETS = os.getenv('METRICS_BUCKETS', '')
+    # requests sent with "X-Profile: <token>" are stack-sampled into PROFILE_DIR; empty disables
+    PROFILE_REQUEST_TOKEN = os.getenv('PROFILE_REQUEST_TOKEN', '')
+    PROFILE_DIR = os.getenv('PROFILE_DIR', './profiles')
+    PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 1.0))
+    SHAP_TOP_K = int(os.getenv('SHAP_TOP_K', 3))
+    # /api/predict/counterfactual: search latency budget and cap on scored candidates per request
+    COUNTERFACTUAL_BUDGET_MS = float(os.getenv('COUNTERFACTUAL_BUDGET_MS', 200))
+    COUNTERFACTUAL_MAX_CANDIDATES = int(os.getenv('COUNTERFACTUAL_MAX_CANDIDATES', 20000))
+    # /api/predict/sweep: largest grid (product of axis lengths) scored per request
+    SWEEP_MAX_POINTS = int(os.getenv('SWEEP_MAX_POINTS', 10000))
+    PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', 10000))
+    PREDICTION_CACHE_TTL = int(os.getenv('PREDICTION_CACHE_TTL', 300))
+    PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', 50000))
+    PROFILE_CACHE_TTL = int(os.getenv('PROFILE_CACHE_TTL', 300))
+    # chat advisor: FAQ corpus (defaults to app/data/advisor_faq.json) and the per-user context cache
+    ADVISOR_FAQ_PATH = os.getenv('ADVISOR_FAQ_PATH', '')
+    ADVISOR_MIN_SCORE = float(os.getenv('ADVISOR_MIN_SCORE', 1.0))
+    CHAT_CONTEXT_SIZE = int(os.getenv('CHAT_CONTEXT_SIZE', 10000))
+    CHAT_CONTEXT_TTL = int(os.getenv('CHAT_CONTEXT_TTL', 1800))
+    # fixed lifetime of the cached latest prediction; another worker may have served a newer one
+    CHAT_PREDICTION_TTL = int(os.getenv('CHAT_PREDICTION_TTL', 30))
+    CHAT_CONTEXT_TURNS = int(os.getenv('CHAT_CONTEXT_TURNS', 10))
+    HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', 50))
+    HISTORY_PAGE_MAX = int(os.getenv('HISTORY_PAGE_MAX', 200))
+    ADMIN_PAGE_SIZE = int(os.getenv('ADMIN_PAGE_SIZE', 200))
+    ADMIN_PAGE_MAX = int(os.getenv('ADMIN_PAGE_MAX', 1000))
+    ADMIN_EXPORT_BATCH = int(os.getenv('ADMIN_EXPORT_BATCH', 1000))
+    # PredictionHistory/ChatLog rows are queued and bulk inserted by a background thread
+    WRITE_BEHIND_ENABLED = os.getenv('WRITE_BEHIND_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    WRITE_BEHIND_MAX_ROWS = int(os.getenv('WRITE_BEHIND_MAX_ROWS', 10000))
+    WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 500))
+    WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', 0.5))
+    WRITE_BEHIND_PUT_TIMEOUT = float(os.getenv('WRITE_BEHIND_PUT_TIMEOUT', 0.05))
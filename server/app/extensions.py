@@ -1,7 +1,29 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
+from app.services.model_registry import ModelRegistry
+from app.services.prediction_cache import PredictionCache
+from app.services.write_behind import WriteBehind
+from app.services.voice_services import VoiceJobs
+from app.services.auth_services import PasswordHasher, LoginRateLimiter
+from app.services.profile_cache import ProfileCache
+from app.services.shadow import ShadowScorer
+from app.services.metrics import Metrics
+from app.services.advisor import Advisor, ConversationCache
+from app.services.database import DatabaseTuning
 
 db = SQLAlchemy()
+db_tuning = DatabaseTuning()
 jwt = JWTManager()
 migrate = Migrate()
+model_registry = ModelRegistry()
+prediction_cache = PredictionCache()
+write_behind = WriteBehind()
+voice_jobs = VoiceJobs()
+password_hasher = PasswordHasher()
+login_limiter = LoginRateLimiter()
+profile_cache = ProfileCache()
+shadow_scorer = ShadowScorer()
+metrics = Metrics()
+advisor = Advisor()
+chat_context = ConversationCache()
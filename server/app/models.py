@@ -1,9 +1,25 @@
+import secrets
 from .extensions import db
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import JSON
 
+# user-editable profile columns; these are what the model sees for a logged-in user
+PROFILE_FIELDS = (
+    "gender","marital_status","dependents","education","age","job_title",
+    "annual_salary","collateral_value","savings_balance","employment_type",
+    "contract_years","previous_loan","previous_loan_status","previous_loan_amount",
+    "total_emi_per_month","loan_purpose","loan_amount","repayment_term_months",
+    "additional_income_name","additional_income_amount","num_credit_cards",
+    "avg_credit_util_percent","late_payment_history","loan_insurance","credit_score",
+)
+
 class User(db.Model):
     __tablename__ = 'users'
+    # admin listing filters by role/created_at and pages on id
+    __table_args__ = (
+        db.Index('ix_users_role_id', 'role', 'id'),
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(128), unique=True, nullable=False)
     email = db.Column(db.String(256), unique=True, nullable=True)
@@ -40,6 +56,11 @@ class User(db.Model):
 
 class PredictionHistory(db.Model):
     __tablename__ = 'prediction_history'
+    # per-user history pages and per-model scans are ranges on created_at
+    __table_args__ = (
+        db.Index('ix_prediction_history_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_prediction_history_model_version_created_at', 'model_version', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     input_snapshot = db.Column(JSON)
@@ -50,6 +71,34 @@ class PredictionHistory(db.Model):
     model_version = db.Column(db.String(64))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+# Daily rollups of prediction_history, incremented in the same transaction as the
+# history insert (app.services.analytics), so analytics never scan the history.
+class PredictionDailyRollup(db.Model):
+    __tablename__ = 'prediction_daily_rollup'
+    day = db.Column(db.Date, primary_key=True)
+    model_version = db.Column(db.String(64), primary_key=True)
+    predictions = db.Column(db.BigInteger, nullable=False, default=0)
+    approved = db.Column(db.BigInteger, nullable=False, default=0)
+    probability_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+class PredictionProbabilityRollup(db.Model):
+    __tablename__ = 'prediction_probability_rollup'
+    day = db.Column(db.Date, primary_key=True)
+    model_version = db.Column(db.String(64), primary_key=True)
+    # probability bucket index, width 1 / analytics.PROBABILITY_BUCKETS
+    bucket = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    predictions = db.Column(db.BigInteger, nullable=False, default=0)
+
+class PredictionDriverRollup(db.Model):
+    __tablename__ = 'prediction_driver_rollup'
+    day = db.Column(db.Date, primary_key=True)
+    model_version = db.Column(db.String(64), primary_key=True)
+    feature = db.Column(db.String(128), primary_key=True)
+    # how often the feature was among a prediction's top SHAP values, and their sums
+    appearances = db.Column(db.BigInteger, nullable=False, default=0)
+    contribution_sum = db.Column(db.Float, nullable=False, default=0.0)
+    abs_contribution_sum = db.Column(db.Float, nullable=False, default=0.0)
+
 class ChatLog(db.Model):
     __tablename__ = 'chat_logs'
     id = db.Column(db.Integer, primary_key=True)
@@ -65,4 +114,10 @@ class VoiceInput(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     filename = db.Column(db.String(512))
     transcript = db.Column(db.Text)
+    # unguessable public job id; the integer key is never exposed
+    job_token = db.Column(db.String(32), unique=True, index=True, default=lambda: secrets.token_urlsafe(16))
+    # transcription job state: pending -> done | failed
+    status = db.Column(db.String(16), default='pending')
+    error = db.Column(db.String(512))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
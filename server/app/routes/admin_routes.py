@@ -1,15 +1,140 @@
-from flask import jsonify
+import json
+from datetime import date, datetime
+from flask import Response, jsonify, request, stream_with_context, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.extensions import db, db_tuning
 from app.models import User
+from app.services.analytics import (
+    history_page, parse_cursor, portfolio_summary, probability_distribution, top_drivers,
+)
+
+LIST_COLUMNS = (User.id, User.username, User.email, User.role, User.created_at)
+
+def _parse_datetime(value):
+    return datetime.fromisoformat(value) if value else None
+
+def _parse_date(value):
+    return date.fromisoformat(value) if value else None
+
+def _is_admin():
+    # primary-key lookup on the primary on every call: a demotion applies to all workers at once
+    try:
+        user_id = int(get_jwt_identity())
+    except (TypeError, ValueError):
+        return False
+    return db.session.query(User.role).filter(User.id == user_id).scalar() == "admin"
+
+def _analytics_filters():
+    # -> kwargs for the analytics queries; raises ValueError on bad dates
+    return {
+        "start": _parse_date(request.args.get("start")),
+        "end": _parse_date(request.args.get("end")),
+        "model_version": request.args.get("model_version"),
+    }
+
+def _user_json(row):
+    return {"id": row.id, "username": row.username, "email": row.email, "role": row.role,
+            "created_at": row.created_at.isoformat() if row.created_at else None}
+
+def _users_page(after, limit, role=None, created_after=None, created_before=None):
+    # keyset pagination on the primary key: every page is an index range scan,
+    # no OFFSET and no full ORM rows
+    q = db_tuning.read_session().query(*LIST_COLUMNS).filter(User.id > after)
+    if role:
+        q = q.filter(User.role == role)
+    if created_after:
+        q = q.filter(User.created_at >= created_after)
+    if created_before:
+        q = q.filter(User.created_at < created_before)
+    return q.order_by(User.id).limit(limit).all()
 
 def register_routes(app):
     @app.route("/api/admin/users", methods=["GET"])
     @jwt_required()
     def admin_list_users():
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        if not user or user.role != "admin":
+        if not _is_admin():
+            return jsonify({"error": "forbidden"}), 403
+
+        try:
+            after = int(request.args.get("cursor") or 0)
+            limit = int(request.args.get("limit") or current_app.config.get("ADMIN_PAGE_SIZE", 200))
+            filters = {
+                "role": request.args.get("role"),
+                "created_after": _parse_datetime(request.args.get("created_after")),
+                "created_before": _parse_datetime(request.args.get("created_before")),
+            }
+        except ValueError:
+            return jsonify({"error": "invalid_query"}), 400
+        limit = max(1, min(limit, current_app.config.get("ADMIN_PAGE_MAX", 1000)))
+
+        # full dumps stream as NDJSON, one keyset page at a time
+        if request.args.get("format") == "ndjson":
+            batch = current_app.config.get("ADMIN_EXPORT_BATCH", 1000)
+
+            def generate(cursor):
+                while True:
+                    rows = _users_page(cursor, batch, **filters)
+                    for row in rows:
+                        yield json.dumps(_user_json(row)) + "\n"
+                    if len(rows) < batch:
+                        return
+                    cursor = rows[-1].id
+
+            return Response(stream_with_context(generate(after)), mimetype="application/x-ndjson")
+
+        rows = _users_page(after, limit, **filters)
+        next_cursor = rows[-1].id if len(rows) == limit else None
+        return jsonify({"users": [_user_json(r) for r in rows], "next_cursor": next_cursor}), 200
+
+    @app.route("/api/admin/users/<int:user_id>/history", methods=["GET"])
+    @jwt_required()
+    def admin_user_history(user_id):
+        if not _is_admin():
+            return jsonify({"error": "forbidden"}), 403
+        try:
+            before = parse_cursor(request.args.get("cursor"))
+            limit = int(request.args.get("limit") or current_app.config.get("HISTORY_PAGE_SIZE", 50))
+        except ValueError:
+            return jsonify({"error": "invalid_query"}), 400
+        limit = max(1, min(limit, current_app.config.get("ADMIN_PAGE_MAX", 1000)))
+        items, next_cursor = history_page(db_tuning.read_session(), user_id, before, limit, include_inputs=True,
+                                          include_shadow=True)
+        return jsonify({"history": items, "next_cursor": next_cursor}), 200
+
+    # portfolio analytics, read from the daily rollups (never from prediction_history)
+    @app.route("/api/admin/analytics/summary", methods=["GET"])
+    @jwt_required()
+    def admin_analytics_summary():
+        if not _is_admin():
+            return jsonify({"error": "forbidden"}), 403
+        group_by = request.args.get("group_by", "day")
+        if group_by not in ("day", "model_version"):
+            return jsonify({"error": "invalid_group_by"}), 400
+        try:
+            filters = _analytics_filters()
+        except ValueError:
+            return jsonify({"error": "invalid_query"}), 400
+        return jsonify({"rows": portfolio_summary(db_tuning.read_session(), group_by=group_by, **filters)}), 200
+
+    @app.route("/api/admin/analytics/probability", methods=["GET"])
+    @jwt_required()
+    def admin_analytics_probability():
+        if not _is_admin():
+            return jsonify({"error": "forbidden"}), 403
+        try:
+            filters = _analytics_filters()
+        except ValueError:
+            return jsonify({"error": "invalid_query"}), 400
+        return jsonify(probability_distribution(db_tuning.read_session(), **filters)), 200
+
+    @app.route("/api/admin/analytics/drivers", methods=["GET"])
+    @jwt_required()
+    def admin_analytics_drivers():
+        if not _is_admin():
             return jsonify({"error": "forbidden"}), 403
-        users = User.query.limit(200).all()
-        out = [{"id": u.id, "username": u.username, "email": u.email, "role": u.role} for u in users]
-        return jsonify({"users": out}), 200
+        try:
+            filters = _analytics_filters()
+            limit = max(1, min(int(request.args.get("limit") or 10), 100))
+        except ValueError:
+            return jsonify({"error": "invalid_query"}), 400
+        return jsonify({"drivers": top_drivers(db_tuning.read_session(), limit=limit, **filters)}), 200
@@ -4,9 +4,9 @@ from flask_jwt_extended import (
     get_jwt_identity
 )
 from datetime import timedelta
-from app.extensions import db
-from app.models import User
-from app.utils import hash_password, verify_password
+from app.extensions import db, password_hasher, login_limiter, profile_cache
+from app.models import User, PROFILE_FIELDS
+from app.services.auth_services import PasswordHasherBusy
 
 def register_routes(app):
     @app.route("/api/signup", methods=["POST"])
@@ -20,24 +20,20 @@ def register_routes(app):
         if User.query.filter_by(username=username).first():
             return jsonify({"error": "username_exists"}), 400
 
-        pw_hash = hash_password(password)
+        try:
+            pw_hash = password_hasher.hash(password)
+        except PasswordHasherBusy:
+            return jsonify({"error": "busy"}), 503
         user = User(username=username, email=email, password_hash=pw_hash)
 
         # Populate profile fields if provided
-        profile_fields = [
-            "gender","marital_status","dependents","education","age","job_title",
-            "annual_salary","collateral_value","savings_balance","employment_type",
-            "contract_years","previous_loan","previous_loan_status","previous_loan_amount",
-            "total_emi_per_month","loan_purpose","loan_amount","repayment_term_months",
-            "additional_income_name","additional_income_amount","num_credit_cards",
-            "avg_credit_util_percent","late_payment_history","loan_insurance","credit_score"
-        ]
-        for k in profile_fields:
+        for k in PROFILE_FIELDS:
             if k in data:
                 setattr(user, k, data.get(k))
 
         db.session.add(user)
         db.session.commit()
+        profile_cache.store(user)
 
         access = create_access_token(identity=user.id, expires_delta=timedelta(days=1))
         refresh = create_refresh_token(identity=user.id)
@@ -51,9 +47,31 @@ def register_routes(app):
         if not username or not password:
             return jsonify({"error": "username_password_required"}), 400
 
+        # refuse brute-force traffic before spending CPU on a hash
+        retry_after = login_limiter.retry_after(username)
+        if retry_after:
+            resp = jsonify({"error": "too_many_attempts", "retry_after": retry_after})
+            resp.headers["Retry-After"] = str(retry_after)
+            return resp, 429
+
         user = User.query.filter_by(username=username).first()
-        if not user or not verify_password(user.password_hash, password):
+        try:
+            ok = user is not None and password_hasher.verify(user.password_hash, password)
+        except PasswordHasherBusy:
+            return jsonify({"error": "busy"}), 503
+        if not ok:
+            login_limiter.fail(username)
             return jsonify({"error": "invalid_credentials"}), 401
+        login_limiter.reset(username)
+
+        # upgrade hashes made with older PASSWORD_HASH_METHOD settings
+        if password_hasher.needs_rehash(user.password_hash):
+            try:
+                user.password_hash = password_hasher.hash(password)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.warning("Failed to rehash password: %s", e)
 
         access = create_access_token(identity=user.id)
         refresh = create_refresh_token(identity=user.id)
@@ -1,8 +1,104 @@
-from flask import request, jsonify, current_app
+import json, math, time
+from datetime import date, datetime
+from flask import Response, request, jsonify, current_app, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.services.services_ml import predict
-from app.extensions import db
-from app.models import PredictionHistory, User, ChatLog
+from app.services.services_ml import predict, predict_batch
+from app.extensions import db, db_tuning, write_behind, profile_cache, metrics, advisor, chat_context, model_registry
+from app.models import PredictionHistory, User, ChatLog, PROFILE_FIELDS
+from app.services.analytics import history_page, parse_cursor
+from app.services.advisor import chunks, latest_prediction
+from app.services.counterfactual import find_approval
+from app.services.sweep import parse_axes, sweep
+
+def _explain_options():
+    # ?explain=0 skips SHAP for latency-critical callers
+    explain = request.args.get("explain", "1").lower() not in ("0", "false", "no")
+    return {"explain": explain, "top_k": current_app.config.get("SHAP_TOP_K", 3)}
+
+def json_safe(snapshot):
+    # profile rows carry datetimes, which the JSON column can't serialize
+    return {k: v.isoformat() if isinstance(v, (datetime, date)) else v for k, v in snapshot.items()}
+
+def history_row(user_id, snapshot, result):
+    return {
+        "user_id": user_id,
+        "input_snapshot": json_safe(snapshot),
+        "output": result.get("decision"),
+        "probability": result.get("probability"),
+        "reason": result.get("reason"),
+        "shap": result.get("shap_top3"),
+        "model_version": result.get("model_version"),
+    }
+
+def prediction_json(result):
+    return {
+        "loan_decision": result.get("decision"),
+        "approval_probability": result.get("probability"),
+        "rejection_reason": result.get("reason"),
+        "shap_top3": result.get("shap_top3"),
+        "model_version": result.get("model_version")
+    }
+
+def parse_applicants(data, max_rows):
+    # accept either a bare list of applicants or {"applicants": [...]}; -> (records, (error, status))
+    records = data.get("applicants") if isinstance(data, dict) else data
+    if not isinstance(records, list) or not records:
+        return None, ({"error": "no_applicants"}, 400)
+    if not all(isinstance(r, dict) for r in records):
+        return None, ({"error": "invalid_applicants"}, 400)
+    if max_rows and len(records) > max_rows:
+        return None, ({"error": "too_many_applicants", "max_rows": max_rows}, 413)
+    return records, None
+
+def merged_profile(user_id, data, options=()):
+    # saved profile (logged in) overlaid with the request's fields; option keys aren't profile fields
+    merged = {}
+    if user_id:
+        start = time.perf_counter()
+        snapshot = profile_cache.get(user_id)
+        metrics.observe("stage_duration_seconds", time.perf_counter() - start, stage="profile_lookup")
+        if snapshot:
+            merged.update(snapshot.as_dict())
+
+    # incoming data may be nested under 'data' or at top level
+    if "data" in data and isinstance(data["data"], dict):
+        merged.update(data["data"])
+    else:
+        merged.update({k: v for k, v in data.items() if k not in options})
+    return merged
+
+def record_shadow(user_id, records):
+    # shadow candidate outputs go to PredictionHistory next to the served ones
+    def callback(results):
+        write_behind.submit_many(PredictionHistory, [history_row(user_id, rec, res) for rec, res in zip(records, results)])
+    return callback
+
+def advise(user_id, message):
+    # advisor reply from the cached context; both sides of the exchange go out in one write-behind flush
+    prediction, turns = chat_context.get(user_id, latest_prediction)
+    reply, meta = advisor.respond(message, prediction, turns)
+    chat_context.record_turn(user_id, message, reply)
+    write_behind.submit_many(ChatLog, [
+        {"user_id": user_id, "message": message, "from_user": True, "user_metadata": {}},
+        {"user_id": user_id, "message": reply, "from_user": False, "user_metadata": meta},
+    ])
+    return reply, meta
+
+def counterfactual_json(base_p, solutions, stats, target):
+    return {
+        "loan_decision": "Approved" if base_p >= target else "Rejected",
+        "approval_probability": base_p,
+        "target": target,
+        "solutions": [{"changes": s["changes"], "approval_probability": s["probability"], "cost": s["cost"],
+                       "fields_changed": len(s["changes"])} for s in solutions],
+        "evaluated": stats["evaluated"],
+        "elapsed_ms": stats.get("elapsed_ms"),
+        "complete": stats["complete"],
+    }
+
+def sse(data, event=None):
+    head = "event: %s\n" % event if event else ""
+    return "%sdata: %s\n\n" % (head, json.dumps(data))
 
 def register_routes(app):
     @app.route("/api/predict", methods=["POST"])
@@ -14,48 +110,97 @@ def register_routes(app):
             user_id = None
 
         data = request.get_json() or {}
-        merged = {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "invalid_request", "detail": "expected a JSON object"}), 400
+        merged = merged_profile(user_id, data)
 
-        # If user logged in, merge profile fields
-        if user_id:
-            user = User.query.get(user_id)
-            if user:
-                profile = {c.name: getattr(user, c.name) for c in user.__table__.columns if c.name not in ("password_hash",)}
-                merged.update(profile)
+        # call ML service
+        result = predict(merged, route_key=user_id, on_shadow=record_shadow(user_id, [merged]), **_explain_options())
+        chat_context.record_prediction(user_id, result)
 
-        # incoming data may be nested under 'data' or at top level
-        if "data" in data and isinstance(data["data"], dict):
-            merged.update(data["data"])
-        else:
-            merged.update(data)
+        # store prediction history (written behind the response)
+        write_behind.submit(PredictionHistory, history_row(user_id, merged, result))
 
-        # call ML service
-        result = predict(merged)
+        return jsonify(prediction_json(result)), 200
 
-        # store prediction history
-        try:
-            ph = PredictionHistory(
-                user_id=user_id,
-                input_snapshot=merged,
-                output=result.get("decision") or result.get("loan_decision"),
-                probability=result.get("probability"),
-                reason=result.get("reason"),
-                shap=result.get("shap_top3"),
-                model_version=result.get("model_version")
-            )
-            db.session.add(ph)
-            db.session.commit()
-        except Exception as e:
-            current_app.logger.warning("Failed to save prediction history: %s", e)
+    @app.route("/api/predict/batch", methods=["POST"])
+    @jwt_required(optional=True)
+    def api_predict_batch():
+        user_id = get_jwt_identity()
+        data = request.get_json() or {}
+
+        records, error = parse_applicants(data, current_app.config.get("PREDICT_BATCH_MAX_ROWS"))
+        if error:
+            return jsonify(error[0]), error[1]
+
+        results = predict_batch(records, route_key=user_id, on_shadow=record_shadow(user_id, records), **_explain_options())
+
+        # store prediction history; the write-behind worker bulk inserts it
+        write_behind.submit_many(PredictionHistory, [history_row(user_id, rec, res) for rec, res in zip(records, results)])
 
         return jsonify({
-            "loan_decision": result.get("decision"),
-            "approval_probability": result.get("probability"),
-            "rejection_reason": result.get("reason"),
-            "shap_top3": result.get("shap_top3"),
-            "model_version": result.get("model_version")
+            "count": len(results),
+            "results": [prediction_json(res) for res in results]
         }), 200
 
+    @app.route("/api/predict/counterfactual", methods=["POST"])
+    @jwt_required(optional=True)
+    def api_predict_counterfactual():
+        # smallest changes to actionable inputs that would turn the decision into an approval
+        user_id = get_jwt_identity()
+        data = request.get_json() or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "invalid_request", "detail": "expected a JSON object"}), 400
+        merged = merged_profile(user_id, data, ("actionable", "limit", "target", "budget_ms", "max_fields"))
+
+        cfg = current_app.config
+        try:
+            target = float(data.get("target", 0.5))
+            if not 0 < target <= 1:
+                raise ValueError("target must be in (0, 1]")
+            limit = min(max(int(data.get("limit", 5)), 1), 20)
+            max_fields = min(max(int(data.get("max_fields", 3)), 1), 3)
+            budget_ms = float(data.get("budget_ms", cfg["COUNTERFACTUAL_BUDGET_MS"]))
+            if not math.isfinite(budget_ms) or budget_ms < 0:
+                raise ValueError("budget_ms must be a finite, non-negative number")
+            budget_ms = min(budget_ms, cfg["COUNTERFACTUAL_BUDGET_MS"])
+            base_p, solutions, stats = find_approval(
+                model_registry.route(user_id), merged, data.get("actionable"), target=target, limit=limit,
+                max_fields=max_fields, budget_ms=budget_ms, max_candidates=cfg["COUNTERFACTUAL_MAX_CANDIDATES"])
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": "invalid_request", "detail": str(e)}), 400
+
+        return jsonify(counterfactual_json(base_p, solutions, stats, target)), 200
+
+    @app.route("/api/predict/sweep", methods=["POST"])
+    @jwt_required(optional=True)
+    def api_predict_sweep():
+        # approval probability over a grid of one or two inputs, for charts
+        user_id = get_jwt_identity()
+        data = request.get_json() or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "invalid_request", "detail": "expected a JSON object"}), 400
+        merged = merged_profile(user_id, data, ("sweep",))
+        try:
+            axes = parse_axes(data.get("sweep"), current_app.config.get("SWEEP_MAX_POINTS"))
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": "invalid_sweep", "detail": str(e)}), 400
+        return jsonify(sweep(model_registry.route(user_id), merged, axes)), 200
+
+    @app.route("/api/history", methods=["GET"])
+    @jwt_required()
+    def prediction_history():
+        user_id = get_jwt_identity()
+        try:
+            before = parse_cursor(request.args.get("cursor"))
+            limit = int(request.args.get("limit") or current_app.config.get("HISTORY_PAGE_SIZE", 50))
+        except ValueError:
+            return jsonify({"error": "invalid_query"}), 400
+        limit = max(1, min(limit, current_app.config.get("HISTORY_PAGE_MAX", 200)))
+        include_inputs = request.args.get("inputs", "0").lower() in ("1", "true", "yes")
+        items, next_cursor = history_page(db_tuning.read_session(), int(user_id), before, limit, include_inputs)
+        return jsonify({"history": items, "next_cursor": next_cursor}), 200
+
     @app.route("/api/update_profile", methods=["POST"])
     @jwt_required()
     def update_profile():
@@ -65,37 +210,17 @@ def register_routes(app):
         if not user:
             return jsonify({"error": "user_not_found"}), 404
 
-        allowed = [
-            "gender","marital_status","dependents","education","age","job_title",
-            "annual_salary","collateral_value","savings_balance","employment_type",
-            "contract_years","previous_loan","previous_loan_status","previous_loan_amount",
-            "total_emi_per_month","loan_purpose","loan_amount","repayment_term_months",
-            "additional_income_name","additional_income_amount","num_credit_cards",
-            "avg_credit_util_percent","late_payment_history","loan_insurance","credit_score"
-        ]
-        for k in allowed:
+        for k in PROFILE_FIELDS:
             if k in data:
                 setattr(user, k, data.get(k))
         db.session.commit()
 
         # Auto-trigger prediction after profile update
-        merged = {c.name: getattr(user, c.name) for c in user.__table__.columns if c.name not in ("password_hash",)}
-        result = predict(merged)
+        merged = profile_cache.store(user).as_dict()
+        result = predict(merged, route_key=user_id, on_shadow=record_shadow(user_id, [merged]), **_explain_options())
+        chat_context.record_prediction(user_id, result)
 
-        try:
-            ph = PredictionHistory(
-                user_id=user_id,
-                input_snapshot=merged,
-                output=result.get("decision"),
-                probability=result.get("probability"),
-                reason=result.get("reason"),
-                shap=result.get("shap_top3"),
-                model_version=result.get("model_version")
-            )
-            db.session.add(ph)
-            db.session.commit()
-        except Exception as e:
-            current_app.logger.warning("Failed to save prediction after profile update: %s", e)
+        write_behind.submit(PredictionHistory, history_row(user_id, merged, result))
 
         return jsonify({"status": "ok", "prediction": result}), 200
 
@@ -104,26 +229,34 @@ def register_routes(app):
     def chat():
         data = request.get_json() or {}
         user_id = get_jwt_identity()
-        message = data.get("message")
+        message = data.get("message") if isinstance(data, dict) else None
         if not message:
             return jsonify({"error": "no_message"}), 400
+        if not isinstance(message, str):
+            return jsonify({"error": "invalid_message"}), 400
 
-        # store chat log (user)
-        try:
-            cl = ChatLog(user_id=user_id, message=message, from_user=True, metadata={})
-            db.session.add(cl)
-            db.session.commit()
-        except Exception as e:
-            current_app.logger.warning("Failed to save chat log: %s", e)
+        bot_reply, meta = advise(user_id, message)
+        return jsonify({"reply": bot_reply, "source": meta["source"]}), 200
 
-        # placeholder bot reply (replace with your chatbot later)
-        bot_reply = f"Echo: {message}"
+    @app.route("/api/chat/stream", methods=["GET", "POST"])
+    @jwt_required(optional=True)
+    def chat_stream():
+        # Server-Sent Events: a meta event, the reply in small "data" chunks, then "done"
+        data = request.args if request.method == "GET" else (request.get_json(silent=True) or {})
+        user_id = get_jwt_identity()
+        message = data.get("message") if isinstance(data, dict) else None
+        if not message:
+            return jsonify({"error": "no_message"}), 400
+        if not isinstance(message, str):
+            return jsonify({"error": "invalid_message"}), 400
 
-        try:
-            cl2 = ChatLog(user_id=user_id, message=bot_reply, from_user=False, metadata={})
-            db.session.add(cl2)
-            db.session.commit()
-        except Exception:
-            pass
+        bot_reply, meta = advise(user_id, message)
+
+        def generate():
+            yield sse(meta, "meta")
+            for piece in chunks(bot_reply):
+                yield sse({"delta": piece})
+            yield sse({"reply": bot_reply}, "done")
 
-        return jsonify({"reply": bot_reply}), 200
+        return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
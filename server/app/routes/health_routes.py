@@ -0,0 +1,40 @@
+from flask import jsonify, current_app, Response
+from app.extensions import (
+    model_registry, prediction_cache, write_behind, profile_cache, shadow_scorer, metrics, chat_context, db_tuning,
+)
+from app.services.metrics import stats_gauges
+
+def register_routes(app):
+    @app.route("/api/ready", methods=["GET"])
+    def ready():
+        status = model_registry.status()
+        status["prediction_cache"] = prediction_cache.stats()
+        status["write_behind"] = write_behind.stats()
+        status["profile_cache"] = profile_cache.stats()
+        status["shadow"] = shadow_scorer.stats()
+        status["chat_context"] = chat_context.stats()
+        status["db_pool"] = db_tuning.stats()
+        # only present when served through app.asgi
+        batcher = current_app.extensions.get("micro_batcher")
+        if batcher is not None:
+            status["micro_batch"] = batcher.stats()
+        return jsonify(status), 200 if status["ready"] else 503
+
+    @app.route("/metrics", methods=["GET"])
+    def prometheus_metrics():
+        if not metrics.enabled:
+            return jsonify({"error": "metrics_disabled"}), 404
+        gauges = {}
+        for prefix, stats in (("prediction_cache", prediction_cache.stats()), ("write_behind", write_behind.stats()),
+                              ("profile_cache", profile_cache.stats()), ("shadow", shadow_scorer.stats()),
+                              ("chat_context", chat_context.stats())):
+            gauges.update(stats_gauges(prefix, stats))
+        for name, stats in db_tuning.stats().items():
+            if isinstance(stats, dict):
+                gauges.update(stats_gauges("db_pool_%s" % name, stats))
+            else:
+                gauges["db_pool_%s" % name] = stats
+        batcher = current_app.extensions.get("micro_batcher")
+        if batcher is not None:
+            gauges.update(stats_gauges("micro_batch", batcher.stats()))
+        return Response(metrics.render(gauges), mimetype="text/plain; version=0.0.4")
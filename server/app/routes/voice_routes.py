@@ -1,9 +1,20 @@
-from flask import request, jsonify, current_app
-from app.services.voice_services import save_audio, transcribe_audio
-from app.extensions import db
+from concurrent.futures import BrokenExecutor
+from flask import request, jsonify, current_app, url_for
+from app.services.voice_services import read_upload
+from app.extensions import db, voice_jobs
 from app.models import VoiceInput
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
+def _job_json(vi):
+    return {
+        "job_id": vi.job_token,
+        "status": vi.status,
+        "transcript": vi.transcript,
+        "error": vi.error,
+        "created_at": vi.created_at.isoformat() if vi.created_at else None,
+        "completed_at": vi.completed_at.isoformat() if vi.completed_at else None,
+    }
+
 def register_routes(app):
     @app.route("/api/upload_audio", methods=["POST"])
     @jwt_required(optional=True)
@@ -13,12 +24,45 @@ def register_routes(app):
         if not f:
             return jsonify({"error": "no_file"}), 400
         filename = f.filename
-        path = save_audio(f, filename)
-        transcript = transcribe_audio(path)
+        # decoded in memory by the worker; the disk copy is optional
+        data = read_upload(f)
+        if not data:
+            return jsonify({"error": "empty_file"}), 400
+        voice_jobs.store(data, filename)
+
+        # the row is the job record; transcription fills it in later
         try:
-            vi = VoiceInput(user_id=user_id, filename=filename, transcript=transcript)
+            vi = VoiceInput(user_id=user_id, filename=filename, status="pending")
             db.session.add(vi)
             db.session.commit()
         except Exception as e:
+            db.session.rollback()
             current_app.logger.warning("Failed to save voice input: %s", e)
-        return jsonify({"transcript": transcript}), 200
+            return jsonify({"error": "job_not_created"}), 500
+
+        try:
+            submitted = voice_jobs.submit(vi.id, data)
+            error = None if submitted else "busy"
+        except (BrokenExecutor, RuntimeError, OSError) as e:
+            # a dead worker pool (VoiceJobs rebuilds it on the next submit); never leave the row pending
+            current_app.logger.warning("Failed to submit voice job %s: %s", vi.id, e)
+            error = "worker_unavailable"
+        if error is not None:
+            vi.status = "failed"
+            vi.error = error
+            db.session.commit()
+            return jsonify({"error": error}), 503
+
+        body = _job_json(vi)
+        body["status_url"] = url_for("voice_job_status", job_id=vi.job_token)
+        return jsonify(body), 202
+
+    @app.route("/api/upload_audio/<job_id>", methods=["GET"])
+    @jwt_required(optional=True)
+    def voice_job_status(job_id):
+        user_id = get_jwt_identity()
+        vi = db.session.query(VoiceInput).filter(VoiceInput.job_token == job_id).first()
+        # anonymous jobs are reachable only through their random token; owned ones only by their user
+        if not vi or (vi.user_id is not None and str(vi.user_id) != str(user_id)):
+            return jsonify({"error": "not_found"}), 404
+        return jsonify(_job_json(vi)), 200
@@ -0,0 +1,134 @@
+import argparse, csv, os, sys, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from app.config import Config
+from app.services.model_registry import load_artifacts
+from app.services.services_ml import score_records
+
+# Offline bulk scoring: stream a CSV/Parquet book of loans through the serving
+# encoder + booster in chunks on a process pool, writing results as they finish.
+#
+#   cd server && python -m app.score loans.csv scored.csv --chunksize 50000
+
+ARTIFACT_KEYS = ("ARTIFACT_BUNDLE_PATH", "MODEL_PATH", "TRANSFORMER_PATH", "ENCODER_PATH", "CALIBRATION_PATH", "ISO_PATH")
+
+_ARTIFACTS = None
+
+def _init_worker(cfg):
+    # each worker loads the artifacts once, not per chunk
+    global _ARTIFACTS
+    _ARTIFACTS = load_artifacts(cfg)
+
+def _score_chunk(df, explain, top_k, id_columns):
+    records = df.to_dict("records")
+    # a scoring failure fails the run instead of writing predict_error rejections
+    results = score_records(_ARTIFACTS, records, explain, top_k, strict=True)
+    rows = []
+    for rec, res in zip(records, results):
+        row = [rec.get(c) for c in id_columns]
+        row += [res["decision"], res["probability"], res["reason"],
+                ";".join("%s:%+.6g" % (name, value) for name, value in res["shap_top3"])]
+        rows.append(row)
+    return rows
+
+def _read_chunks(path, chunksize):
+    if path.lower().endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("reading Parquet needs pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        import pandas as pd
+        for df in pd.read_csv(path, chunksize=chunksize):
+            yield df
+
+class _Writer:
+    def __init__(self, path, header):
+        self.parquet = path.lower().endswith((".parquet", ".pq"))
+        self.header = header
+        if self.parquet:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise SystemExit("writing Parquet needs pyarrow (pip install pyarrow)")
+            self._pa = pa
+            self._pq = pq
+            self._writer = None
+            self._path = path
+        else:
+            self._fh = open(path, "w", newline="")
+            self._csv = csv.writer(self._fh)
+            self._csv.writerow(header)
+
+    def write(self, rows):
+        if not self.parquet:
+            self._csv.writerows(rows)
+            return
+        columns = list(zip(*rows)) if rows else [[] for _ in self.header]
+        table = self._pa.table({name: list(col) for name, col in zip(self.header, columns)})
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self.parquet:
+            if self._writer is not None:
+                self._writer.close()
+        else:
+            self._fh.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.score", description="Score a CSV/Parquet file with the serving model")
+    parser.add_argument("input")
+    parser.add_argument("output", help=".csv or .parquet")
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--id-column", action="append", default=[], help="input column(s) copied to the output")
+    parser.add_argument("--top-k", type=int, default=Config.SHAP_TOP_K)
+    parser.add_argument("--no-explain", action="store_true", help="skip per-row explanations")
+    for key in ARTIFACT_KEYS:
+        parser.add_argument("--" + key.lower().replace("_path", "").replace("_", "-"), dest=key, default=getattr(Config, key))
+    args = parser.parse_args(argv)
+
+    cfg = {key: getattr(args, key) for key in ARTIFACT_KEYS}
+    if not load_artifacts(cfg).ready:
+        raise SystemExit("no model artifacts found (check --model / --transformer / --encoder)")
+
+    header = list(args.id_column) + ["loan_decision", "approval_probability", "rejection_reason", "top_contributions"]
+    writer = _Writer(args.output, header)
+    explain = not args.no_explain
+    # at most two chunks per worker in flight keeps memory flat for any input size
+    max_in_flight = max(args.workers, 1) * 2
+    total, start = 0, time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(cfg,)) as pool:
+            in_flight = deque()
+            for df in _read_chunks(args.input, args.chunksize):
+                in_flight.append(pool.submit(_score_chunk, df, explain, args.top_k, args.id_column))
+                while len(in_flight) >= max_in_flight:
+                    total += _drain_one(in_flight, writer, total, start)
+            while in_flight:
+                total += _drain_one(in_flight, writer, total, start)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print("scored %d rows in %.1fs (%.0f rows/sec) -> %s" % (total, elapsed, total / max(elapsed, 1e-9), args.output))
+
+def _drain_one(in_flight, writer, done, start):
+    # results are written in input order
+    try:
+        rows = in_flight.popleft().result()
+    except Exception as e:
+        raise SystemExit("scoring failed after %d rows: %s: %s" % (done, type(e).__name__, e))
+    writer.write(rows)
+    done += len(rows)
+    elapsed = time.perf_counter() - start
+    print("%d rows, %.0f rows/sec" % (done, done / max(elapsed, 1e-9)), file=sys.stderr)
+    return len(rows)
+
+if __name__ == "__main__":
+    main()
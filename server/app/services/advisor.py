@@ -0,0 +1,257 @@
+import json, math, os, re, time
+from collections import Counter, deque
+from sqlalchemy import or_
+from app.services.analytics import SHADOW_PREFIX
+from app.services.ttl_cache import TTLCache
+
+# Offline loan advisor behind /api/chat. Questions about the user's own result
+# ("why was I rejected?", "how can I improve?") are answered from their latest
+# prediction and its SHAP drivers with templates; everything else is matched
+# against an FAQ corpus with BM25. The index is built once at startup, so a
+# reply is a few dict lookups and the first SSE chunk leaves immediately.
+
+DEFAULT_FAQ_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "advisor_faq.json")
+
+STOPWORDS = frozenset("""a an and are as at be by can could do does for from get got have how i if in into is it
+its me my of on or should so than that the their then there this to was we what when where which who why will
+with would you your""".split())
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    out = []
+    for word in TOKEN.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        # crude plural folding so "loans" finds "loan"
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        out.append(word)
+    return out
+
+class BM25Index:
+    # Okapi BM25 with every (term, document) weight precomputed at build time:
+    # a query only sums the postings of its terms.
+
+    def __init__(self, documents, k1=1.2, b=0.75):
+        tokenized = [tokenize(doc) for doc in documents]
+        n = len(tokenized)
+        avgdl = sum(len(t) for t in tokenized) / max(n, 1)
+        df = Counter(term for t in tokenized for term in set(t))
+        self.postings = {}
+        for doc_id, tokens in enumerate(tokenized):
+            norm = k1 * (1 - b + b * len(tokens) / avgdl) if avgdl else k1
+            for term, tf in Counter(tokens).items():
+                idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+                self.postings.setdefault(term, []).append((doc_id, idf * tf * (k1 + 1) / (tf + norm)))
+
+    def search(self, query, limit=3):
+        scores = Counter()
+        for term in set(tokenize(query)):
+            for doc_id, weight in self.postings.get(term, ()):
+                scores[doc_id] += weight
+        return scores.most_common(limit)
+
+# what each model input means to an applicant: (label, advice when it hurt the application)
+FEATURE_ADVICE = {
+    "credit_score": ("your credit score", "paying every bill on time and keeping card balances low will raise it"),
+    "avg_credit_util_percent": ("your credit card utilisation", "keeping card balances under 30% of the limit helps"),
+    "num_credit_cards": ("the number of credit cards you hold", "avoid opening new cards before applying"),
+    "late_payment_history": ("your late payment history", "a few months of on-time payments reduce its weight"),
+    "previous_loan_status": ("how your previous loan ended", "settling any outstanding balance helps"),
+    "previous_loan": ("your previous borrowing", "a clean repayment record on it works in your favour"),
+    "previous_loan_amount": ("the size of your previous loan", None),
+    "total_emi_per_month": ("your existing monthly EMIs", "closing a small loan first lowers your monthly burden"),
+    "dti": ("your debt-to-income ratio", "a smaller amount or a longer term lowers the monthly instalment"),
+    "loan_amount": ("the loan amount you asked for", "a smaller amount would lower the monthly instalment"),
+    "repayment_term_months": ("the repayment term", "a longer term lowers each instalment"),
+    "annual_salary": ("your annual income", "declaring any additional income can help"),
+    "additional_income_amount": ("your additional income", "regular rent, freelance or investment income counts"),
+    "additional_income_name": ("the kind of additional income you have", None),
+    "collateral_value": ("the collateral you offered", "offering collateral makes the loan safer to approve"),
+    "savings_balance": ("your savings balance", "a larger savings cushion shows you can keep paying"),
+    "employment_type": ("your type of employment", "collateral or additional income offsets less stable employment"),
+    "contract_years": ("the years left on your contract", "a term that ends before your contract does helps"),
+    "job_title": ("your occupation", None),
+    "loan_insurance": ("loan insurance", "adding loan insurance protects the lender and helps slightly"),
+    "loan_purpose": ("the purpose of the loan", None),
+    "age": ("your age", None),
+    "dependents": ("the number of dependents", None),
+    "education": ("your education", None),
+    "marital_status": ("your marital status", None),
+    "gender": ("your profile", None),
+}
+
+PERSONAL = re.compile(r"\b(my|me|i|am|i'm|mine)\b")
+RESULT_WORDS = frozenset("why reject rejected declined approved approval result decision eligible eligibility "
+                         "chance factor reason status".split())
+FOLLOW_UP = frozenset("more why how explain elaborate detail details example".split())
+
+def feature_base(name):
+    # one-hot / encoded column names ("employment_type_Unemployed") -> model input name
+    name = str(name)
+    best = None
+    for base in FEATURE_ADVICE:
+        if (name == base or name.startswith(base + "_")) and (best is None or len(base) > len(best)):
+            best = base
+    return best or name
+
+def explain_prediction(prediction):
+    # templated answer from the latest decision and its top SHAP drivers
+    decision = prediction.get("decision")
+    probability = prediction.get("probability")
+    parts = []
+    if decision:
+        odds = " with an estimated approval probability of %.0f%%" % (probability * 100) if probability is not None else ""
+        parts.append("Your latest eligibility check came back %s%s." % (decision.lower(), odds))
+    if prediction.get("reason"):
+        parts.append("The main reason given was: %s." % prediction["reason"])
+    helped, hurt = [], []
+    for name, value in prediction.get("shap") or ():
+        label, advice = FEATURE_ADVICE.get(feature_base(name), (str(name).replace("_", " "), None))
+        (helped if float(value) > 0 else hurt).append((label, advice))
+    if helped:
+        parts.append("Working in your favour: %s." % ", ".join(label for label, _ in helped))
+    if hurt:
+        parts.append("Holding your application back: %s." % ", ".join(label for label, _ in hurt))
+        tips = [advice for _, advice in hurt if advice]
+        if tips:
+            parts.append("To improve your chances, " + "; ".join(tips) + ".")
+    elif decision == "Rejected":
+        parts.append("Updating your profile with any additional income, savings or collateral may change the result.")
+    return " ".join(parts)
+
+class ConversationCache(TTLCache):
+    # Per-user chat context (latest prediction + recent turns), LRU-bounded by
+    # CHAT_CONTEXT_SIZE and expired CHAT_CONTEXT_TTL seconds after the last use.
+    # Predictions update it as they are made; on a miss only the latest
+    # PredictionHistory row is read (an index range on (user_id, created_at)), never ChatLog.
+    # The prediction is only trusted for CHAT_PREDICTION_TTL seconds from when it
+    # was loaded or recorded (not renewed by chatting): another worker may have
+    # served a newer /api/predict, or a cold load may have missed rows still
+    # queued in write-behind, so it is then read again.
+
+    def __init__(self):
+        super().__init__(maxsize=10000, ttl=1800)
+        self.prediction_ttl = 30
+        self.turns = 10
+
+    def init_app(self, app):
+        self.maxsize = app.config.get("CHAT_CONTEXT_SIZE", self.maxsize)
+        self.ttl = app.config.get("CHAT_CONTEXT_TTL", self.ttl)
+        self.prediction_ttl = app.config.get("CHAT_PREDICTION_TTL", self.prediction_ttl)
+        self.turns = app.config.get("CHAT_CONTEXT_TURNS", self.turns)
+        app.extensions["chat_context"] = self
+
+    def _entry(self, user_id, count=False):
+        return self.get_or_set(user_id, lambda: {"prediction": None, "prediction_expires": 0.0,
+                                                 "turns": deque(maxlen=self.turns)},
+                               refresh=True, count=count)
+
+    def get(self, user_id, loader=None):
+        # -> (latest prediction or None, [(role, text), ...]); loader(user_id) fills a cold entry
+        if user_id is None:
+            return None, []
+        user_id = int(user_id)
+        if not self.enabled:
+            return (loader(user_id) if loader else None), []
+        entry = self._entry(user_id, count=True)
+        now = time.monotonic()
+        if loader is not None and entry["prediction_expires"] < now:
+            prediction = loader(user_id)
+            with self._lock:
+                # a prediction recorded while loading is newer than the row just read
+                if entry["prediction_expires"] < now:
+                    entry["prediction"] = prediction
+                    entry["prediction_expires"] = now + self.prediction_ttl
+        with self._lock:
+            return entry["prediction"], list(entry["turns"])
+
+    def record_prediction(self, user_id, result):
+        if user_id is None or not self.enabled:
+            return
+        entry = self._entry(int(user_id))
+        with self._lock:
+            entry["prediction"] = {"decision": result.get("decision"), "probability": result.get("probability"),
+                                   "reason": result.get("reason"), "shap": result.get("shap_top3"),
+                                   "model_version": result.get("model_version")}
+            entry["prediction_expires"] = time.monotonic() + self.prediction_ttl
+
+    def record_turn(self, user_id, message, reply):
+        if user_id is None or not self.enabled:
+            return
+        entry = self._entry(int(user_id))
+        with self._lock:
+            entry["turns"].append(("user", message))
+            entry["turns"].append(("advisor", reply))
+
+    def invalidate(self, user_id):
+        self.pop(int(user_id))
+
+    def stats(self):
+        out = super().stats()
+        out["prediction_ttl"] = self.prediction_ttl
+        return out
+
+def latest_prediction(user_id):
+    from app.extensions import db
+    from app.models import PredictionHistory as m
+    row = (db.session.query(m.output, m.probability, m.reason, m.shap, m.model_version)
+           .filter(m.user_id == user_id, or_(m.model_version.is_(None), ~m.model_version.like(SHADOW_PREFIX + "%")))
+           .order_by(m.created_at.desc(), m.id.desc()).first())
+    if row is None:
+        return None
+    return {"decision": row.output, "probability": row.probability, "reason": row.reason, "shap": row.shap,
+            "model_version": row.model_version}
+
+class Advisor:
+    def __init__(self):
+        self.faq = []
+        self.index = None
+        self.min_score = 1.0
+
+    def init_app(self, app):
+        path = app.config.get("ADVISOR_FAQ_PATH") or DEFAULT_FAQ_PATH
+        self.min_score = app.config.get("ADVISOR_MIN_SCORE", self.min_score)
+        with open(path, encoding="utf-8") as fh:
+            self.faq = json.load(fh)
+        # question and keywords are indexed twice so they outweigh the answer text
+        self.index = BM25Index(["%s %s %s %s %s" % (e["question"], e["question"], e.get("keywords", ""),
+                                                    e.get("keywords", ""), e["answer"]) for e in self.faq])
+        app.extensions["advisor"] = self
+
+    def search(self, query, limit=3):
+        if self.index is None:
+            return []
+        return [(self.faq[doc_id], score) for doc_id, score in self.index.search(query, limit)]
+
+    def respond(self, message, prediction=None, turns=()):
+        # -> (reply text, metadata); metadata says which path answered
+        words = set(tokenize(message))
+        personal = PERSONAL.search(message.lower()) is not None
+        if prediction and personal and words & RESULT_WORDS:
+            return explain_prediction(prediction), {"source": "prediction"}
+
+        query = message
+        if len(words) <= 2 and words & FOLLOW_UP:
+            # short follow-up ("why?", "tell me more"): search with the previous question as context
+            previous = [text for role, text in turns if role == "user"]
+            if previous:
+                query = previous[-1] + " " + message
+        hits = self.search(query)
+        if hits and hits[0][1] >= self.min_score:
+            entry, score = hits[0]
+            return entry["answer"], {"source": "faq", "faq_id": entry["id"], "score": round(score, 3),
+                                     "related": [e["question"] for e, _ in hits[1:]]}
+
+        if prediction and personal:
+            return explain_prediction(prediction), {"source": "prediction"}
+        return ("I can explain your latest eligibility result or answer questions about credit scores, "
+                "income, collateral, repayment terms and documents. Try asking \"why was my loan rejected?\" "
+                "or \"how can I improve my credit score?\""), {"source": "fallback"}
+
+def chunks(text, words_per_chunk=4):
+    # reply pieces for streaming: a few words at a time, whitespace preserved
+    words = re.findall(r"\S+\s*", text)
+    for i in range(0, len(words), words_per_chunk):
+        yield "".join(words[i:i + words_per_chunk])
@@ -0,0 +1,206 @@
+import argparse, time
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import func, or_, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+# Portfolio analytics over prediction_history without scanning it. The write
+# path (WriteBehind, via on_insert) folds every inserted batch into per-day,
+# per-model_version rollups with "INSERT ... ON CONFLICT DO UPDATE SET n = n +
+# excluded.n", in the same transaction as the history rows; dashboards then read
+# a few rows per day instead of the JSON history.
+#
+#   cd server && python -m app.services.analytics --rebuild   # backfill existing history
+#
+# app.models is imported where it is used: app.extensions loads the advisor,
+# which reads SHADOW_PREFIX from here before the models can be defined.
+
+PROBABILITY_BUCKETS = 20
+UNKNOWN_VERSION = "unknown"
+# model_version prefix of rows scored by the shadow candidate
+SHADOW_PREFIX = "shadow:"
+
+def _day(created_at):
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    return (created_at or datetime.utcnow()).date()
+
+def _bucket(probability):
+    return min(max(int(probability * PROBABILITY_BUCKETS), 0), PROBABILITY_BUCKETS - 1)
+
+def rollup_deltas(rows):
+    # history mappings -> {rollup model: [increment rows]}, one row per primary key
+    from app.models import PredictionDailyRollup, PredictionProbabilityRollup, PredictionDriverRollup
+    daily = defaultdict(lambda: [0, 0, 0.0])
+    buckets = defaultdict(int)
+    drivers = defaultdict(lambda: [0, 0.0, 0.0])
+    for row in rows:
+        key = (_day(row.get("created_at")), row.get("model_version") or UNKNOWN_VERSION)
+        p = row.get("probability")
+        d = daily[key]
+        d[0] += 1
+        d[1] += row.get("output") == "Approved"
+        if p is not None:
+            d[2] += p
+            buckets[key + (_bucket(p),)] += 1
+        for feature, value in row.get("shap") or ():
+            value = float(value)
+            s = drivers[key + (str(feature)[:128],)]
+            s[0] += 1
+            s[1] += value
+            s[2] += abs(value)
+    # sorted keys: concurrent writers take row locks in the same order
+    return {
+        PredictionDailyRollup: [
+            {"day": k[0], "model_version": k[1], "predictions": v[0], "approved": v[1], "probability_sum": v[2]}
+            for k, v in sorted(daily.items())],
+        PredictionProbabilityRollup: [
+            {"day": k[0], "model_version": k[1], "bucket": k[2], "predictions": v}
+            for k, v in sorted(buckets.items())],
+        PredictionDriverRollup: [
+            {"day": k[0], "model_version": k[1], "feature": k[2], "appearances": v[0],
+             "contribution_sum": v[1], "abs_contribution_sum": v[2]}
+            for k, v in sorted(drivers.items())],
+    }
+
+def _increment(session, model, rows):
+    table = model.__table__
+    keys = [c.name for c in table.primary_key.columns]
+    values = [c for c in rows[0] if c not in keys]
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite_insert if dialect == "sqlite" else pg_insert)(table)
+        stmt = stmt.on_conflict_do_update(index_elements=keys,
+                                          set_={c: table.c[c] + stmt.excluded[c] for c in values})
+        session.execute(stmt, rows)
+        return
+    # other backends: update, insert what didn't exist
+    for row in rows:
+        where = [table.c[k] == row[k] for k in keys]
+        updated = session.execute(table.update().where(*where).values(
+            {c: table.c[c] + row[c] for c in values})).rowcount
+        if not updated:
+            session.execute(table.insert().values(row))
+
+def apply_rollups(session, rows):
+    for model, increments in rollup_deltas(rows).items():
+        if increments:
+            _increment(session, model, increments)
+
+def _range(q, model, start, end, model_version):
+    if start:
+        q = q.filter(model.day >= start)
+    if end:
+        q = q.filter(model.day <= end)
+    if model_version:
+        q = q.filter(model.model_version == model_version)
+    return q
+
+def portfolio_summary(session, start=None, end=None, model_version=None, group_by="day"):
+    # approval rate and mean probability per day (and model_version), or per model_version overall
+    from app.models import PredictionDailyRollup as m
+    columns = [m.model_version] if group_by == "model_version" else [m.day, m.model_version]
+    q = session.query(*columns, func.sum(m.predictions), func.sum(m.approved), func.sum(m.probability_sum))
+    q = _range(q, m, start, end, model_version).group_by(*columns).order_by(*columns)
+    out = []
+    for row in q.all():
+        *key, n, approved, p_sum = row
+        item = {"model_version": key[-1], "predictions": int(n), "approved": int(approved),
+                "approval_rate": approved / n if n else None, "mean_probability": p_sum / n if n else None}
+        if group_by != "model_version":
+            item["day"] = key[0].isoformat()
+        out.append(item)
+    return out
+
+def probability_distribution(session, start=None, end=None, model_version=None):
+    from app.models import PredictionProbabilityRollup as m
+    q = session.query(m.model_version, m.bucket, func.sum(m.predictions))
+    q = _range(q, m, start, end, model_version).group_by(m.model_version, m.bucket)
+    hist = defaultdict(lambda: [0] * PROBABILITY_BUCKETS)
+    for version, bucket, n in q.all():
+        hist[version][bucket] = int(n)
+    edges = [i / PROBABILITY_BUCKETS for i in range(PROBABILITY_BUCKETS + 1)]
+    return {"bucket_edges": edges, "counts": dict(sorted(hist.items()))}
+
+def top_drivers(session, start=None, end=None, model_version=None, limit=10):
+    from app.models import PredictionDriverRollup as m
+    abs_sum = func.sum(m.abs_contribution_sum)
+    q = session.query(m.model_version, m.feature, func.sum(m.appearances), func.sum(m.contribution_sum), abs_sum)
+    q = _range(q, m, start, end, model_version).group_by(m.model_version, m.feature)
+    per_version = defaultdict(list)
+    for version, feature, n, total, total_abs in q.order_by(m.model_version, abs_sum.desc()).all():
+        if len(per_version[version]) < limit:
+            per_version[version].append({"feature": feature, "appearances": int(n),
+                                         "mean_contribution": total / n, "mean_abs_contribution": total_abs / n})
+    return dict(per_version)
+
+def history_page(session, user_id, before=None, limit=50, include_inputs=False, include_shadow=False):
+    # newest first, keyset on (created_at, id): a range scan of (user_id, created_at).
+    # Shadow candidate rows share the user's id but were never served to them: they are left
+    # out unless include_shadow (admin view), where every item carries a "shadow" flag.
+    from app.models import PredictionHistory as m
+    columns = [m.id, m.output, m.probability, m.reason, m.shap, m.model_version, m.created_at]
+    if include_inputs:
+        columns.append(m.input_snapshot)
+    q = session.query(*columns).filter(m.user_id == user_id)
+    if not include_shadow:
+        q = q.filter(or_(m.model_version.is_(None), ~m.model_version.like(SHADOW_PREFIX + "%")))
+    if before is not None:
+        q = q.filter(tuple_(m.created_at, m.id) < tuple_(*before))
+    rows = q.order_by(m.created_at.desc(), m.id.desc()).limit(limit).all()
+    items = []
+    for r in rows:
+        item = {"id": r.id, "decision": r.output, "probability": r.probability, "reason": r.reason,
+                "shap_top3": r.shap, "model_version": r.model_version,
+                "created_at": r.created_at.isoformat() if r.created_at else None}
+        if include_inputs:
+            item["input_snapshot"] = r.input_snapshot
+        if include_shadow:
+            item["shadow"] = (r.model_version or "").startswith(SHADOW_PREFIX)
+        items.append(item)
+    cursor = "%s|%d" % (rows[-1].created_at.isoformat(), rows[-1].id) if len(rows) == limit else None
+    return items, cursor
+
+def parse_cursor(value):
+    if not value:
+        return None
+    created_at, _, row_id = value.rpartition("|")
+    return datetime.fromisoformat(created_at), int(row_id)
+
+def rebuild_rollups(session, batch_size=10000):
+    # recompute all rollups from prediction_history (backfill, or repair after manual edits)
+    from app.models import PredictionHistory, PredictionDailyRollup, PredictionProbabilityRollup, PredictionDriverRollup
+    for model in (PredictionDailyRollup, PredictionProbabilityRollup, PredictionDriverRollup):
+        session.query(model).delete()
+    m = PredictionHistory
+    last_id, total = 0, 0
+    while True:
+        rows = (session.query(m.id, m.output, m.probability, m.shap, m.model_version, m.created_at)
+                .filter(m.id > last_id).order_by(m.id).limit(batch_size).all())
+        if not rows:
+            break
+        apply_rollups(session, [r._asdict() for r in rows])
+        last_id = rows[-1].id
+        total += len(rows)
+    session.commit()
+    return total
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prediction history rollups")
+    parser.add_argument("--rebuild", action="store_true", help="recompute all rollups from prediction_history")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args(argv)
+    if not args.rebuild:
+        parser.print_help()
+        return
+    from app import create_app
+    from app.extensions import db
+    app = create_app()
+    with app.app_context():
+        start = time.perf_counter()
+        total = rebuild_rollups(db.session, args.batch_size)
+        print("Rolled up %d history rows in %.1fs" % (total, time.perf_counter() - start))
+
+if __name__ == "__main__":
+    main()
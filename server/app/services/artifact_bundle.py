@@ -0,0 +1,170 @@
+import argparse, hashlib, json, os, shutil, tempfile
+from datetime import datetime
+import numpy as np
+import lightgbm as lgb
+from app.services.feature_encoder import FeatureEncoder
+from app.services.calibration import Calibrator
+
+# Artifact bundle: one directory per model version holding a manifest, raw .npy
+# arrays for the encoder and calibration table, and the LightGBM model text.
+#
+#   <root>/CURRENT                  name of the active version
+#   <root>/<version>/manifest.json
+#   <root>/<version>/encoder/*.npy, calibration/*.npy, model.txt
+#
+# Arrays are opened with np.load(mmap_mode="r"), so the pages are shared through
+# the OS page cache by every worker instead of being unpickled into each one.
+# The model is served by a native lgb.Booster built from model.txt, so predict
+# and TreeSHAP explanations are the same as for the file-per-artifact layout.
+# Nothing in the bundle is pickled.
+#
+#   cd server && python -m app.services.artifact_bundle models/bundle \
+#       --model artifacts/lightgbm.txt --transformer artifacts/transformer.joblib --iso artifacts/isotonic.joblib
+
+FORMAT = "loan-model-bundle"
+FORMAT_VERSION = 2
+MANIFEST = "manifest.json"
+MODEL_TEXT = "model.txt"
+CURRENT = "CURRENT"
+
+def _bundle_arrays(encoder, calibrator):
+    arrays = {}
+    scalars = {}
+    for name, arr in encoder.to_arrays().items():
+        arr = np.asarray(arr)
+        if arr.ndim == 0:
+            # 0-d values go in the manifest rather than one-element files
+            scalars[name] = arr.item()
+        else:
+            arrays["encoder/" + name] = arr
+    if calibrator is not None:
+        arrays["calibration/x"] = calibrator.x
+        arrays["calibration/y"] = calibrator.y
+    return arrays, scalars
+
+def _digest(arrays, meta, model_text):
+    h = hashlib.blake2b(digest_size=8)
+    h.update(json.dumps(meta, sort_keys=True, default=str).encode("utf-8"))
+    h.update(model_text.encode("utf-8"))
+    for name in sorted(arrays):
+        arr = np.ascontiguousarray(arrays[name])
+        h.update(name.encode("utf-8"))
+        h.update(arr.dtype.str.encode("ascii"))
+        h.update(repr(arr.shape).encode("ascii"))
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+def write_bundle(root, encoder, model_text, calibrator=None, activate=True):
+    # Writes <root>/<version>/ and (optionally) points CURRENT at it; returns the version.
+    arrays, scalars = _bundle_arrays(encoder, calibrator)
+    # parse once here so a bad model text fails the write, not the first worker that loads it
+    booster = lgb.Booster(model_str=model_text)
+    objective = next((line.partition("=")[2] for line in model_text.splitlines() if line.startswith("objective=")), "")
+    model = {
+        "objective": objective,
+        "num_trees": booster.num_trees(),
+        "feature_names": booster.feature_name(),
+    }
+    version = "lgb-" + _digest(arrays, {"encoder": scalars, "model": model}, model_text)
+    manifest = {
+        "format": FORMAT,
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "created_at": datetime.utcnow().isoformat(),
+        "model": model,
+        "encoder": {"scalars": scalars},
+        "arrays": {name: {"dtype": arr.dtype.str, "shape": list(arr.shape)} for name, arr in arrays.items()},
+    }
+
+    os.makedirs(root, exist_ok=True)
+    target = os.path.join(root, version)
+    if not os.path.exists(os.path.join(target, MANIFEST)):
+        # build next to the target and rename, so readers never see a partial bundle
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=root)
+        try:
+            for name, arr in arrays.items():
+                path = os.path.join(tmp, name + ".npy")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                np.save(path, np.ascontiguousarray(arr), allow_pickle=False)
+            with open(os.path.join(tmp, MODEL_TEXT), "w", encoding="utf-8") as fh:
+                fh.write(model_text)
+            with open(os.path.join(tmp, MANIFEST), "w") as fh:
+                json.dump(manifest, fh, indent=2)
+            os.rename(tmp, target)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+    if activate:
+        set_current(root, version)
+    return version
+
+def set_current(root, version):
+    tmp = os.path.join(root, CURRENT + ".tmp")
+    with open(tmp, "w") as fh:
+        fh.write(version + "\n")
+    os.replace(tmp, os.path.join(root, CURRENT))
+
+def resolve_bundle(path):
+    # accepts a bundle root (with CURRENT) or a version directory; None when absent
+    if not path or not os.path.isdir(path):
+        return None
+    if os.path.exists(os.path.join(path, MANIFEST)):
+        return path
+    current = os.path.join(path, CURRENT)
+    if os.path.exists(current):
+        with open(current) as fh:
+            version = fh.read().strip()
+        if version and os.path.exists(os.path.join(path, version, MANIFEST)):
+            return os.path.join(path, version)
+    return None
+
+def load_bundle(path, mmap_mode="r"):
+    # -> (manifest, encoder, calibrator or None, lgb.Booster)
+    with open(os.path.join(path, MANIFEST)) as fh:
+        manifest = json.load(fh)
+    if manifest.get("format") != FORMAT or manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError("unsupported bundle format in %s (rebuild it with python -m app.services.artifact_bundle)"
+                         % path)
+
+    arrays = {}
+    for name, spec in manifest["arrays"].items():
+        arr = np.load(os.path.join(path, name + ".npy"), mmap_mode=mmap_mode, allow_pickle=False)
+        if arr.dtype.str != spec["dtype"] or list(arr.shape) != spec["shape"]:
+            raise ValueError("bundle array %s does not match the manifest" % name)
+        arrays[name] = arr
+
+    fields = {k.split("/", 1)[1]: v for k, v in arrays.items() if k.startswith("encoder/")}
+    fields.update({k: np.asarray(v) for k, v in manifest["encoder"]["scalars"].items()})
+    encoder = FeatureEncoder.from_arrays(fields)
+    calibrator = None
+    if "calibration/x" in arrays:
+        calibrator = Calibrator(arrays["calibration/x"], arrays["calibration/y"])
+    with open(os.path.join(path, MODEL_TEXT), encoding="utf-8") as fh:
+        booster = lgb.Booster(model_str=fh.read())
+    if booster.num_trees() != manifest["model"]["num_trees"]:
+        raise ValueError("bundle model does not match the manifest")
+    return manifest, encoder, calibrator, booster
+
+def main(argv=None):
+    from app.config import Config
+    from app.services.model_registry import load_artifacts
+    parser = argparse.ArgumentParser(description="Build an mmap-able artifact bundle from the file-per-artifact layout")
+    parser.add_argument("output", help="bundle root directory")
+    parser.add_argument("--model", default=Config.MODEL_PATH)
+    parser.add_argument("--transformer", default=Config.TRANSFORMER_PATH)
+    parser.add_argument("--encoder", default=Config.ENCODER_PATH)
+    parser.add_argument("--calibration", default=Config.CALIBRATION_PATH)
+    parser.add_argument("--iso", default=Config.ISO_PATH)
+    parser.add_argument("--no-activate", action="store_true", help="write the version without updating CURRENT")
+    args = parser.parse_args(argv)
+
+    art = load_artifacts({"MODEL_PATH": args.model, "TRANSFORMER_PATH": args.transformer, "ENCODER_PATH": args.encoder,
+                          "CALIBRATION_PATH": args.calibration, "ISO_PATH": args.iso})
+    if art.model is None or art.encoder is None:
+        raise SystemExit("need a LightGBM model and a compilable transformer or encoder.npz")
+    version = write_bundle(args.output, art.encoder, art.model.model_to_string(), art.calibrator,
+                           activate=not args.no_activate)
+    print("Bundle %s written to %s" % (version, os.path.join(args.output, version)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import threading, time
+from collections import OrderedDict, deque
+from app.services.process_local import ProcessPool
+from app.utils import hash_password, verify_password, needs_rehash
+
+class PasswordHasherBusy(Exception):
+    pass
+
+class PasswordHasher:
+    # Runs password hashing/verification on a small process pool so login storms
+    # can't starve the request threads. Work beyond AUTH_HASH_MAX_PENDING waits up
+    # to AUTH_HASH_QUEUE_TIMEOUT for a slot and is then rejected.
+
+    def __init__(self):
+        self.workers = 2
+        self.method = None
+        self.queue_timeout = 1.0
+        self._slots = threading.BoundedSemaphore(8)
+        self._pool = ProcessPool(self.workers)
+
+    def init_app(self, app):
+        cfg = app.config
+        self.workers = cfg.get("AUTH_HASH_WORKERS", self.workers)
+        self._pool.max_workers = self.workers
+        self.method = cfg.get("PASSWORD_HASH_METHOD")
+        self.queue_timeout = cfg.get("AUTH_HASH_QUEUE_TIMEOUT", self.queue_timeout)
+        self._slots = threading.BoundedSemaphore(cfg.get("AUTH_HASH_MAX_PENDING", 8))
+        app.extensions["password_hasher"] = self
+
+    def _run(self, stage, fn, *args):
+        from app.extensions import metrics
+        # timed from the caller's side: queue wait + pool round trip + hashing
+        start = time.perf_counter()
+        if not self.workers:
+            result = fn(*args)
+        else:
+            if not self._slots.acquire(timeout=self.queue_timeout):
+                raise PasswordHasherBusy()
+            try:
+                result = self._pool.submit(fn, *args).result()
+            finally:
+                self._slots.release()
+        metrics.observe("stage_duration_seconds", time.perf_counter() - start, stage=stage)
+        return result
+
+    def hash(self, pw):
+        return self._run("password_hash", hash_password, pw, self.method)
+
+    def verify(self, h, pw):
+        return self._run("password_verify", verify_password, h, pw)
+
+    def needs_rehash(self, h):
+        return needs_rehash(h, self.method)
+
+class LoginRateLimiter:
+    # Sliding window of failed logins per username, checked before any hashing.
+
+    def __init__(self):
+        self.max_attempts = 5
+        self.window = 300
+        self.max_tracked = 100000
+        self._failures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        cfg = app.config
+        self.max_attempts = cfg.get("AUTH_MAX_ATTEMPTS", self.max_attempts)
+        self.window = cfg.get("AUTH_ATTEMPT_WINDOW", self.window)
+        app.extensions["login_limiter"] = self
+
+    def retry_after(self, username):
+        # seconds until another attempt is allowed, 0 if allowed now
+        now = time.monotonic()
+        with self._lock:
+            hits = self._failures.get(username)
+            if not hits:
+                return 0
+            while hits and hits[0] <= now - self.window:
+                hits.popleft()
+            if len(hits) < self.max_attempts:
+                return 0
+            return max(int(hits[0] + self.window - now) + 1, 1)
+
+    def fail(self, username):
+        now = time.monotonic()
+        with self._lock:
+            hits = self._failures.get(username)
+            if hits is None:
+                hits = self._failures[username] = deque(maxlen=self.max_attempts)
+            hits.append(now)
+            self._failures.move_to_end(username)
+            while len(self._failures) > self.max_tracked:
+                self._failures.popitem(last=False)
+
+    def reset(self, username):
+        with self._lock:
+            self._failures.pop(username, None)
@@ -0,0 +1,61 @@
+import numpy as np
+from sklearn.isotonic import IsotonicRegression
+
+# Probability calibration as a piecewise-linear table: score knots x (increasing)
+# and calibrated values y. Applying it is one np.interp over the whole batch;
+# scores outside [x[0], x[-1]] clip to the end values, like
+# IsotonicRegression(out_of_bounds="clip").
+
+class Calibrator:
+    __slots__ = ("x", "y")
+
+    def __init__(self, x, y):
+        self.x = np.ascontiguousarray(x, dtype=np.float64)
+        self.y = np.ascontiguousarray(y, dtype=np.float64)
+        if self.x.ndim != 1 or self.x.shape != self.y.shape or len(self.x) == 0:
+            raise ValueError("calibration table needs two 1-D arrays of equal, non-zero length")
+        if np.any(np.diff(self.x) < 0):
+            raise ValueError("calibration knots must be sorted")
+
+    def __call__(self, scores):
+        return np.interp(np.asarray(scores, dtype=np.float64), self.x, self.y)
+
+    def __len__(self):
+        return len(self.x)
+
+    @classmethod
+    def fit(cls, scores, labels):
+        # isotonic fit on held-out scores; its thresholds are exactly the table
+        iso = IsotonicRegression(out_of_bounds="clip", y_min=0.0, y_max=1.0)
+        iso.fit(np.asarray(scores, dtype=np.float64), np.asarray(labels, dtype=np.float64))
+        return cls.from_isotonic(iso)
+
+    @classmethod
+    def from_isotonic(cls, iso):
+        # legacy isotonic.joblib artifacts predict by linear interpolation between these points
+        return cls(iso.X_thresholds_, iso.y_thresholds_)
+
+    def save(self, path):
+        with open(path, "wb") as fh:
+            np.savez(fh, x=self.x, y=self.y)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["x"], data["y"])
+
+def expected_calibration_error(labels, probs, bins=15):
+    # weighted mean |accuracy - confidence| over equal-width probability bins
+    labels = np.asarray(labels, dtype=np.float64)
+    probs = np.asarray(probs, dtype=np.float64)
+    idx = np.minimum((probs * bins).astype(np.int64), bins - 1)
+    counts = np.bincount(idx, minlength=bins)
+    pos = np.bincount(idx, weights=labels, minlength=bins)
+    conf = np.bincount(idx, weights=probs, minlength=bins)
+    seen = counts > 0
+    return float(np.abs(pos[seen] - conf[seen]).sum() / max(len(probs), 1))
+
+def brier_score(labels, probs):
+    labels = np.asarray(labels, dtype=np.float64)
+    probs = np.asarray(probs, dtype=np.float64)
+    return float(np.mean((probs - labels) ** 2))
@@ -0,0 +1,199 @@
+import math, time
+from itertools import combinations, product
+import numpy as np
+from app.services.services_ml import _input_columns, score_variants
+
+# "What would get me approved": searches changes to a few actionable inputs that
+# lift the approval probability over the threshold, scoring every candidate set
+# in one vectorized call (score(columns, values) -> probabilities).
+#   1. grid stages: every field alone, then every pair, then triples, each stage a
+#      single batch; stops early once `limit` distinct field sets approve, when
+#      the latency budget is spent or when the candidate cap is reached
+#   2. refinement: each approving change is bisected back towards the current
+#      value, one batch per round across all solutions, so the answer is the
+#      smallest change on the grid's path rather than the grid point itself
+# Solutions are ranked by cost: the sum over fields of |change| / allowed range.
+
+class Field:
+    __slots__ = ("name", "current", "bound", "step")
+
+    def __init__(self, name, current, bound, step):
+        self.name = name
+        self.current = float(current)
+        self.bound = float(bound)
+        self.step = float(step)
+
+    def snap(self, value, toward):
+        # round to the field's step on the side of `toward`, within [current, bound]
+        q = value / self.step
+        value = (math.ceil(q) if toward > value else math.floor(q)) * self.step
+        lo, hi = sorted((self.current, self.bound))
+        return min(max(value, lo), hi)
+
+    def cost(self, value):
+        span = abs(self.bound - self.current)
+        return abs(value - self.current) / span if span else 0.0
+
+def _num(value, default=0.0):
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+# actionable inputs: direction of help, reachable bound from the current profile, step
+DEFAULT_FIELDS = {
+    "loan_amount": lambda r: (_num(r.get("loan_amount")), 0.2 * _num(r.get("loan_amount")), 1000),
+    "repayment_term_months": lambda r: (_num(r.get("repayment_term_months"), 12), 240, 1),
+    "savings_balance": lambda r: (_num(r.get("savings_balance")),
+                                  max(3 * _num(r.get("savings_balance")), _num(r.get("savings_balance")) + 500000), 1000),
+    "collateral_value": lambda r: (_num(r.get("collateral_value")),
+                                   max(_num(r.get("collateral_value")), 1.5 * _num(r.get("loan_amount"))), 1000),
+    "additional_income_amount": lambda r: (_num(r.get("additional_income_amount")),
+                                           _num(r.get("additional_income_amount")) + 0.5 * _num(r.get("annual_salary")), 1000),
+    "total_emi_per_month": lambda r: (_num(r.get("total_emi_per_month")), 0, 100),
+    "avg_credit_util_percent": lambda r: (_num(r.get("avg_credit_util_percent")), 0, 1),
+    "loan_insurance": lambda r: (_num(r.get("loan_insurance")), 1, 1),
+}
+
+def build_fields(record, requested=None, inputs=None):
+    # requested: None (all defaults), [names] or {name: {"to": bound, "step": s}}; inputs: model columns
+    if requested is None:
+        requested = list(DEFAULT_FIELDS)
+    if isinstance(requested, (list, tuple)):
+        requested = {name: {} for name in requested}
+    if not isinstance(requested, dict):
+        raise ValueError("actionable must be a list of fields or an object of field options")
+    fields = []
+    for name, opts in requested.items():
+        if name not in DEFAULT_FIELDS:
+            raise ValueError("%s is not an actionable field" % name)
+        if inputs is not None and name not in inputs:
+            continue
+        current, bound, step = DEFAULT_FIELDS[name](record)
+        opts = opts or {}
+        if not isinstance(opts, dict):
+            raise ValueError("options for %s must be an object" % name)
+        bound = float(opts.get("to", bound))
+        step = float(opts.get("step", step))
+        if step <= 0:
+            raise ValueError("step must be positive")
+        if bound != current:
+            fields.append(Field(name, current, bound, step))
+    return fields
+
+def _grid(field, levels):
+    points = np.linspace(field.current, field.bound, levels + 1)[1:]
+    return sorted({field.snap(p, field.bound) for p in points} - {field.current}, key=field.cost)
+
+def _solution(fields, row, probability):
+    changes = {f.name: {"from": f.current, "to": v} for f, v in zip(fields, row) if v != f.current}
+    return {"changes": changes, "probability": float(probability),
+            "cost": round(sum(f.cost(v) for f, v in zip(fields, row)), 6)}
+
+def search(score, fields, target=0.5, limit=5, max_fields=3, levels=8, refine_rounds=8,
+           budget_ms=200.0, max_candidates=20000):
+    start = time.perf_counter()
+    deadline = start + budget_ms / 1000.0
+    names = [f.name for f in fields]
+    current = np.array([f.current for f in fields], dtype=np.float64)
+    stats = {"evaluated": 1, "batches": 1, "complete": True}
+
+    base_p = float(score(names, current[None, :])[0])
+    if base_p >= target or not fields:
+        stats["elapsed_ms"] = round((time.perf_counter() - start) * 1000.0, 3)
+        return base_p, [], stats
+
+    # 1. grid stages by number of changed fields
+    grids = [_grid(f, levels) for f in fields]
+    found = {}  # field set -> (cost, row, probability), cheapest per set
+    for r in range(1, min(max_fields, len(fields)) + 1):
+        # a superset of an approving field set is never the smallest change
+        combos = [c for c in combinations(range(len(fields)), r) if not any(set(k) <= set(c) for k in found)]
+        room = max_candidates - stats["evaluated"]
+        if r > 1:
+            # keep the stage within the remaining budget at the scoring rate seen so far
+            now = time.perf_counter()
+            per_row = (now - start) / stats["evaluated"]
+            room = min(room, int((deadline - now) / per_row))
+        if not combos:
+            continue
+        if room <= 0:
+            stats["complete"] = False
+            break
+        # thin each grid evenly when the full stage would exceed the candidate cap
+        per_field = max(int((room / len(combos)) ** (1.0 / r)), 1)
+        if any(len(grids[j]) > per_field for c in combos for j in c):
+            stats["complete"] = False
+        rows = []
+        for combo in combos:
+            axes = [grids[j] if len(grids[j]) <= per_field else
+                    [grids[j][int(i)] for i in np.linspace(0, len(grids[j]) - 1, per_field)] for j in combo]
+            for values in product(*axes):
+                row = current.copy()
+                row[list(combo)] = values
+                rows.append(row)
+        if len(rows) > room:
+            stats["complete"] = False
+            break
+        rows = np.array(rows)
+        probs = np.asarray(score(names, rows))
+        stats["evaluated"] += len(rows)
+        stats["batches"] += 1
+        for row, p in zip(rows[probs >= target], probs[probs >= target]):
+            key = tuple(np.nonzero(row != current)[0])
+            cost = sum(f.cost(v) for f, v in zip(fields, row))
+            if key not in found or cost < found[key][0]:
+                found[key] = (cost, row, p)
+        if len(found) >= limit:
+            break
+        if time.perf_counter() > deadline:
+            stats["complete"] = False
+            break
+
+    # 2. bisect each changed field of the cheapest solutions back towards its current value
+    best = sorted(found.items(), key=lambda kv: kv[1][0])[:limit]
+    keys = [key for key, _ in best]
+    S = np.array([sol[1] for _, sol in best]).reshape(len(best), len(fields))
+    P = np.array([sol[2] for _, sol in best], dtype=np.float64)
+    for pos in range(max((len(k) for k in keys), default=0)):
+        active = [i for i, k in enumerate(keys) if len(k) > pos]
+        cols = np.array([keys[i][pos] for i in active])
+        lo = current[cols].copy()
+        hi = S[active, cols].copy()
+        for _ in range(refine_rounds):
+            if time.perf_counter() > deadline:
+                stats["complete"] = False
+                break
+            mid = np.array([fields[j].snap((a + b) / 2.0, b) for j, a, b in zip(cols, lo, hi)])
+            todo = mid != hi
+            if not todo.any():
+                break
+            trial = S[active].copy()
+            trial[np.arange(len(active)), cols] = mid
+            probs = np.asarray(score(names, trial))
+            stats["evaluated"] += len(trial)
+            stats["batches"] += 1
+            ok = (probs >= target) & todo
+            hi = np.where(ok, mid, hi)
+            lo = np.where(ok | ~todo, lo, mid)
+            for n, i in enumerate(active):
+                if ok[n]:
+                    S[i, cols[n]] = mid[n]
+                    P[i] = probs[n]
+
+    solutions = {}
+    for row, p in zip(S, P):
+        sol = _solution(fields, row, p)
+        key = tuple(sorted((name, c["to"]) for name, c in sol["changes"].items()))
+        solutions.setdefault(key, sol)
+    stats["elapsed_ms"] = round((time.perf_counter() - start) * 1000.0, 3)
+    return base_p, sorted(solutions.values(), key=lambda s: (s["cost"], len(s["changes"]))), stats
+
+def find_approval(art, record, requested=None, **options):
+    # -> (base probability, solutions, stats) for `record` under the served artifacts
+    inputs = None
+    if art is not None and art.ready:
+        num, cat = _input_columns(art)
+        inputs = set(num) | set(cat)
+    fields = build_fields(record, requested, inputs)
+    return search(lambda columns, values: score_variants(art, record, columns, values), fields, **options)
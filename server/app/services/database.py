@@ -0,0 +1,163 @@
+import threading
+from flask import jsonify
+from flask.globals import app_ctx
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as SQLAlchemyTimeoutError
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+# Engine tuning around Flask-SQLAlchemy, driven by the DB_* / SQLITE_* settings:
+#   - pool size, overflow, timeout, recycle and pre-ping for every engine
+#     (SQLALCHEMY_ENGINE_OPTIONS from the environment overrides single keys)
+#   - SQLite connections get journal_mode=WAL, synchronous and busy_timeout, so
+#     the write-behind thread and request threads wait for each other instead of
+#     failing with "database is locked"; PostgreSQL/MySQL get a statement timeout
+#   - DATABASE_READ_URL adds a "replica" bind, and read_session() hands the
+#     read-only admin/history/analytics queries a session on it
+#   - pool checkouts, connects and invalidations are counted per engine for /metrics
+
+SQLITE_JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+SQLITE_SYNCHRONOUS = ("OFF", "NORMAL", "FULL", "EXTRA")
+REPLICA = "replica"
+
+def _memory_sqlite(url):
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def engine_options(cfg, url, overrides=None):
+    url = make_url(url)
+    options = {"pool_pre_ping": cfg.get("DB_POOL_PRE_PING", True)}
+    # in-memory SQLite runs on a single static connection; there is no pool to size
+    if not _memory_sqlite(url):
+        for key, setting in (("pool_size", "DB_POOL_SIZE"), ("max_overflow", "DB_MAX_OVERFLOW"),
+                             ("pool_timeout", "DB_POOL_TIMEOUT"), ("pool_recycle", "DB_POOL_RECYCLE")):
+            if cfg.get(setting) is not None:
+                options[key] = cfg[setting]
+    options.update(overrides or {})
+    return options
+
+def sqlite_pragmas(cfg, url):
+    journal = str(cfg.get("SQLITE_JOURNAL_MODE") or "").upper()
+    synchronous = str(cfg.get("SQLITE_SYNCHRONOUS") or "").upper()
+    if journal and journal not in SQLITE_JOURNAL_MODES:
+        raise ValueError("SQLITE_JOURNAL_MODE must be one of %s" % ", ".join(SQLITE_JOURNAL_MODES))
+    if synchronous and synchronous not in SQLITE_SYNCHRONOUS:
+        raise ValueError("SQLITE_SYNCHRONOUS must be one of %s" % ", ".join(SQLITE_SYNCHRONOUS))
+    pragmas = ["PRAGMA busy_timeout = %d" % int(cfg.get("SQLITE_BUSY_TIMEOUT_MS") or 0)]
+    # WAL needs a file; an in-memory database keeps its own journal
+    if journal and not _memory_sqlite(make_url(url)):
+        pragmas.append("PRAGMA journal_mode = %s" % journal)
+    if synchronous:
+        pragmas.append("PRAGMA synchronous = %s" % synchronous)
+    return pragmas
+
+def session_statements(cfg, url):
+    # run on every new DBAPI connection
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        return sqlite_pragmas(cfg, url)
+    timeout = int(cfg.get("DB_STATEMENT_TIMEOUT_MS") or 0)
+    if timeout and backend == "postgresql":
+        return ["SET statement_timeout = %d" % timeout]
+    if timeout and backend in ("mysql", "mariadb"):
+        return ["SET SESSION max_execution_time = %d" % timeout]
+    return []
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+
+    def attach(self, engine, statements):
+        def on_connect(dbapi_connection, record):
+            if statements:
+                cursor = dbapi_connection.cursor()
+                try:
+                    for statement in statements:
+                        cursor.execute(statement)
+                finally:
+                    cursor.close()
+            self._count("connects")
+
+        event.listen(engine, "connect", on_connect)
+        event.listen(engine, "checkout", lambda *args: self._count("checkouts"))
+        event.listen(engine, "checkin", lambda *args: self._count("checkins"))
+        event.listen(engine, "invalidate", lambda *args: self._count("invalidations"))
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self, engine):
+        pool = engine.pool
+        out = {"connects": self.connects, "checkouts": self.checkouts, "checkins": self.checkins,
+               "invalidations": self.invalidations}
+        # QueuePool gauges; SingletonThreadPool/StaticPool/NullPool only have the counters
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            fn = getattr(pool, name, None)
+            if callable(fn):
+                out[name] = fn()
+        timeout = getattr(pool, "timeout", None)
+        if callable(timeout):
+            out["timeout"] = timeout()
+        return out
+
+def _app_ctx_id():
+    return id(app_ctx._get_current_object())
+
+class DatabaseTuning:
+    def __init__(self):
+        self.db = None
+        self._engines = {}
+        self._read_session = None
+        self._lock = threading.Lock()
+        self.pool_timeouts = 0
+
+    def init_app(self, app, db):
+        # fills SQLALCHEMY_ENGINE_OPTIONS / SQLALCHEMY_BINDS before db.init_app creates the engines,
+        # then instruments the engines it created
+        cfg = app.config
+        self.db = db
+        overrides = cfg.get("SQLALCHEMY_ENGINE_OPTIONS") or {}
+        cfg["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(cfg, cfg["SQLALCHEMY_DATABASE_URI"], overrides)
+        binds = dict(cfg.get("SQLALCHEMY_BINDS") or {})
+        if cfg.get("DATABASE_READ_URL"):
+            binds[REPLICA] = dict(engine_options(cfg, cfg["DATABASE_READ_URL"], overrides), url=cfg["DATABASE_READ_URL"])
+        cfg["SQLALCHEMY_BINDS"] = binds
+
+        db.init_app(app)
+        with app.app_context():
+            for key, engine in db.engines.items():
+                self.instrument(key or "default", engine, cfg)
+            if REPLICA in db.engines:
+                self._read_session = scoped_session(sessionmaker(bind=db.engines[REPLICA]), scopefunc=_app_ctx_id)
+
+                @app.teardown_appcontext
+                def remove_read_session(exc):
+                    self._read_session.remove()
+
+        # an exhausted pool answers 503 instead of a generic 500
+        @app.errorhandler(SQLAlchemyTimeoutError)
+        def pool_timeout(e):
+            with self._lock:
+                self.pool_timeouts += 1
+            return jsonify({"error": "database_busy"}), 503
+
+        app.extensions["db_tuning"] = self
+
+    def instrument(self, name, engine, cfg):
+        # session statements + pool counters for an engine (the ASGI async engine passes its sync_engine)
+        stats = PoolStats()
+        stats.attach(engine, session_statements(cfg, engine.url))
+        self._engines[name] = (engine, stats)
+
+    def read_session(self):
+        # read-only queries (history, admin listings, analytics); the primary when no replica is set
+        return self._read_session() if self._read_session is not None else self.db.session
+
+    def stats(self):
+        out = {name: stats.stats(engine) for name, (engine, stats) in self._engines.items()}
+        out["pool_timeouts"] = self.pool_timeouts
+        return out
@@ -0,0 +1,52 @@
+import numpy as np
+from scipy import sparse
+
+# Per-row top-k feature contributions from LightGBM's native TreeSHAP
+# (Booster.predict(pred_contrib=True)); the last contribution column is the
+# expected value and is never reported.
+
+def transformer_feature_names(transformer):
+    names = []
+    for name, trans, cols in transformer.transformers_:
+        if name == "remainder" or trans == "drop":
+            continue
+        if hasattr(trans, "get_feature_names_out"):
+            names.extend(trans.get_feature_names_out(cols))
+        else:
+            names.extend(cols)
+    return [str(n) for n in names]
+
+def _top_k_row(values, columns, k, feature_names):
+    if len(values) > k:
+        part = np.argpartition(-np.abs(values), k - 1)[:k]
+        values, columns = values[part], columns[part]
+    order = np.argsort(-np.abs(values), kind="stable")
+    return [(feature_names[columns[i]], float(values[i])) for i in order]
+
+def top_k_from_contrib(contrib, feature_names, k=3):
+    n_features = len(feature_names)
+    if sparse.issparse(contrib):
+        contrib = contrib.tocsr()
+        out = []
+        for r in range(contrib.shape[0]):
+            lo, hi = contrib.indptr[r], contrib.indptr[r + 1]
+            columns = contrib.indices[lo:hi]
+            values = contrib.data[lo:hi]
+            mask = (columns < n_features) & (values != 0)
+            out.append(_top_k_row(values[mask], columns[mask], k, feature_names))
+        return out
+
+    arr = np.asarray(contrib)[:, :n_features]
+    if n_features <= k:
+        idx = np.broadcast_to(np.arange(n_features), arr.shape)
+    else:
+        # O(n_features) selection per row instead of a full sort
+        idx = np.argpartition(-np.abs(arr), k - 1, axis=1)[:, :k]
+    top = np.take_along_axis(arr, idx, axis=1)
+    order = np.argsort(-np.abs(top), axis=1, kind="stable")
+    idx = np.take_along_axis(idx, order, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    return [[(feature_names[c], float(v)) for c, v in zip(idx[r], top[r])] for r in range(arr.shape[0])]
+
+def top_k_contributions(model, X, feature_names, k=3):
+    return top_k_from_contrib(model.predict(X, pred_contrib=True), feature_names, k)
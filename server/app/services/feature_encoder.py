@@ -0,0 +1,381 @@
+import argparse, math
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.preprocessing import OrdinalEncoder
+
+# Flat NumPy replacement for the ColumnTransformer saved by ml_part.py
+# (StandardScaler on numeric columns + OneHotEncoder or OrdinalEncoder on categoricals).
+# Rows are written straight into preallocated buffers instead of going through
+# a DataFrame and sklearn's validation on every call.
+
+def records_to_frame(transformer, records):
+    # Reference path: what the sklearn transformer expects to be fed
+    X_df = pd.DataFrame.from_records(records)
+    columns = getattr(transformer, "feature_names_in_", None)
+    if columns is not None:
+        # rows may carry different key sets; align to what the transformer was fitted on
+        X_df = X_df.reindex(columns=list(columns))
+    # JSON nulls arrive as None; the fitted encoders only understand NaN as missing
+    for name, _, cols in getattr(transformer, "transformers_", []):
+        if name == "num":
+            X_df[cols] = X_df[cols].apply(pd.to_numeric, errors="coerce")
+        elif name == "cat":
+            X_df[cols] = X_df[cols].astype(object).where(X_df[cols].notna(), np.nan)
+    return X_df
+
+def _is_missing(v):
+    return v is None or (isinstance(v, float) and math.isnan(v))
+
+def _to_float(v):
+    if v is None:
+        return np.nan
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return np.nan
+
+class FeatureEncoder:
+    def __init__(self, num_columns, mean, scale, cat_columns, cat_maps, cat_nan_index,
+                 num_offset, n_features, sparse_output, feature_names, dtype=np.float32,
+                 cat_ordinal=False, cat_offset=0, missing_code=np.nan, unknown_code=np.nan):
+        self.num_columns = list(num_columns)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.cat_columns = list(cat_columns)
+        # one dict per categorical input column: {category: output column} for one-hot,
+        # {category: code} written to column cat_offset + j for ordinal
+        self.cat_maps = cat_maps
+        self.cat_nan_index = list(cat_nan_index)
+        self.cat_ordinal = bool(cat_ordinal)
+        self.cat_offset = int(cat_offset)
+        self.missing_code = float(missing_code)
+        self.unknown_code = float(unknown_code)
+        self.num_offset = int(num_offset)
+        self.n_features = int(n_features)
+        self.sparse_output = bool(sparse_output)
+        self.feature_names = list(feature_names)
+        self.dtype = np.dtype(dtype)
+
+    @property
+    def input_columns(self):
+        return self.num_columns + self.cat_columns
+
+    def _numeric_block(self, records):
+        rows = [[r.get(c) for c in self.num_columns] for r in records]
+        try:
+            num = np.array(rows, dtype=np.float64).reshape(len(records), len(self.num_columns))
+        except (TypeError, ValueError):
+            num = np.array([[_to_float(v) for v in row] for row in rows], dtype=np.float64)
+            num = num.reshape(len(records), len(self.num_columns))
+        # same float64 arithmetic as StandardScaler.transform, so the cast below is exact
+        num -= self.mean
+        num /= self.scale
+        return num
+
+    def _category_indices(self, records):
+        # -1 marks an unknown category (handle_unknown='ignore' -> all zeros)
+        idx = np.full((len(records), len(self.cat_columns)), -1, dtype=np.int64)
+        for j, (col, mapping, nan_idx) in enumerate(zip(self.cat_columns, self.cat_maps, self.cat_nan_index)):
+            get = mapping.get
+            for i, r in enumerate(records):
+                v = r.get(col)
+                if _is_missing(v):
+                    idx[i, j] = nan_idx
+                else:
+                    try:
+                        idx[i, j] = get(v, -1)
+                    except TypeError:
+                        pass
+        return idx
+
+    def _category_codes(self, records):
+        codes = np.full((len(records), len(self.cat_columns)), self.unknown_code, dtype=np.float64)
+        for j, (col, mapping, nan_idx) in enumerate(zip(self.cat_columns, self.cat_maps, self.cat_nan_index)):
+            get = mapping.get
+            # missing is only "encoded_missing_value" if NaN was seen in fit, else it is unknown
+            missing = self.missing_code if nan_idx >= 0 else self.unknown_code
+            for i, r in enumerate(records):
+                v = r.get(col)
+                if _is_missing(v):
+                    codes[i, j] = missing
+                else:
+                    try:
+                        codes[i, j] = get(v, self.unknown_code)
+                    except TypeError:
+                        pass
+        return codes
+
+    def transform_dense(self, records, out=None):
+        n = len(records)
+        if out is None:
+            out = np.zeros((n, self.n_features), dtype=self.dtype)
+        else:
+            if out.shape[0] < n or out.shape[1] != self.n_features:
+                raise ValueError("output buffer has shape %s, need (%d, %d)" % (out.shape, n, self.n_features))
+            out = out[:n]
+            out.fill(0)
+        if self.num_columns:
+            out[:, self.num_offset:self.num_offset + len(self.num_columns)] = self._numeric_block(records)
+        if self.cat_columns and self.cat_ordinal:
+            out[:, self.cat_offset:self.cat_offset + len(self.cat_columns)] = self._category_codes(records)
+        elif self.cat_columns:
+            idx = self._category_indices(records)
+            rows, cols = np.nonzero(idx >= 0)
+            out[rows, idx[rows, cols]] = 1
+        return out
+
+    def transform_csr(self, records):
+        if self.cat_ordinal:
+            return sparse.csr_matrix(self.transform_dense(records))
+        n = len(records)
+        n_num, n_cat = len(self.num_columns), len(self.cat_columns)
+        width = n_num + n_cat
+        # one slot per numeric column plus one per categorical, compacted below
+        data = np.ones((n, width), dtype=self.dtype)
+        indices = np.empty((n, width), dtype=np.int32)
+        keep = np.ones((n, width), dtype=bool)
+        if n_num:
+            num = self._numeric_block(records)
+            data[:, :n_num] = num
+            indices[:, :n_num] = np.arange(self.num_offset, self.num_offset + n_num, dtype=np.int32)
+            # csr_matrix(dense) drops exact zeros; do the same so the structure matches
+            keep[:, :n_num] = num != 0
+        if n_cat:
+            idx = self._category_indices(records)
+            indices[:, n_num:] = idx
+            keep[:, n_num:] = idx >= 0
+        indptr = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(keep.sum(axis=1), out=indptr[1:])
+        return sparse.csr_matrix((data[keep], indices[keep], indptr), shape=(n, self.n_features))
+
+    def transform(self, records):
+        # same output kind as the ColumnTransformer it was compiled from
+        if self.sparse_output:
+            return self.transform_csr(records)
+        return self.transform_dense(records)
+
+    def transform_variants(self, record, columns, values):
+        # dense rows of `record` with `columns` replaced by each row of `values` (n x k raw
+        # inputs): the base row is encoded once and broadcast, then only the output
+        # columns of the changed inputs are rewritten (vectorized for numeric inputs)
+        values = np.asarray(values, dtype=object if any(c in self.cat_columns for c in columns) else None)
+        if values.ndim != 2 or values.shape[1] != len(columns):
+            raise ValueError("values must have shape (n, %d)" % len(columns))
+        out = np.repeat(self.transform_dense([record]), values.shape[0], axis=0)
+        for j, col in enumerate(columns):
+            if col in self.num_columns:
+                k = self.num_columns.index(col)
+                v = values[:, j]
+                if v.dtype == object:
+                    v = np.array([_to_float(x) for x in v], dtype=np.float64)
+                out[:, self.num_offset + k] = (v.astype(np.float64) - self.mean[k]) / self.scale[k]
+            elif col in self.cat_columns:
+                # few distinct values per column: encode each once through the row path
+                k = self.cat_columns.index(col)
+                if self.cat_ordinal:
+                    block = [self.cat_offset + k]
+                else:
+                    block = sorted((set(self.cat_maps[k].values()) | {self.cat_nan_index[k]}) - {-1})
+                keys = [None if _is_missing(x) else x for x in values[:, j]]
+                for value in set(keys):
+                    rows = np.array([x == value for x in keys])
+                    encoded = self.transform_dense([{col: value}])[0]
+                    out[np.ix_(rows, block)] = encoded[block]
+            # inputs the model doesn't read leave the encoding unchanged
+        return out
+
+    def probe_records(self, limit=None):
+        # one row per category (cycled), plus missing and unknown values
+        n = max([len(m) for m in self.cat_maps] + [1])
+        if limit is not None:
+            n = min(n, limit)
+        records = []
+        for i in range(n):
+            rec = {c: float(self.mean[k]) + i for k, c in enumerate(self.num_columns)}
+            for col, mapping in zip(self.cat_columns, self.cat_maps):
+                cats = list(mapping)
+                rec[col] = cats[i % len(cats)] if cats else None
+            records.append(rec)
+        records.append({c: None for c in self.input_columns})
+        records.append({c: "__unknown__" for c in self.cat_columns})
+        return records
+
+    def to_arrays(self):
+        categories, owners, positions = [], [], []
+        numeric_cats = []
+        for j, mapping in enumerate(self.cat_maps):
+            numeric_cats.append(all(not isinstance(c, str) for c in mapping))
+            for cat, pos in mapping.items():
+                categories.append(str(cat))
+                owners.append(j)
+                positions.append(pos)
+        return dict(
+            num_columns=np.array(self.num_columns, dtype=str),
+            mean=self.mean,
+            scale=self.scale,
+            cat_columns=np.array(self.cat_columns, dtype=str),
+            categories=np.array(categories, dtype=str),
+            category_owner=np.array(owners, dtype=np.int64),
+            category_position=np.array(positions, dtype=np.int64),
+            numeric_categories=np.array(numeric_cats, dtype=bool),
+            cat_nan_index=np.array(self.cat_nan_index, dtype=np.int64),
+            num_offset=np.int64(self.num_offset),
+            n_features=np.int64(self.n_features),
+            sparse_output=np.bool_(self.sparse_output),
+            feature_names=np.array(self.feature_names, dtype=str),
+            dtype=np.array(self.dtype.str),
+            cat_ordinal=np.bool_(self.cat_ordinal),
+            cat_offset=np.int64(self.cat_offset),
+            missing_code=np.float64(self.missing_code),
+            unknown_code=np.float64(self.unknown_code),
+        )
+
+    def save(self, path):
+        np.savez(path, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as z:
+            return cls.from_arrays(z)
+
+    @classmethod
+    def from_arrays(cls, z):
+        # z: any mapping of the arrays written by to_arrays (an NpzFile, memmaps, ...)
+        cat_columns = [str(c) for c in z["cat_columns"]]
+        numeric_cats = np.asarray(z["numeric_categories"]).tolist()
+        cat_maps = [{} for _ in cat_columns]
+        # tolist() converts whole arrays at once; per-element access on memmaps is slow
+        for cat, owner, pos in zip(np.asarray(z["categories"]).tolist(), np.asarray(z["category_owner"]).tolist(),
+                                   np.asarray(z["category_position"]).tolist()):
+            cat_maps[owner][float(cat) if numeric_cats[owner] else cat] = pos
+        return cls(
+            num_columns=[str(c) for c in z["num_columns"]],
+            mean=z["mean"],
+            scale=z["scale"],
+            cat_columns=cat_columns,
+            cat_maps=cat_maps,
+            cat_nan_index=[int(i) for i in z["cat_nan_index"]],
+            num_offset=int(z["num_offset"]),
+            n_features=int(z["n_features"]),
+            sparse_output=bool(z["sparse_output"]),
+            feature_names=np.asarray(z["feature_names"]).tolist(),
+            dtype=np.dtype(str(z["dtype"])),
+            cat_ordinal=bool(z["cat_ordinal"]) if "cat_ordinal" in z else False,
+            cat_offset=int(z["cat_offset"]) if "cat_offset" in z else 0,
+            missing_code=float(z["missing_code"]) if "missing_code" in z else np.nan,
+            unknown_code=float(z["unknown_code"]) if "unknown_code" in z else np.nan,
+        )
+
+def compile_transformer(transformer, dtype=np.float32):
+    num = cat = None
+    for name, trans, cols in transformer.transformers_:
+        if name == "num":
+            num = (trans, list(cols))
+        elif name == "cat":
+            cat = (trans, list(cols))
+        elif name == "remainder" and trans != "drop":
+            raise ValueError("unsupported remainder: %r" % (trans,))
+        elif name not in ("remainder",):
+            raise ValueError("unsupported transformer: %s" % name)
+    offsets = transformer.output_indices_
+
+    num_columns, mean, scale, num_offset = [], [], [], 0
+    if num is not None:
+        scaler, num_columns = num
+        n = len(num_columns)
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(n)
+        scale = scaler.scale_ if scaler.with_std else np.ones(n)
+        num_offset = offsets["num"].start
+
+    cat_columns, cat_maps, cat_nan_index, cat_names = [], [], [], []
+    ordinal = {}
+    if cat is not None and isinstance(cat[0], OrdinalEncoder):
+        enc, cat_columns = cat
+        if getattr(enc, "_infrequent_enabled", False):
+            raise ValueError("OrdinalEncoder infrequent categories are not supported")
+        if enc.handle_unknown != "use_encoded_value":
+            raise ValueError("OrdinalEncoder must use handle_unknown='use_encoded_value'")
+        for categories in enc.categories_:
+            mapping, nan_idx = {}, -1
+            for code, c in enumerate(categories):
+                if _is_missing(c):
+                    nan_idx = code
+                else:
+                    mapping[c.item() if hasattr(c, "item") else c] = float(code)
+            cat_maps.append(mapping)
+            cat_nan_index.append(nan_idx)
+        cat_names = list(cat_columns)
+        ordinal = {"cat_ordinal": True, "cat_offset": offsets["cat"].start,
+                   "missing_code": enc.encoded_missing_value, "unknown_code": enc.unknown_value}
+    elif cat is not None:
+        ohe, cat_columns = cat
+        if ohe.drop_idx_ is not None or getattr(ohe, "_infrequent_enabled", False):
+            raise ValueError("OneHotEncoder drop/infrequent categories are not supported")
+        if ohe.handle_unknown != "ignore":
+            raise ValueError("OneHotEncoder must use handle_unknown='ignore'")
+        pos = offsets["cat"].start
+        for categories in ohe.categories_:
+            mapping, nan_idx = {}, -1
+            for c in categories:
+                if _is_missing(c):
+                    nan_idx = pos
+                else:
+                    mapping[c.item() if hasattr(c, "item") else c] = pos
+                pos += 1
+            cat_maps.append(mapping)
+            cat_nan_index.append(nan_idx)
+        cat_names = list(ohe.get_feature_names_out(cat_columns))
+
+    n_features = sum(s.stop - s.start for s in offsets.values())
+    return FeatureEncoder(
+        num_columns=num_columns,
+        mean=mean,
+        scale=scale,
+        cat_columns=cat_columns,
+        cat_maps=cat_maps,
+        cat_nan_index=cat_nan_index,
+        num_offset=num_offset,
+        n_features=n_features,
+        sparse_output=transformer.sparse_output_,
+        feature_names=list(num_columns) + cat_names,
+        dtype=dtype,
+        **ordinal
+    )
+
+def check_parity(transformer, encoder, records):
+    # bit-identical to the sklearn output cast to the encoder's dtype
+    expected = transformer.transform(records_to_frame(transformer, records))
+    got = encoder.transform(records)
+    if got.dtype != encoder.dtype or sparse.issparse(got) != sparse.issparse(expected):
+        return False
+    if not sparse.issparse(got):
+        return np.array_equal(got, np.asarray(expected).astype(encoder.dtype), equal_nan=True)
+    expected = sparse.csr_matrix(expected).astype(encoder.dtype)
+    expected.sort_indices()
+    got.sort_indices()
+    return (np.array_equal(got.indptr, expected.indptr)
+            and np.array_equal(got.indices, expected.indices)
+            and np.array_equal(got.data, expected.data, equal_nan=True))
+
+def main(argv=None):
+    import joblib
+    parser = argparse.ArgumentParser(description="Compile transformer.joblib into a NumPy feature encoder (.npz)")
+    parser.add_argument("transformer")
+    parser.add_argument("output")
+    parser.add_argument("--check-csv", help="also verify parity on the rows of this CSV")
+    args = parser.parse_args(argv)
+
+    transformer = joblib.load(args.transformer)
+    encoder = compile_transformer(transformer)
+    records = encoder.probe_records()
+    if args.check_csv:
+        df = pd.read_csv(args.check_csv)
+        records += df.astype(object).where(df.notna(), None).to_dict("records")
+    if not check_parity(transformer, encoder, records):
+        raise SystemExit("encoder output differs from the sklearn transformer")
+    encoder.save(args.output)
+    print("Encoder with %d features written to %s (parity checked on %d rows)" % (encoder.n_features, args.output, len(records)))
+
+if __name__ == "__main__":
+    main()
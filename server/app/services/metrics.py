@@ -0,0 +1,192 @@
+import bisect, hmac, os, re, sys, threading, time
+from collections import Counter
+from contextlib import contextmanager
+from flask import g, request
+
+# In-process latency histograms rendered in the Prometheus text format on
+# /metrics. Call sites time themselves with time.perf_counter() and call
+# observe(); one observation is a bisect and a few adds under a lock, cheap
+# enough for every request. Counts are per process: under gunicorn each worker
+# keeps its own and a scrape reads whichever worker answers.
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "http_request_duration_seconds": "Flask request latency by route",
+    "stage_duration_seconds": "Latency of one serving stage (predict path, auth hashing, transcription)",
+    "db_write_duration_seconds": "Bulk insert + commit of write-behind rows by table",
+}
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(pairs):
+    return "{%s}" % ",".join('%s="%s"' % (k, _escape(v)) for k, v in pairs) if pairs else ""
+
+def _number(value):
+    return "%d" % value if isinstance(value, int) else repr(float(value))
+
+class Metrics:
+    def __init__(self):
+        self.enabled = True
+        self.buckets = DEFAULT_BUCKETS
+        self._lock = threading.Lock()
+        # (name, ((label, value), ...)) -> [bucket counts..., +Inf count, sum]
+        self._series = {}
+
+    def init_app(self, app):
+        self.enabled = app.config.get("METRICS_ENABLED", self.enabled)
+        buckets = app.config.get("METRICS_BUCKETS")
+        if buckets:
+            self.buckets = tuple(sorted(float(b) for b in str(buckets).split(",") if b.strip()))
+        app.extensions["metrics"] = self
+        if self.enabled:
+            app.before_request(self._start_request)
+            app.after_request(self._finish_request)
+        RequestProfiler(app).install()
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += seconds
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def _start_request(self):
+        g._metrics_start = time.perf_counter()
+
+    def _finish_request(self, response):
+        start = g.pop("_metrics_start", None)
+        if start is not None:
+            # route template, not the raw path, keeps label cardinality bounded
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            self.observe("http_request_duration_seconds", time.perf_counter() - start,
+                         method=request.method, route=route, status=response.status_code)
+        return response
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(series) for key, series in self._series.items()}
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self, gauges=None):
+        # gauges: {metric name: number} from the components' stats(), appended as-is
+        lines = []
+        seen = set()
+        for (name, labels), series in sorted(self.snapshot().items()):
+            if name not in seen:
+                seen.add(name)
+                lines.append("# HELP %s %s" % (name, HELP.get(name, name)))
+                lines.append("# TYPE %s histogram" % name)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append("%s_bucket%s %d" % (name, _labels(labels + (("le", le),)), cumulative))
+            lines.append("%s_sum%s %s" % (name, _labels(labels), repr(series[-1])))
+            lines.append("%s_count%s %d" % (name, _labels(labels), cumulative))
+        for name, value in sorted((gauges or {}).items()):
+            lines.append("# TYPE %s gauge" % name)
+            lines.append("%s %s" % (name, _number(value)))
+        return "\n".join(lines) + "\n"
+
+def stats_gauges(prefix, stats):
+    # numeric fields of a component's stats() dict as flat gauge names
+    out = {}
+    for key, value in stats.items():
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, (int, float)):
+            out["%s_%s" % (prefix, re.sub(r"[^a-zA-Z0-9_]", "_", key))] = value
+    return out
+
+class StackSampler:
+    # Statistical profiler for one thread: a daemon thread reads the target's
+    # frame every interval and counts the folded call stack. The profiled code
+    # runs at full speed; the output is the "folded stacks" text that
+    # flamegraph.pl and speedscope read.
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("%s (%s:%d)" % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self):
+        return "".join("%s %d\n" % (stack, n) for stack, n in self.samples.most_common())
+
+class RequestProfiler:
+    # Opt-in per request: when PROFILE_REQUEST_TOKEN is set, a request sent with
+    # "X-Profile: <token>" is sampled and the folded stacks are written to
+    # PROFILE_DIR; the response names the file in X-Profile-File. Without the
+    # token nothing is installed, so there is no cost on normal traffic.
+
+    header = "X-Profile"
+
+    def __init__(self, app):
+        self.app = app
+        self.token = app.config.get("PROFILE_REQUEST_TOKEN") or ""
+        self.directory = app.config.get("PROFILE_DIR", "./profiles")
+        self.interval = app.config.get("PROFILE_INTERVAL_MS", 1.0) / 1000.0
+
+    def install(self):
+        if not self.token:
+            return
+        self.app.before_request(self._start)
+        self.app.after_request(self._finish)
+
+    def _start(self):
+        if hmac.compare_digest(request.headers.get(self.header, "").encode(), self.token.encode()):
+            g._profile_sampler = StackSampler(threading.get_ident(), self.interval).start()
+
+    def _finish(self, response):
+        sampler = g.pop("_profile_sampler", None)
+        if sampler is None:
+            return response
+        sampler.stop()
+        os.makedirs(self.directory, exist_ok=True)
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        name = "%d-%s.folded" % (time.time() * 1000, re.sub(r"[^a-zA-Z0-9]+", "_", route).strip("_"))
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as fh:
+            fh.write(sampler.folded())
+        response.headers["X-Profile-File"] = name
+        response.headers["X-Profile-Samples"] = str(sum(sampler.samples.values()))
+        return response
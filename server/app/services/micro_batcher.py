@@ -0,0 +1,64 @@
+import asyncio, threading
+
+# Coalesces concurrent awaits into one vectorized call. Items submitted with the
+# same key within max_wait_ms (or until max_batch items are waiting) are handed
+# to fn(key, items) together on an executor thread; each caller gets back its
+# own element of the returned list. Used by the ASGI app so single-row predicts
+# share one encoder + booster call.
+
+class MicroBatcher:
+    def __init__(self, fn, max_batch=256, max_wait_ms=2.0, executor=None):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stats = {"items": 0, "batches": 0, "max_batch_seen": 0}
+
+    async def submit(self, key, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = []
+            loop.call_later(self.max_wait, self._flush, key, batch)
+        batch.append((item, future))
+        if len(batch) >= self.max_batch:
+            self._flush(key, batch)
+        return await future
+
+    def _flush(self, key, batch):
+        # the timer of a batch that was already flushed (full) is a no-op
+        if self._pending.get(key) is not batch:
+            return
+        del self._pending[key]
+        with self._lock:
+            self._stats["items"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["max_batch_seen"] = max(self._stats["max_batch_seen"], len(batch))
+        loop = asyncio.get_running_loop()
+        task = loop.run_in_executor(self.executor, self.fn, key, [item for item, _ in batch])
+        task.add_done_callback(lambda done: self._resolve(batch, done))
+
+    @staticmethod
+    def _resolve(batch, done):
+        error = done.exception()
+        if error is None:
+            results = done.result()
+            if len(results) != len(batch):
+                error = RuntimeError("batch function returned %d results for %d items" % (len(results), len(batch)))
+        for i, (_, future) in enumerate(batch):
+            if future.done():  # caller went away (cancelled)
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[i])
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+        out["mean_batch"] = round(out["items"] / out["batches"], 2) if out["batches"] else 0.0
+        out["waiting"] = sum(len(b) for b in list(self._pending.values()))
+        return out
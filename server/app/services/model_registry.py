@@ -0,0 +1,337 @@
+import hashlib, os, random, threading, time, zlib, joblib, logging
+from collections import namedtuple
+from datetime import datetime
+from types import MappingProxyType
+import lightgbm as lgb
+from app.services.feature_encoder import FeatureEncoder, compile_transformer, check_parity
+from app.services.explain import transformer_feature_names
+from app.services.calibration import Calibrator
+from app.services.artifact_bundle import load_bundle, resolve_bundle
+from app.services.process_local import WorkerThread
+from app.services.rules import RuleSet, load_rules
+
+logger = logging.getLogger(__name__)
+
+# Immutable view of one loaded set of artifacts. Readers grab the whole tuple at once,
+# so a request never sees a model from one load and a transformer from another.
+# `rules` is the declarative fallback scorer served while `ready` is False;
+# `rules_error` says why RULES_PATH was not used, if it was not.
+class ModelArtifacts(namedtuple("ModelArtifacts", [
+        "model", "transformer", "encoder", "calibrator", "feature_names", "version", "loaded_at", "timings",
+        "rules", "rules_error"])):
+    __slots__ = ()
+
+    @property
+    def ready(self):
+        return self.model is not None and (self.encoder is not None or self.transformer is not None)
+
+def _timed(timings, key, fn, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        timings[key] = round((time.perf_counter() - start) * 1000.0, 3)
+
+def _load_booster(path):
+    try:
+        return lgb.Booster(model_file=path)
+    except Exception:
+        return joblib.load(path)
+
+def _file_version(paths):
+    # content hash of the artifact files, so every distinct model gets its own version
+    h = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                h.update(block)
+    return "lgb-" + h.hexdigest()
+
+def artifact_signature(cfg):
+    # cheap change detector for the watcher: (path, mtime, size) of the active bundle manifest.
+    # Only bundles are hot-reloaded: a version directory is renamed into place complete and
+    # CURRENT is swapped atomically. The file-per-artifact layout is written one file at a
+    # time, so a reload could pair a new encoder with an old model; it is read at startup only.
+    # RULES_PATH is always the last entry; a change to it alone reloads just the rule set.
+    bundle = resolve_bundle(cfg.get("ARTIFACT_BUNDLE_PATH"))
+    paths = [os.path.join(bundle, "manifest.json")] if bundle else []
+    paths = paths + [cfg.get("RULES_PATH")]
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            sig.append((path, st.st_mtime_ns, st.st_size))
+        except (OSError, TypeError):
+            sig.append((path, None, None))
+    return tuple(sig)
+
+def _load_isotonic(path):
+    return Calibrator.from_isotonic(joblib.load(path))
+
+def _compile_encoder(transformer, probe_rows):
+    try:
+        encoder = compile_transformer(transformer)
+    except Exception as e:
+        logger.warning("Transformer cannot be compiled, using sklearn path: %s", e)
+        return None
+    if not check_parity(transformer, encoder, encoder.probe_records(limit=probe_rows)):
+        logger.warning("Compiled encoder does not match the transformer, using sklearn path")
+        return None
+    return encoder
+
+def _load_rules(path, timings):
+    # -> (RuleSet, error or None); a broken rule file must never keep the model from loading,
+    # so it falls back to the packaged rule set
+    try:
+        return _timed(timings, "rules", load_rules, path), None
+    except Exception as e:
+        logger.error("Failed to load rules from %s, using the packaged rule set: %s", path, e)
+        return RuleSet.load(), "%s: %s" % (path, e)
+
+def _from_bundle(path, timings, start, rules, rules_error):
+    manifest, encoder, calibrator, model = _timed(timings, "bundle", load_bundle, path)
+    timings["total"] = round((time.perf_counter() - start) * 1000.0, 3)
+    return ModelArtifacts(
+        model=model,
+        transformer=None,
+        encoder=encoder,
+        calibrator=calibrator,
+        feature_names=tuple(encoder.feature_names),
+        version=manifest["version"],
+        loaded_at=datetime.utcnow(),
+        timings=MappingProxyType(timings),
+        rules=rules,
+        rules_error=rules_error,
+    )
+
+def load_artifacts(cfg):
+    timings = {}
+    start = time.perf_counter()
+    rules, rules_error = _load_rules(cfg.get("RULES_PATH"), timings)
+    # a bundle, when present, replaces the file-per-artifact layout below
+    bundle = resolve_bundle(cfg.get("ARTIFACT_BUNDLE_PATH"))
+    if bundle is not None:
+        return _from_bundle(bundle, timings, start, rules, rules_error)
+
+    epath = cfg.get("ENCODER_PATH")
+    tpath = cfg.get("TRANSFORMER_PATH")
+    mpath = cfg.get("MODEL_PATH")
+    cpath = cfg.get("CALIBRATION_PATH")
+    isopath = cfg.get("ISO_PATH")
+
+    transformer = encoder = model = calibrator = None
+    used = []
+    if epath and os.path.exists(epath):
+        # exported encoder already parity-checked by `python -m app.services.feature_encoder`
+        encoder = _timed(timings, "encoder", FeatureEncoder.load, epath)
+        used.append(epath)
+    elif tpath and os.path.exists(tpath):
+        transformer = _timed(timings, "transformer", joblib.load, tpath)
+        encoder = _timed(timings, "encoder", _compile_encoder, transformer, cfg.get("ENCODER_PROBE_ROWS", 256))
+        used.append(tpath)
+    if mpath and os.path.exists(mpath):
+        model = _timed(timings, "model", _load_booster, mpath)
+        used.append(mpath)
+    if cpath and os.path.exists(cpath):
+        calibrator = _timed(timings, "calibration", Calibrator.load, cpath)
+        used.append(cpath)
+    elif isopath and os.path.exists(isopath):
+        # older artifact sets ship a fitted IsotonicRegression; serve it as the same table
+        calibrator = _timed(timings, "calibration", _load_isotonic, isopath)
+        used.append(isopath)
+
+    # names of the encoded columns, used to label explanations
+    if encoder is not None:
+        feature_names = encoder.feature_names
+    elif transformer is not None:
+        feature_names = transformer_feature_names(transformer)
+    elif model is not None:
+        feature_names = model.feature_name()
+    else:
+        feature_names = []
+    timings["total"] = round((time.perf_counter() - start) * 1000.0, 3)
+
+    return ModelArtifacts(
+        model=model,
+        transformer=transformer,
+        encoder=encoder,
+        calibrator=calibrator,
+        feature_names=tuple(feature_names),
+        version=_file_version(used) if model is not None else "stub",
+        loaded_at=datetime.utcnow(),
+        timings=MappingProxyType(timings),
+        rules=rules,
+        rules_error=rules_error,
+    )
+
+class ModelRegistry:
+    # Holds the primary artifacts and an optional candidate. A watcher thread
+    # polls artifact_signature() every MODEL_RELOAD_INTERVAL seconds and swaps
+    # in a new bundle (or rule set); requests keep using the tuple they already grabbed.
+    # The candidate (MODEL_CANDIDATE_PATH, a bundle) either takes
+    # MODEL_CANDIDATE_PERCENT of traffic ("split") or is scored next to the
+    # primary off the request path ("shadow").
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._artifacts = None
+        self._candidate = None
+        self._error = None
+        self._listeners = []
+        self._cfg = {}
+        self._signature = None
+        self._candidate_signature = None
+        self.reload_interval = 0
+        self.candidate_mode = "shadow"
+        self.candidate_percent = 0.0
+        self._watcher = WorkerThread(self._watch, "model-watcher")
+
+    def init_app(self, app):
+        app.extensions["model_registry"] = self
+        self._cfg = app.config
+        self.reload_interval = app.config.get("MODEL_RELOAD_INTERVAL", self.reload_interval)
+        self.candidate_mode = app.config.get("MODEL_CANDIDATE_MODE", self.candidate_mode)
+        self.candidate_percent = app.config.get("MODEL_CANDIDATE_PERCENT", self.candidate_percent)
+        try:
+            self.load(app.config)
+        except Exception as e:
+            # keep serving (heuristic fallback) and report through /api/ready
+            app.logger.error("Failed to load model artifacts: %s", e)
+        try:
+            self.load_candidate(app.config.get("MODEL_CANDIDATE_PATH"))
+        except Exception as e:
+            app.logger.error("Failed to load candidate model: %s", e)
+        self._ensure_watcher()
+
+    def load(self, cfg):
+        # serialize loads so concurrent callers don't each hit disk
+        with self._lock:
+            signature = artifact_signature(cfg)
+            try:
+                artifacts = load_artifacts(cfg)
+            except Exception as e:
+                self._error = str(e)
+                raise
+            self._artifacts = artifacts
+            self._signature = signature
+            self._error = None
+        for listener in list(self._listeners):
+            listener(artifacts)
+        return artifacts
+
+    def reload_rules(self, cfg):
+        # swap a new rule set into the artifacts being served, leaving the model files unread
+        with self._lock:
+            signature = artifact_signature(cfg)
+            timings = {}
+            rules, rules_error = _load_rules(cfg.get("RULES_PATH"), timings)
+            artifacts = self._artifacts._replace(rules=rules, rules_error=rules_error,
+                                                 timings=MappingProxyType({**self._artifacts.timings, **timings}))
+            self._artifacts = artifacts
+            self._signature = signature
+        for listener in list(self._listeners):
+            listener(artifacts)
+        return artifacts
+
+    def load_candidate(self, path):
+        with self._lock:
+            if not path:
+                self._candidate, self._candidate_signature = None, None
+                return None
+            signature = artifact_signature({"ARTIFACT_BUNDLE_PATH": path})
+            bundle = resolve_bundle(path)
+            candidate = load_artifacts({"ARTIFACT_BUNDLE_PATH": path}) if bundle else None
+            self._candidate, self._candidate_signature = candidate, signature
+            return candidate
+
+    def check_for_updates(self):
+        # reload whatever changed on disk; a failed load keeps the artifacts being served
+        signature = artifact_signature(self._cfg)
+        if (signature != self._signature and self._artifacts is not None and self._signature is not None
+                and signature[:-1] == self._signature[:-1]):
+            art = self.reload_rules(self._cfg)
+            logger.info("Reloaded rules%s", " (%s)" % art.rules_error if art.rules_error else "")
+        elif signature != self._signature:
+            try:
+                art = self.load(self._cfg)
+                logger.info("Loaded model %s", art.version)
+            except Exception as e:
+                logger.error("Model reload failed, keeping %s: %s", self._version(self._artifacts), e)
+        path = self._cfg.get("MODEL_CANDIDATE_PATH")
+        if path and artifact_signature({"ARTIFACT_BUNDLE_PATH": path}) != self._candidate_signature:
+            try:
+                art = self.load_candidate(path)
+                logger.info("Loaded candidate model %s", self._version(art))
+            except Exception as e:
+                logger.error("Candidate reload failed: %s", e)
+
+    def _ensure_watcher(self):
+        if self.reload_interval:
+            self._watcher.ensure()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.reload_interval)
+            try:
+                self.check_for_updates()
+            except Exception as e:
+                logger.error("Model watcher error: %s", e)
+
+    def on_load(self, listener):
+        # called with the new ModelArtifacts after every successful load
+        self._listeners.append(listener)
+
+    def get(self):
+        # plain attribute read: the reference swap in load() is atomic
+        if not self._watcher.alive:
+            self._ensure_watcher()
+        return self._artifacts
+
+    def route(self, key=None):
+        # artifacts that serve this request: the candidate for its traffic share in split mode.
+        # Keyed requests (user id) hash to a stable bucket so a user sees one model.
+        art = self.get()
+        candidate = self._candidate
+        if candidate is None or not candidate.ready or self.candidate_mode != "split" or self.candidate_percent <= 0:
+            return art
+        if key is None:
+            bucket = random.random() * 100.0
+        else:
+            bucket = zlib.crc32(str(key).encode("utf-8")) % 10000 / 100.0
+        return candidate if bucket < self.candidate_percent else art
+
+    def shadow(self):
+        candidate = self._candidate
+        if candidate is None or not candidate.ready or self.candidate_mode != "shadow":
+            return None
+        return candidate
+
+    @property
+    def ready(self):
+        art = self._artifacts
+        return art is not None and art.ready
+
+    @staticmethod
+    def _version(art):
+        return art.version if art is not None and art.ready else "stub"
+
+    def status(self):
+        art = self._artifacts
+        ready = art is not None and art.ready
+        candidate = self._candidate
+        return {
+            "ready": ready,
+            "model_version": self._version(art),
+            "loaded_at": art.loaded_at.isoformat() if art else None,
+            "load_timings_ms": dict(art.timings) if art else {},
+            "error": self._error,
+            "rules_version": art.rules.version if art is not None and art.rules is not None else None,
+            "rules_error": art.rules_error if art is not None else None,
+            "reload_interval": self.reload_interval,
+            "candidate": {
+                "model_version": self._version(candidate),
+                "mode": self.candidate_mode,
+                "percent": self.candidate_percent if self.candidate_mode == "split" else None,
+                "loaded_at": candidate.loaded_at.isoformat(),
+            } if candidate is not None else None,
+        }
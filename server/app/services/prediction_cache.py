@@ -0,0 +1,39 @@
+import hashlib, math
+from app.services.ttl_cache import TTLCache
+
+def _canonical(value, numeric):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if numeric:
+        # 700, 700.0 and "700" all encode to the same feature value
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None
+        return None if math.isnan(value) else value
+    return value if isinstance(value, str) else repr(value)
+
+def feature_key(record, num_columns, cat_columns, *extra):
+    # only the columns the model reads take part in the key, so timestamps,
+    # email, role etc. in the merged profile never cause a miss
+    parts = [_canonical(record.get(c), True) for c in num_columns]
+    parts += [_canonical(record.get(c), False) for c in cat_columns]
+    parts.extend(extra)
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+class PredictionCache(TTLCache):
+    # result dicts are copied in and out, so callers can't mutate a cached entry
+
+    def init_app(self, app, registry):
+        self.maxsize = app.config.get("PREDICTION_CACHE_SIZE", self.maxsize)
+        self.ttl = app.config.get("PREDICTION_CACHE_TTL", self.ttl)
+        app.extensions["prediction_cache"] = self
+        # cached results belong to the artifacts that produced them
+        registry.on_load(lambda artifacts: self.clear())
+
+    def get(self, key):
+        value = super().get(key)
+        return dict(value) if value is not None else None
+
+    def set(self, key, value):
+        return super().set(key, dict(value))
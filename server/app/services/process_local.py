@@ -0,0 +1,55 @@
+import os, threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Threads and executors don't survive fork() (gunicorn --preload, uvicorn --workers),
+# so background workers are held per process and (re)created on first use in each one.
+
+class WorkerThread:
+    # one daemon thread running target() per process
+    def __init__(self, target, name):
+        self.target = target
+        self.name = name
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self):
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def ensure(self, on_start=None):
+        # starts the thread unless it already runs in this process; on_start() runs first
+        if self.alive:
+            return False
+        with self._lock:
+            if self.alive:
+                return False
+            if on_start is not None:
+                on_start()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+            self._thread.start()
+            return True
+
+    def join(self, timeout=None):
+        if self.alive:
+            self._thread.join(timeout)
+
+class ProcessPool:
+    # ProcessPoolExecutor created on first use in each process, and replaced once it
+    # has broken (a worker process died)
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid() or getattr(self._executor, "_broken", False):
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, fn, *args, **kwargs):
+        return self.get().submit(fn, *args, **kwargs)
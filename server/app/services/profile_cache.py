@@ -0,0 +1,64 @@
+from app.services.ttl_cache import TTLCache
+
+class ProfileSnapshot:
+    # Compact, read-only copy of the model-relevant part of a User row
+    # (authorization data such as role is never cached here)
+    __slots__ = ("user_id", "values")
+
+    def __init__(self, user_id, values):
+        self.user_id = user_id
+        self.values = tuple(values)
+
+    def as_dict(self):
+        from app.models import PROFILE_FIELDS
+        return dict(zip(PROFILE_FIELDS, self.values))
+
+class ProfileCache(TTLCache):
+    # Per-process LRU of ProfileSnapshots. Profile writes (signup, update_profile)
+    # replace the entry; PROFILE_CACHE_TTL bounds staleness across workers.
+
+    def __init__(self):
+        super().__init__(maxsize=50000, ttl=300)
+
+    def init_app(self, app):
+        self.maxsize = app.config.get("PROFILE_CACHE_SIZE", self.maxsize)
+        self.ttl = app.config.get("PROFILE_CACHE_TTL", self.ttl)
+        app.extensions["profile_cache"] = self
+
+    def get(self, user_id):
+        snap = self.peek(user_id)
+        if snap is not None:
+            return snap
+        try:
+            return self._load(int(user_id))
+        except (TypeError, ValueError):
+            return None
+
+    def peek(self, user_id):
+        # cached snapshot or None, without touching the database (async callers load it themselves)
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        return super().get(user_id)
+
+    def _load(self, user_id):
+        from app.extensions import db
+        from app.models import User, PROFILE_FIELDS
+        # select only the columns the snapshot keeps, not the whole ORM row
+        columns = [getattr(User, f) for f in PROFILE_FIELDS]
+        row = db.session.query(*columns).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        return self.put(user_id, row)
+
+    def store(self, user):
+        # refresh from an ORM object the caller just wrote
+        from app.models import PROFILE_FIELDS
+        return self.put(user.id, [getattr(user, f) for f in PROFILE_FIELDS])
+
+    def invalidate(self, user_id):
+        self.pop(int(user_id))
+
+    def put(self, user_id, values):
+        return self.set(user_id, ProfileSnapshot(user_id, values))
@@ -0,0 +1,199 @@
+import ast, hashlib, json, operator, os
+import numpy as np
+from app.services.feature_encoder import _to_float
+
+# Declarative scorer used when no model is loaded. A rule set (JSON, shipped next
+# to the model artifacts) declares its inputs with defaults, derived columns and
+# rules; every expression is compiled once into NumPy operations on whole columns,
+# so a batch costs the same handful of array ops whatever its size.
+#
+#   {"intercept": 1.0, "threshold": 0.5,
+#    "inputs":  {"credit_score": {"default": 600, "zero_is_missing": true},
+#                "employment_type": {"type": "category"}},
+#    "derived": {"dti": "loan_amount / max(repayment_term_months, 1) / max(annual_salary / 12, 1)"},
+#    "rules":   [{"name": "high_dti", "feature": "dti", "when": "dti > 1.0", "weight": -3.0,
+#                 "knockout": true, "reason": "High DTI"}, ...]}
+#
+# probability = sigmoid(intercept + sum of the weights of the rules that fire);
+# the fired weights, summed per feature, are the explanation. A knockout rule
+# rejects on its own and the first one that fires gives the reason.
+# A missing or unparseable input takes its default; with "zero_is_missing" so does 0,
+# as it did in the original heuristic's `value or default`.
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "rules.json")
+
+_BINARY = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+_COMPARE = {ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+            ast.Eq: operator.eq, ast.NotEq: operator.ne}
+_CALLS = {"min": np.minimum, "max": np.maximum, "abs": np.abs, "log1p": np.log1p}
+
+def compile_expression(source, names):
+    # "a / max(b, 1) > 0.5 and c == 'x'" -> fn(columns) -> array; only arithmetic,
+    # comparisons, and/or/not, min/max/abs/log1p and names in `names`
+    def build(node):
+        if isinstance(node, ast.Expression):
+            return build(node.body)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)) \
+                and not isinstance(node.value, bool):
+            value = node.value
+            return lambda cols: value
+        if isinstance(node, ast.Name):
+            if node.id not in names:
+                raise ValueError("unknown name %r in %r" % (node.id, source))
+            name = node.id
+            return lambda cols: cols[name]
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+            op, left, right = _BINARY[type(node.op)], build(node.left), build(node.right)
+            return lambda cols: op(left(cols), right(cols))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            operand = build(node.operand)
+            return lambda cols: np.negative(operand(cols))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            operand = build(node.operand)
+            return lambda cols: np.logical_not(operand(cols))
+        if isinstance(node, ast.BoolOp):
+            op = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            parts = [build(v) for v in node.values]
+            def boolop(cols):
+                out = parts[0](cols)
+                for part in parts[1:]:
+                    out = op(out, part(cols))
+                return out
+            return boolop
+        if isinstance(node, ast.Compare) and all(type(o) in _COMPARE for o in node.ops):
+            terms = [build(node.left)] + [build(c) for c in node.comparators]
+            ops = [_COMPARE[type(o)] for o in node.ops]
+            def compare(cols):
+                values = [t(cols) for t in terms]
+                out = ops[0](values[0], values[1])
+                for i in range(1, len(ops)):
+                    out = np.logical_and(out, ops[i](values[i], values[i + 1]))
+                return out
+            return compare
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _CALLS \
+                and not node.keywords:
+            fn, args = _CALLS[node.func.id], [build(a) for a in node.args]
+            return lambda cols: fn(*[a(cols) for a in args])
+        raise ValueError("unsupported expression %r" % source)
+
+    return build(ast.parse(source, mode="eval"))
+
+def _float_column(values, default):
+    try:
+        col = np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        col = np.array([_to_float(v) for v in values], dtype=np.float64)
+    col[np.isnan(col)] = default
+    return col
+
+class RuleSet:
+    def __init__(self, spec):
+        self.spec = spec
+        self.intercept = float(spec.get("intercept", 0.0))
+        self.threshold = float(spec.get("threshold", 0.5))
+        self.inputs = {name: dict(opts or {}) for name, opts in spec.get("inputs", {}).items()}
+        names = set(self.inputs)
+        self.derived = []
+        for name, source in spec.get("derived", {}).items():
+            self.derived.append((name, compile_expression(source, names)))
+            names.add(name)
+
+        self.rules = []
+        for rule in spec.get("rules", []):
+            weight = rule.get("weight", 0.0)
+            self.rules.append({
+                "name": rule["name"],
+                "feature": rule.get("feature", rule["name"]),
+                "when": compile_expression(rule["when"], names),
+                "weight": compile_expression(weight, names) if isinstance(weight, str) else float(weight),
+                "knockout": bool(rule.get("knockout")),
+                "reason": rule.get("reason", ""),
+            })
+        if not self.rules:
+            raise ValueError("rule set has no rules")
+        # contributions are reported per feature: rule columns summed into feature columns
+        self.features = list(dict.fromkeys(r["feature"] for r in self.rules))
+        self._feature_of = np.array([self.features.index(r["feature"]) for r in self.rules])
+        self._knockouts = np.array([r["knockout"] for r in self.rules], dtype=bool)
+        self._knockout_index = np.flatnonzero(self._knockouts)
+        self._weights = np.array([0.0 if callable(r["weight"]) else r["weight"] for r in self.rules])
+        self._weight_fns = [(j, r["weight"]) for j, r in enumerate(self.rules) if callable(r["weight"])]
+        self._reasons = [r["reason"] for r in self.rules]
+        digest = hashlib.blake2b(json.dumps(spec, sort_keys=True).encode("utf-8"), digest_size=8).hexdigest()
+        self.version = "rules-" + digest
+
+    @classmethod
+    def load(cls, path=None):
+        with open(path or DEFAULT_RULES_PATH, encoding="utf-8") as fh:
+            return cls(json.load(fh))
+
+    def columns(self, records):
+        cols = {}
+        for name, opts in self.inputs.items():
+            values = [r.get(name) for r in records]
+            if opts.get("type") == "category":
+                default = opts.get("default")
+                cols[name] = np.array([default if v is None else v for v in values], dtype=object)
+            else:
+                default = float(opts.get("default", 0.0))
+                cols[name] = _float_column(values, default)
+                if opts.get("zero_is_missing"):
+                    cols[name][cols[name] == 0] = default
+        for name, fn in self.derived:
+            value = np.asarray(fn(cols), dtype=np.float64)
+            cols[name] = value if value.ndim else np.full(len(records), value)
+        return cols
+
+    def evaluate(self, records):
+        # -> (probability, contributions (rules x n), first knockout rule per row or -1)
+        n = len(records)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            cols = self.columns(records)
+            fired = np.empty((len(self.rules), n), dtype=bool)
+            for j, rule in enumerate(self.rules):
+                fired[j] = rule["when"](cols)
+            weights = self._weights[:, None]
+            if self._weight_fns:
+                weights = np.repeat(weights, n, axis=1)
+                for j, fn in self._weight_fns:
+                    weights[j] = fn(cols)
+            contrib = np.where(fired, weights, 0.0)
+            contrib[~np.isfinite(contrib)] = 0.0
+            # summed in rule order, not with sum(): a single row gets bit-identical results to a batch
+            logit = np.full(n, self.intercept)
+            for row in contrib:
+                logit += row
+            prob = 1.0 / (1.0 + np.exp(-logit))
+        knocked = fired[self._knockouts]
+        first = np.where(knocked.any(axis=0), self._knockout_index[knocked.argmax(axis=0)], -1) \
+            if len(self._knockout_index) else np.full(n, -1)
+        return prob, contrib, first
+
+    def probabilities(self, records):
+        return self.evaluate(records)[0]
+
+    def explain(self, contrib, top_k=3):
+        # per-row [(feature, contribution)] of the fired rules, largest |contribution| first
+        per_feature = np.zeros((len(self.features), contrib.shape[1]))
+        for f, row in zip(self._feature_of, contrib):
+            per_feature[f] += row
+        per_feature = per_feature.T
+        order = np.argsort(-np.abs(per_feature), axis=1, kind="stable")[:, :top_k]
+        values = np.take_along_axis(per_feature, order, axis=1).tolist()
+        names = self.features
+        return [[(names[c], v) for c, v in zip(row_order, row_values) if v != 0]
+                for row_order, row_values in zip(order.tolist(), values)]
+
+    def score(self, records, explain=True, top_k=3):
+        # same result dicts as the model path
+        prob, contrib, first = self.evaluate(records)
+        shap_top3 = self.explain(contrib, top_k) if explain else [[] for _ in records]
+        approved = ((first < 0) & (prob >= self.threshold)).tolist()
+        reasons = [""] + self._reasons
+        return [{"decision": "Approved" if ok else "Rejected", "probability": p, "reason": reasons[k + 1],
+                 "shap_top3": top, "model_version": self.version}
+                for ok, p, k, top in zip(approved, prob.tolist(), first.tolist(), shap_top3)]
+
+def load_rules(path):
+    # rule set at `path` when it exists, else the packaged default
+    return RuleSet.load(path if path and os.path.exists(path) else None)
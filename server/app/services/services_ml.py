@@ -1,85 +1,143 @@
-import os, joblib, numpy as np
-from collections import OrderedDict
-import lightgbm as lgb
-from flask import current_app
+import time
+import numpy as np
+from app.extensions import model_registry, prediction_cache, shadow_scorer, metrics
+from app.services.feature_encoder import records_to_frame
+from app.services.analytics import SHADOW_PREFIX
+from app.services.explain import top_k_contributions
+from app.services.prediction_cache import feature_key
+from app.services.rules import RuleSet
 
-MODEL = None
-TRANSFORMER = None
-ISO = None
-SHAP_EXPLAINER = None
+_default_rules = None
 
-def load_artifacts():
-    global MODEL, TRANSFORMER, ISO, SHAP_EXPLAINER
-    cfg = current_app.config
-    tpath = cfg.get("TRANSFORMER_PATH")
-    mpath = cfg.get("MODEL_PATH")
-    isopath = cfg.get("ISO_PATH")
-    shap_path = cfg.get("SHAP_EXPLAINER_PATH")
+def fallback_rules(art):
+    # the rule set loaded with the artifacts; the packaged one if nothing could be loaded
+    global _default_rules
+    if art is not None and art.rules is not None:
+        return art.rules
+    if _default_rules is None:
+        _default_rules = RuleSet.load()
+    return _default_rules
 
-    if tpath and os.path.exists(tpath):
-        TRANSFORMER = joblib.load(tpath)
-    if mpath and os.path.exists(mpath):
-        try:
-            MODEL = lgb.Booster(model_file=mpath)
-        except Exception:
-            MODEL = joblib.load(mpath)
-    if isopath and os.path.exists(isopath):
-        ISO = joblib.load(isopath)
-    if shap_path and os.path.exists(shap_path):
-        SHAP_EXPLAINER = joblib.load(shap_path)
-    return TRANSFORMER, MODEL, ISO, SHAP_EXPLAINER
+def _input_columns(art):
+    if art.encoder is not None:
+        return art.encoder.num_columns, art.encoder.cat_columns
+    num, cat = [], []
+    for name, _, cols in art.transformer.transformers_:
+        if name == "num":
+            num = list(cols)
+        elif name == "cat":
+            cat = list(cols)
+    return num, cat
 
-def predict(input_dict):
-    # Load artifacts lazily
-    global MODEL, TRANSFORMER, ISO, SHAP_EXPLAINER
-    if MODEL is None or TRANSFORMER is None:
-        try:
-            load_artifacts()
-        except Exception:
-            pass
-
-    # If no real model, return a deterministic heuristic (useful for dev)
-    if MODEL is None or TRANSFORMER is None:
-        credit = int(input_dict.get("credit_score") or 600)
-        loan_amount = float(input_dict.get("loan_amount") or 0)
-        salary = float(input_dict.get("annual_salary") or 1)
-        monthly = salary / 12.0
-        projected = loan_amount / max(int(input_dict.get("repayment_term_months") or 1), 1)
-        dti = projected / max(monthly, 1)
-        reason = ""
-        if credit < 580:
-            decision = "Rejected"; reason = "Low credit score"
-        elif dti > 1.0:
-            decision = "Rejected"; reason = "High DTI"
-        else:
-            decision = "Approved"
-        shap_stub = OrderedDict([("credit_score", 0.5), ("dti", -0.3), ("loan_amount", -0.2)])
-        prob = 0.6 if decision == "Approved" else 0.3
-        return {"decision": decision, "probability": prob, "reason": reason, "shap_top3": list(shap_stub.items()), "model_version": "stub"}
-
-    # Real model path: transform -> predict -> calibrate -> shap
+def score_records(art, records, explain, top_k, strict=False):
+    # Real model path: encode -> predict -> calibrate -> shap for all rows.
+    # Serving turns a failure into predict_error rows; strict (offline scoring) re-raises
     try:
-        import pandas as pd
-        X_df = pd.DataFrame([input_dict])
-        X_t = TRANSFORMER.transform(X_df)
-        raw = float(MODEL.predict(X_t)[0])
-        prob = float(ISO.predict([raw])[0]) if ISO is not None else raw
-        decision = "Approved" if prob >= 0.5 else "Rejected"
+        t0 = time.perf_counter()
+        if art.encoder is not None:
+            X_t = art.encoder.transform(records)
+        else:
+            frame = records_to_frame(art.transformer, records)
+            t_frame = time.perf_counter()
+            metrics.observe("stage_duration_seconds", t_frame - t0, stage="frame")
+            # transform is timed from here, so it does not count the frame build again
+            t0 = t_frame
+            X_t = art.transformer.transform(frame)
+        t1 = time.perf_counter()
+        raw = np.asarray(art.model.predict(X_t), dtype=float)
+        t2 = time.perf_counter()
+        prob = art.calibrator(raw) if art.calibrator is not None else raw
+        t3 = time.perf_counter()
+        metrics.observe("stage_duration_seconds", t1 - t0, stage="transform")
+        metrics.observe("stage_duration_seconds", t2 - t1, stage="predict")
+        metrics.observe("stage_duration_seconds", t3 - t2, stage="calibrate")
 
-        shap_top3 = []
-        if SHAP_EXPLAINER is not None:
+        # native TreeSHAP from the booster; skipped entirely when the caller opts out
+        shap_top3 = [[] for _ in records]
+        if explain:
             try:
-                sv = SHAP_EXPLAINER.shap_values(X_t)
-                if isinstance(sv, list) and len(sv) == 2:
-                    arr = sv[1][0]
-                else:
-                    arr = np.array(sv)[0]
-                idx = np.argsort(-np.abs(arr))[:3]
-                for i in idx:
-                    shap_top3.append((f"f{i}", float(arr[i])))
+                shap_top3 = top_k_contributions(art.model, X_t, art.feature_names, top_k)
             except Exception:
-                shap_top3 = []
+                pass
+            metrics.observe("stage_duration_seconds", time.perf_counter() - t3, stage="shap")
 
-        return {"decision": decision, "probability": prob, "reason": "", "shap_top3": shap_top3, "model_version": "lgb"}
+        return [
+            {"decision": "Approved" if p >= 0.5 else "Rejected", "probability": float(p), "reason": "",
+             "shap_top3": shap_top3[i], "model_version": art.version}
+            for i, p in enumerate(prob)
+        ]
     except Exception as e:
-        return {"decision": "Rejected", "probability": 0.0, "reason": f"predict_error:{e}", "shap_top3": [], "model_version": "error"}
+        if strict:
+            raise
+        return [{"decision": "Rejected", "probability": 0.0, "reason": f"predict_error:{e}", "shap_top3": [], "model_version": "error"}
+                for _ in records]
+
+def score_variants(art, record, columns, values):
+    # approval probabilities for `record` with `columns` set to each row of `values`,
+    # scored in one predict + calibration call without building per-row dicts
+    if art is None or not art.ready or art.encoder is None:
+        variants = [dict(record, **dict(zip(columns, row))) for row in np.asarray(values, dtype=object).tolist()]
+        if art is None or not art.ready:
+            return fallback_rules(art).probabilities(variants)
+        return np.array([r["probability"] for r in score_records(art, variants, False, 0)])
+    t0 = time.perf_counter()
+    X = art.encoder.transform_variants(record, columns, values)
+    t1 = time.perf_counter()
+    raw = np.asarray(art.model.predict(X), dtype=float)
+    t2 = time.perf_counter()
+    prob = art.calibrator(raw) if art.calibrator is not None else raw
+    metrics.observe("stage_duration_seconds", t1 - t0, stage="transform")
+    metrics.observe("stage_duration_seconds", t2 - t1, stage="predict")
+    metrics.observe("stage_duration_seconds", time.perf_counter() - t2, stage="calibrate")
+    return prob
+
+def _score_shadow(art, records, explain, top_k):
+    results = score_records(art, records, explain, top_k)
+    for res in results:
+        res["model_version"] = SHADOW_PREFIX + res["model_version"]
+    return results
+
+def predict_batch(records, explain=True, top_k=3, route_key=None, on_shadow=None):
+    # route_key: stable id (user) for split traffic; on_shadow: callback that receives
+    # the shadow candidate's results on the background scorer thread
+    if not records:
+        return []
+
+    # Artifacts are loaded once by create_app (and swapped by the watcher); never touch disk here
+    art = model_registry.route(route_key)
+    results = score_cached(art, records, explain, top_k)
+    if on_shadow is not None:
+        submit_shadow(art, records, explain, top_k, on_shadow)
+    return results
+
+def submit_shadow(art, records, explain, top_k, on_shadow):
+    candidate = model_registry.shadow()
+    if candidate is not None and candidate is not art:
+        shadow_scorer.submit(_score_shadow, (candidate, records, explain, top_k), on_shadow)
+
+def score_cached(art, records, explain, top_k):
+    # If no real model, score the whole batch with the declarative rule set (dev, model outages)
+    if art is None or not art.ready:
+        t0 = time.perf_counter()
+        results = fallback_rules(art).score(records, explain, top_k)
+        metrics.observe("stage_duration_seconds", time.perf_counter() - t0, stage="rules")
+        return results
+
+    if not prediction_cache.enabled:
+        return score_records(art, records, explain, top_k)
+
+    # serve repeated feature vectors from the cache, score only the misses in one batch
+    num_cols, cat_cols = _input_columns(art)
+    keys = [feature_key(r, num_cols, cat_cols, art.version, explain, top_k) for r in records]
+    results = [prediction_cache.get(k) for k in keys]
+    missing = [i for i, res in enumerate(results) if res is None]
+    if missing:
+        scored = score_records(art, [records[i] for i in missing], explain, top_k)
+        for i, res in zip(missing, scored):
+            results[i] = res
+            if res.get("model_version") != "error":
+                prediction_cache.set(keys[i], res)
+    return results
+
+def predict(input_dict, explain=True, top_k=3, route_key=None, on_shadow=None):
+    return predict_batch([input_dict], explain=explain, top_k=top_k, route_key=route_key, on_shadow=on_shadow)[0]
@@ -0,0 +1,56 @@
+import logging, threading, time
+from collections import deque
+from app.services.process_local import WorkerThread
+
+logger = logging.getLogger(__name__)
+
+# Background scoring for the shadow candidate model. The request thread only
+# appends (fn, args, callback) to a bounded deque; one daemon thread per process
+# runs fn(*args) and hands the results to callback (e.g. a PredictionHistory
+# write). When SHADOW_MAX_PENDING jobs are already waiting, new ones are dropped
+# rather than slowing down the primary path.
+
+class ShadowScorer:
+    def __init__(self):
+        self.max_pending = 256
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._worker = WorkerThread(self._run, "shadow-scorer")
+        self._stats = {"submitted": 0, "scored": 0, "dropped": 0, "failed": 0, "last_ms": 0.0}
+
+    def init_app(self, app):
+        self.max_pending = app.config.get("SHADOW_MAX_PENDING", self.max_pending)
+        app.extensions["shadow_scorer"] = self
+
+    def submit(self, fn, args, callback):
+        self._worker.ensure()
+        with self._cond:
+            if len(self._pending) >= self.max_pending:
+                self._stats["dropped"] += 1
+                return False
+            self._pending.append((fn, args, callback))
+            self._stats["submitted"] += 1
+            self._cond.notify()
+            return True
+
+    def stats(self):
+        with self._cond:
+            out = dict(self._stats)
+            out.update({"depth": len(self._pending), "max_pending": self.max_pending})
+            return out
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                fn, args, callback = self._pending.popleft()
+            start = time.perf_counter()
+            try:
+                callback(fn(*args))
+                key = "scored"
+            except Exception as e:
+                logger.warning("Shadow scoring failed: %s", e)
+                key = "failed"
+            with self._cond:
+                self._stats[key] += 1
+                self._stats["last_ms"] = round((time.perf_counter() - start) * 1000.0, 3)
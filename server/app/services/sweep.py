@@ -0,0 +1,79 @@
+import math, time
+import numpy as np
+from app.models import PROFILE_FIELDS
+from app.services.services_ml import fallback_rules, score_variants
+
+# Sensitivity sweeps for charts: approval probability over a 1-D or 2-D grid of
+# one or two inputs around a base profile. The whole grid is scored in one
+# score_variants call (base row encoded once, only the swept columns rewritten),
+# and comes back as plain arrays: axes[i]["values"] and probabilities[i][j].
+
+MAX_AXES = 2
+MAX_STEPS = 1000
+
+def _axis_values(spec):
+    # {"field", "values": [...]} or {"field", "start", "stop", "steps"} -> list of inputs
+    if "values" in spec:
+        values = spec["values"]
+        if not isinstance(values, list) or not values:
+            raise ValueError("values must be a non-empty list")
+        if len(values) > MAX_STEPS:
+            raise ValueError("at most %d values per axis" % MAX_STEPS)
+        if any(isinstance(v, float) and not math.isfinite(v) for v in values):
+            raise ValueError("values must be finite")
+        return values
+    start, stop = float(spec["start"]), float(spec["stop"])
+    if not (math.isfinite(start) and math.isfinite(stop)):
+        raise ValueError("start and stop must be finite")
+    steps = int(spec.get("steps", 50))
+    if not 2 <= steps <= MAX_STEPS:
+        raise ValueError("steps must be between 2 and %d" % MAX_STEPS)
+    values = np.linspace(start, stop, steps)
+    if spec.get("integer"):
+        values = np.round(values)
+    return values.tolist()
+
+def parse_axes(specs, max_points):
+    if isinstance(specs, dict):
+        specs = [specs]
+    if not isinstance(specs, list) or not 1 <= len(specs) <= MAX_AXES:
+        raise ValueError("sweep must be one or two axes")
+    axes = []
+    for spec in specs:
+        if not isinstance(spec, dict):
+            raise ValueError("each axis must be an object")
+        field = spec.get("field")
+        if field not in PROFILE_FIELDS:
+            raise ValueError("unknown field: %s" % field)
+        if any(field == a["field"] for a in axes):
+            raise ValueError("%s is swept twice" % field)
+        try:
+            axes.append({"field": field, "values": _axis_values(spec)})
+        except KeyError as e:
+            raise ValueError("%s axis needs values or start/stop (missing %s)" % (field, e))
+    points = int(np.prod([len(a["values"]) for a in axes]))
+    if max_points and points > max_points:
+        raise ValueError("sweep has %d points, at most %d allowed" % (points, max_points))
+    return axes
+
+def sweep(art, record, axes, threshold=0.5):
+    start = time.perf_counter()
+    columns = [a["field"] for a in axes]
+    shape = [len(a["values"]) for a in axes]
+    # cartesian product, first axis slowest: row-major reshape gives probabilities[i][j]
+    grids = np.meshgrid(*[np.asarray(a["values"], dtype=object) for a in axes], indexing="ij")
+    values = np.stack([g.ravel() for g in grids], axis=1)
+    # the unchanged profile rides along as the last row of the same batch
+    base_row = np.array([[record.get(c) for c in columns]], dtype=object)
+    prob = np.asarray(score_variants(art, record, columns, np.vstack([values, base_row])), dtype=float)
+    base = float(prob[-1])
+    prob = prob[:-1]
+    return {
+        "model_version": art.version if art is not None and art.ready else fallback_rules(art).version,
+        "base": {"inputs": {c: record.get(c) for c in columns}, "approval_probability": base},
+        "axes": axes,
+        "shape": shape,
+        "threshold": threshold,
+        "probabilities": np.round(prob, 6).reshape(shape).tolist(),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000.0, 3),
+    }
@@ -0,0 +1,89 @@
+import threading, time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class TTLCache:
+    # Per-process LRU bounded by maxsize, every entry expiring ttl seconds after it
+    # was stored (or last refreshed). Thread-safe; hits/misses are counted for /metrics.
+    # A cache with maxsize or ttl <= 0 is disabled: nothing is stored, every get misses.
+
+    def __init__(self, maxsize=10000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0 and self.ttl > 0
+
+    def _lookup(self, key, now, refresh):
+        # caller holds the lock
+        item = self._data.get(key)
+        if item is None:
+            return _MISSING
+        if item[0] < now:
+            del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        if refresh:
+            self._data[key] = (now + self.ttl, item[1])
+        return item[1]
+
+    def _store(self, key, value, now):
+        # caller holds the lock
+        self._data[key] = (now + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get(self, key, default=None, refresh=False, count=True):
+        # refresh: renew the entry's deadline (sliding expiry)
+        with self._lock:
+            value = self._lookup(key, time.monotonic(), refresh)
+            if count:
+                if value is _MISSING:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            return default if value is _MISSING else value
+
+    def get_or_set(self, key, factory, refresh=False, count=True):
+        # cached value, or factory() stored in one step under the lock
+        now = time.monotonic()
+        with self._lock:
+            value = self._lookup(key, now, refresh)
+            if value is not _MISSING:
+                self.hits += count
+                return value
+            self.misses += count
+            value = factory()
+            if self.enabled:
+                self._store(key, value, now)
+            return value
+
+    def set(self, key, value):
+        if self.enabled:
+            with self._lock:
+                self._store(key, value, time.monotonic())
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                    "hits": self.hits, "misses": self.misses}
@@ -1,29 +1,170 @@
-import os
+import hashlib, io, os, threading, time
+from datetime import datetime
 from pydub import AudioSegment
 import speech_recognition as sr
-from flask import current_app
+from flask import Request, current_app
+from app.services.process_local import ProcessPool
 
-def save_audio(file_storage, filename):
+class InMemoryUploadRequest(Request):
+    # Uploads are capped by MAX_CONTENT_LENGTH, so keep them in memory instead of
+    # werkzeug's default spill-to-tempfile above 500 KB.
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
+def read_upload(file_storage):
+    file_storage.stream.seek(0)
+    return file_storage.stream.read()
+
+def store_audio(data, filename):
+    # Content-addressed copy of the upload: <UPLOAD_FOLDER>/<sha[:2]>/<sha><ext>.
+    # The client-supplied filename only contributes its extension.
     upload_folder = current_app.config.get("UPLOAD_FOLDER", "./uploads/voice")
-    os.makedirs(upload_folder, exist_ok=True)
-    path = os.path.join(upload_folder, filename)
-    file_storage.save(path)
+    digest = hashlib.sha256(data).hexdigest()
+    ext = os.path.splitext(filename or "")[1].lower()
+    if not ext[1:].isalnum():
+        ext = ""
+    folder = os.path.join(upload_folder, digest[:2])
+    path = os.path.join(folder, digest + ext)
+    if not os.path.exists(path):
+        os.makedirs(folder, exist_ok=True)
+        tmp = path + ".part"
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
     return path
 
-def transcribe_audio(path):
-    try:
-        # Normalize to WAV for SpeechRecognition
-        if not path.lower().endswith(".wav"):
-            sound = AudioSegment.from_file(path)
-            wav_path = path + ".wav"
-            sound.export(wav_path, format="wav")
-            path = wav_path
-        r = sr.Recognizer()
-        with sr.AudioFile(path) as source:
-            audio = r.record(source)
-        # Uses Google Web Speech API (requires internet) — quick dev option
-        text = r.recognize_google(audio)
-        return text
-    except Exception as e:
-        current_app.logger.warning("Audio transcription failed: %s", e)
-        return None
+def purge_stored_audio(upload_folder, max_age_days):
+    # retention policy for stored uploads; returns the number of files removed
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for root, _, files in os.walk(upload_folder):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+    return removed
+
+def decode_audio(data):
+    # Decode an upload straight to PCM in memory, without temp files
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        with sr.AudioFile(io.BytesIO(data)) as source:
+            return sr.Recognizer().record(source)
+    sound = AudioSegment.from_file(io.BytesIO(data)).set_channels(1)
+    return sr.AudioData(sound.raw_data, sound.frame_rate, sound.sample_width)
+
+# Transcription engines: name -> fn(recognizer, audio_data) -> text.
+# They run inside pool worker processes, so they must not touch Flask state.
+
+def _recognize_google(recognizer, audio):
+    # Uses Google Web Speech API (requires internet) — quick dev option
+    return recognizer.recognize_google(audio)
+
+def _recognize_sphinx(recognizer, audio):
+    # CMU Sphinx runs fully offline (needs the pocketsphinx package)
+    return recognizer.recognize_sphinx(audio)
+
+def _recognize_stub(recognizer, audio):
+    # deterministic offline engine for tests and air-gapped smoke checks
+    seconds = len(audio.frame_data) / float(audio.sample_rate * audio.sample_width)
+    return "stub transcript (%.1fs)" % seconds
+
+ENGINES = {
+    "google": _recognize_google,
+    "sphinx": _recognize_sphinx,
+    "stub": _recognize_stub,
+}
+
+def register_engine(name, fn):
+    ENGINES[name] = fn
+
+def transcribe_bytes(data, engine="google"):
+    recognize = ENGINES.get(engine)
+    if recognize is None:
+        raise ValueError("unknown transcription engine: %s" % engine)
+    return recognize(sr.Recognizer(), decode_audio(data))
+
+class VoiceJobs:
+    # Runs transcriptions on a process pool; job state lives on the VoiceInput row.
+
+    def __init__(self):
+        self.app = None
+        self.engine = "google"
+        self.max_workers = None
+        self.max_pending = 64
+        self.store_uploads = False
+        self.retention_days = 30
+        self._last_purge = 0.0
+        self._pool = ProcessPool()
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.engine = app.config.get("TRANSCRIBE_ENGINE", self.engine)
+        self.max_workers = app.config.get("VOICE_WORKERS") or None
+        self._pool.max_workers = self.max_workers
+        self.max_pending = app.config.get("VOICE_MAX_PENDING", self.max_pending)
+        self.store_uploads = app.config.get("VOICE_STORE_UPLOADS", self.store_uploads)
+        self.retention_days = app.config.get("VOICE_RETENTION_DAYS", self.retention_days)
+        app.extensions["voice_jobs"] = self
+
+    def store(self, data, filename):
+        # optional on-disk copy; expired files are swept at most once an hour
+        if not self.store_uploads:
+            return None
+        path = store_audio(data, filename)
+        now = time.time()
+        if self.retention_days and now - self._last_purge > 3600:
+            self._last_purge = now
+            purge_stored_audio(self.app.config.get("UPLOAD_FOLDER", "./uploads/voice"), self.retention_days)
+        return path
+
+    def submit(self, voice_input_id, data):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return False
+            self._pending += 1
+        try:
+            future = self._pool.submit(transcribe_bytes, data, self.engine)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        submitted = time.perf_counter()
+        future.add_done_callback(lambda f: self._complete(voice_input_id, f, submitted))
+        return True
+
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+    def _complete(self, voice_input_id, future, submitted):
+        from app.extensions import db, metrics
+        from app.models import VoiceInput
+        # the worker process can't report back, so time the job from submit to result
+        metrics.observe("stage_duration_seconds", time.perf_counter() - submitted, stage="transcribe")
+        with self._lock:
+            self._pending -= 1
+        with self.app.app_context():
+            try:
+                vi = db.session.get(VoiceInput, voice_input_id)
+                if vi is None:
+                    return
+                try:
+                    vi.transcript = future.result()
+                    vi.status = "done"
+                except Exception as e:
+                    self.app.logger.warning("Audio transcription failed: %s", e)
+                    vi.status = "failed"
+                    vi.error = str(e)[:512]
+                vi.completed_at = datetime.utcnow()
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.warning("Failed to update voice job %s: %s", voice_input_id, e)
+            finally:
+                db.session.remove()
@@ -0,0 +1,185 @@
+import atexit, logging, threading, time
+from collections import deque
+from datetime import datetime
+from sqlalchemy.exc import InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+from app.services.process_local import WorkerThread
+
+logger = logging.getLogger(__name__)
+
+# Write-behind buffer for append-only rows (PredictionHistory, ChatLog).
+# Request handlers enqueue plain mappings; a background thread drains them with
+# one bulk insert + commit per model when WRITE_BEHIND_BATCH_SIZE rows are
+# pending or WRITE_BEHIND_FLUSH_INTERVAL seconds have passed. Memory is bounded
+# by WRITE_BEHIND_MAX_ROWS: when full, callers wait up to
+# WRITE_BEHIND_PUT_TIMEOUT and then write their rows synchronously.
+# on_insert(model, fn) hooks run as fn(session, rows) inside the insert's
+# transaction, e.g. to keep rollup tables in step with the rows.
+# A batch that fails on its data is split in halves and retried, so only the
+# rows that fail on their own are dropped (and counted as failed).
+
+# the database itself is unavailable: splitting the batch would fail the same way
+UNAVAILABLE_ERRORS = (OperationalError, InterfaceError, PoolTimeoutError)
+
+class WriteBehind:
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.max_rows = 10000
+        self.batch_size = 500
+        self.flush_interval = 0.5
+        self.put_timeout = 0.05
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._pending_rows = 0
+        self._worker = WorkerThread(self._run, "write-behind")
+        self._stopping = False
+        self._hooks = {}
+        self._stats = {"enqueued": 0, "written": 0, "failed": 0, "sync_writes": 0, "flushes": 0, "last_flush_ms": 0.0}
+
+    def init_app(self, app):
+        self.app = app
+        cfg = app.config
+        self.enabled = cfg.get("WRITE_BEHIND_ENABLED", True)
+        self.max_rows = cfg.get("WRITE_BEHIND_MAX_ROWS", self.max_rows)
+        self.batch_size = cfg.get("WRITE_BEHIND_BATCH_SIZE", self.batch_size)
+        self.flush_interval = cfg.get("WRITE_BEHIND_FLUSH_INTERVAL", self.flush_interval)
+        self.put_timeout = cfg.get("WRITE_BEHIND_PUT_TIMEOUT", self.put_timeout)
+        app.extensions["write_behind"] = self
+        atexit.register(self.shutdown)
+
+    def on_insert(self, model, fn):
+        hooks = self._hooks.setdefault(model, [])
+        if fn not in hooks:  # create_app may run more than once per process
+            hooks.append(fn)
+
+    def submit(self, model, mapping):
+        self.submit_many(model, [mapping])
+
+    def submit_many(self, model, mappings):
+        if not mappings:
+            return
+        # stamp rows now so created_at reflects the request, not the flush
+        if hasattr(model, "created_at"):
+            now = datetime.utcnow()
+            for m in mappings:
+                m.setdefault("created_at", now)
+        if not self.enabled:
+            self._write_sync(model, mappings)
+            return
+
+        self._ensure_worker()
+        for start in range(0, len(mappings), self.batch_size):
+            chunk = mappings[start:start + self.batch_size]
+            with self._cond:
+                # backpressure: wait briefly for room, then fall back to a synchronous write
+                has_room = self._cond.wait_for(
+                    lambda: self._pending_rows + len(chunk) <= self.max_rows or self._stopping,
+                    timeout=self.put_timeout,
+                )
+                if has_room and not self._stopping:
+                    self._pending.append((model, chunk))
+                    self._pending_rows += len(chunk)
+                    self._stats["enqueued"] += len(chunk)
+                    if self._pending_rows >= self.batch_size:
+                        self._cond.notify_all()
+                    continue
+            self._write_sync(model, chunk)
+
+    def flush(self):
+        # drain everything queued so far on the caller's thread
+        with self._cond:
+            items = list(self._pending)
+            self._pending.clear()
+            self._pending_rows = 0
+            self._cond.notify_all()
+        self._write(items)
+
+    def shutdown(self, timeout=10.0):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._worker.join(timeout)
+        self.flush()
+
+    def stats(self):
+        with self._cond:
+            out = dict(self._stats)
+            out.update({"depth": self._pending_rows, "max_rows": self.max_rows, "enabled": self.enabled})
+            return out
+
+    def _ensure_worker(self):
+        self._worker.ensure(on_start=self._reset_stopping)
+
+    def _reset_stopping(self):
+        with self._cond:
+            self._stopping = False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending_rows >= self.batch_size or self._stopping,
+                                    timeout=self.flush_interval)
+                items = []
+                rows = 0
+                while self._pending and rows < self.batch_size:
+                    model, chunk = self._pending.popleft()
+                    items.append((model, chunk))
+                    rows += len(chunk)
+                self._pending_rows -= rows
+                stopping = self._stopping and not self._pending
+                self._cond.notify_all()
+            if items:
+                self._write(items)
+            if stopping:
+                return
+
+    def _write(self, items):
+        if not items:
+            return
+        by_model = {}
+        for model, chunk in items:
+            by_model.setdefault(model, []).extend(chunk)
+        start = time.perf_counter()
+        for model, rows in by_model.items():
+            self._insert(model, rows)
+        with self._cond:
+            self._stats["flushes"] += 1
+            self._stats["last_flush_ms"] = round((time.perf_counter() - start) * 1000.0, 3)
+
+    def _write_sync(self, model, rows):
+        self._count("sync_writes", len(rows))
+        self._insert(model, rows)
+
+    def _insert(self, model, rows):
+        error = self._bulk_insert(model, rows)
+        if error is None:
+            self._count("written", len(rows))
+        elif len(rows) > 1 and not isinstance(error, UNAVAILABLE_ERRORS):
+            mid = len(rows) // 2
+            self._insert(model, rows[:mid])
+            self._insert(model, rows[mid:])
+        else:
+            logger.warning("Failed to write %d %s rows: %s", len(rows), model.__tablename__, error)
+            self._count("failed", len(rows))
+
+    def _bulk_insert(self, model, rows):
+        # -> None, or the exception the rolled-back transaction failed with
+        from app.extensions import db, metrics
+        with self.app.app_context():
+            try:
+                start = time.perf_counter()
+                db.session.bulk_insert_mappings(model, rows)
+                for hook in self._hooks.get(model, ()):
+                    hook(db.session, rows)
+                db.session.commit()
+                metrics.observe("db_write_duration_seconds", time.perf_counter() - start, table=model.__tablename__)
+                return None
+            except Exception as e:
+                db.session.rollback()
+                return e
+            finally:
+                db.session.remove()
+
+    def _count(self, key, n):
+        with self._cond:
+            self._stats[key] += n
@@ -0,0 +1,306 @@
+import argparse, hashlib, json, os, time
+from concurrent.futures import ThreadPoolExecutor
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from scipy import sparse
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
+import lightgbm as lgb
+from app.services.feature_encoder import compile_transformer, check_parity
+from app.services.calibration import Calibrator, brier_score, expected_calibration_error
+from app.services.artifact_bundle import write_bundle
+
+# Training pipeline for the serving artifacts (transformer.joblib, lightgbm.txt,
+# calibration.npz, logistic.pkl, encoder.npz) and the mmap-able bundle/ built from them.
+#
+#   cd server && python ml_part.py --data loan_train_20000.csv --artifacts-dir artifacts
+#
+# Column dtypes are inferred once per dataset and the transformed matrices are
+# cached (.npy for dense, .npz for sparse) keyed on the dataset fingerprint and
+# the preprocessing options, so re-runs skip CSV parsing and encoding.
+
+TARGET = "loan_decision"
+TARGET_MAP = {
+    "approved": 1, "rejected": 0,
+    "yes": 1, "no": 0,
+    "y": 1, "n": 0,
+    "1": 1, "0": 0,
+}
+# ids, label-derived columns and ratios the API never receives
+DEFAULT_DROP = ("username", "rejection_reason", "shap_top3", "dti", "loan_to_income")
+BOOL_VALUES = {"true": 1.0, "false": 0.0}
+
+def _fingerprint(path):
+    st = os.stat(path)
+    raw = "%s|%d|%d" % (os.path.abspath(path), st.st_size, int(st.st_mtime))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+def _log(msg, start=None):
+    if start is not None:
+        msg = "%s (%.1fs)" % (msg, time.perf_counter() - start)
+    print(msg, flush=True)
+
+def infer_schema(path, target, drop, cache_dir, sample_rows=100000):
+    # numeric / categorical / boolean column lists, inferred from a sample once per file
+    cache_path = os.path.join(cache_dir, "schema-%s.json" % _fingerprint(path))
+    if os.path.exists(cache_path):
+        with open(cache_path) as fh:
+            schema = json.load(fh)
+    else:
+        sample = pd.read_csv(path, nrows=sample_rows)
+        if target not in sample.columns:
+            raise ValueError(f"Target column '{target}' not found in dataset. Columns: {sample.columns.tolist()}")
+        schema = {"numeric": [], "categorical": [], "boolean": []}
+        for col in sample.columns:
+            if col == target:
+                continue
+            series = sample[col]
+            if series.dtype == bool:
+                schema["boolean"].append(col)
+            elif pd.api.types.is_numeric_dtype(series):
+                schema["numeric"].append(col)
+            elif set(series.dropna().astype(str).str.lower().unique()) <= set(BOOL_VALUES):
+                schema["boolean"].append(col)
+            else:
+                schema["categorical"].append(col)
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path, "w") as fh:
+            json.dump(schema, fh, indent=2)
+    return {kind: [c for c in cols if c not in drop] for kind, cols in schema.items()}
+
+def load_dataset(path, target, schema):
+    dtypes = {c: "float64" for c in schema["numeric"]}
+    dtypes.update({c: "category" for c in schema["categorical"]})
+    dtypes.update({c: "object" for c in schema["boolean"]})
+    dtypes[target] = "object"
+    usecols = list(dtypes)
+    try:
+        import pyarrow  # noqa: F401  multi-threaded CSV parsing when available
+        df = pd.read_csv(path, usecols=usecols, dtype=dtypes, engine="pyarrow")
+    except ImportError:
+        df = pd.read_csv(path, usecols=usecols, dtype=dtypes)
+
+    # booleans become 0/1 numerics so JSON true/false scores the same at serving time
+    for col in schema["boolean"]:
+        df[col] = df[col].astype(str).str.strip().str.lower().map(BOOL_VALUES).astype("float64")
+
+    raw = df.pop(target).astype(str).str.strip().str.lower()
+    y = raw.map(TARGET_MAP)
+    if y.isna().any():
+        raise ValueError("Unrecognized target values: %s" % sorted(raw[y.isna()].unique()[:5]))
+    return df, y.astype(np.int8).to_numpy()
+
+def build_preprocessor(numeric, categorical, categorical_mode):
+    if categorical_mode == "native":
+        # integer codes for LightGBM's native categorical splits
+        cat = OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=np.nan, encoded_missing_value=np.nan)
+    else:
+        cat = OneHotEncoder(handle_unknown="ignore")
+    return ColumnTransformer([
+        ("num", StandardScaler(), numeric),
+        ("cat", cat, categorical),
+    ])
+
+def _save_matrix(path, X):
+    if sparse.issparse(X):
+        sparse.save_npz(path + ".npz", X.tocsr(), compressed=False)
+    else:
+        np.save(path + ".npy", X)
+
+def _load_matrix(path):
+    if os.path.exists(path + ".npz"):
+        return sparse.load_npz(path + ".npz")
+    # memory-mapped: pages are read on demand and shared with the OS cache
+    return np.load(path + ".npy", mmap_mode="r")
+
+def prepare(args):
+    start = time.perf_counter()
+    drop = set(args.drop)
+    schema = infer_schema(args.data, args.target, drop, args.cache_dir)
+    numeric = schema["numeric"] + schema["boolean"]
+    categorical = schema["categorical"]
+
+    key = hashlib.sha1(json.dumps({
+        "data": _fingerprint(args.data), "target": args.target, "schema": schema,
+        "test_size": args.test_size, "valid_size": args.valid_size, "seed": args.seed,
+        "categorical": args.categorical, "sklearn": sklearn.__version__,
+    }, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    cache = os.path.join(args.cache_dir, "prep-" + key)
+    names = ["X_train", "X_valid", "X_test", "L_train", "L_test"]
+
+    if os.path.exists(os.path.join(cache, "done")):
+        data = {n: _load_matrix(os.path.join(cache, n)) for n in names}
+        for n in ("y_train", "y_valid", "y_test"):
+            data[n] = np.load(os.path.join(cache, n + ".npy"))
+        data["preprocessor"] = joblib.load(os.path.join(cache, "preprocessor.joblib"))
+        data["lr_preprocessor"] = joblib.load(os.path.join(cache, "lr_preprocessor.joblib"))
+        data["raw_test"] = pd.read_pickle(os.path.join(cache, "raw_test_sample.pkl"))
+        _log("Loaded cached matrices from %s" % cache, start)
+        return data
+
+    X, y = load_dataset(args.data, args.target, schema)
+    _log("Read %d rows x %d columns" % X.shape, start)
+
+    idx = np.arange(len(y))
+    idx_train, idx_test = train_test_split(idx, test_size=args.test_size, stratify=y, random_state=args.seed)
+    idx_train, idx_valid = train_test_split(idx_train, test_size=args.valid_size, stratify=y[idx_train],
+                                            random_state=args.seed)
+
+    preprocessor = build_preprocessor(numeric, categorical, args.categorical)
+    lr_preprocessor = build_preprocessor(numeric, categorical, "onehot")
+    X_train_raw = X.iloc[idx_train]
+    data = {
+        "X_train": preprocessor.fit_transform(X_train_raw),
+        "X_valid": preprocessor.transform(X.iloc[idx_valid]),
+        "X_test": preprocessor.transform(X.iloc[idx_test]),
+        "L_train": lr_preprocessor.fit_transform(X_train_raw),
+        "L_test": lr_preprocessor.transform(X.iloc[idx_test]),
+        "y_train": y[idx_train], "y_valid": y[idx_valid], "y_test": y[idx_test],
+        "preprocessor": preprocessor, "lr_preprocessor": lr_preprocessor,
+        "raw_test": X.iloc[idx_test[:1000]],
+    }
+    del X
+    # dense blocks are kept as float32, the dtype the serving encoder produces
+    for n in names:
+        if not sparse.issparse(data[n]):
+            data[n] = np.ascontiguousarray(data[n], dtype=np.float32)
+    _log("Encoded train/valid/test matrices", start)
+
+    os.makedirs(cache, exist_ok=True)
+    for n in names:
+        _save_matrix(os.path.join(cache, n), data[n])
+    for n in ("y_train", "y_valid", "y_test"):
+        np.save(os.path.join(cache, n + ".npy"), data[n])
+    joblib.dump(preprocessor, os.path.join(cache, "preprocessor.joblib"))
+    joblib.dump(lr_preprocessor, os.path.join(cache, "lr_preprocessor.joblib"))
+    data["raw_test"].to_pickle(os.path.join(cache, "raw_test_sample.pkl"))
+    open(os.path.join(cache, "done"), "w").close()
+    _log("Cached matrices in %s" % cache, start)
+    return data
+
+def fit_lightgbm(data, args, categorical_idx, feature_names):
+    params = {"objective": "binary", "metric": "auc", "verbose": -1, "seed": args.seed,
+              "num_threads": args.threads}
+    train = lgb.Dataset(data["X_train"], label=data["y_train"], feature_name=feature_names,
+                        categorical_feature=categorical_idx, free_raw_data=True)
+    valid = lgb.Dataset(data["X_valid"], label=data["y_valid"], reference=train)
+    return lgb.train(
+        params=params,
+        train_set=train,
+        num_boost_round=args.rounds,
+        valid_sets=[valid],
+        callbacks=[lgb.early_stopping(args.early_stopping, verbose=False)],
+    )
+
+def fit_logistic(data, args):
+    lr_model = LogisticRegression(max_iter=1000)
+    lr_model.fit(data["L_train"], data["y_train"])
+    return lr_model
+
+def save_shap_plot(booster, X, feature_names, path, sample_rows):
+    # optional: needs shap + matplotlib, which serving doesn't
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        import shap
+    except ImportError as e:
+        raise SystemExit("--shap-plot needs shap and matplotlib (%s)" % e)
+    X = X[:sample_rows]
+    X_dense = X.toarray() if sparse.issparse(X) else np.asarray(X)
+    contrib = booster.predict(X, pred_contrib=True)
+    contrib = contrib.toarray() if sparse.issparse(contrib) else contrib
+    plt.figure(figsize=(8, 6))
+    shap.summary_plot(contrib[:, :-1], X_dense, feature_names=feature_names, show=False)
+    plt.tight_layout()
+    plt.savefig(path, dpi=150)
+    plt.close()
+
+def train(args):
+    start = time.perf_counter()
+    os.makedirs(args.artifacts_dir, exist_ok=True)
+    data = prepare(args)
+    preprocessor = data["preprocessor"]
+    encoder = compile_transformer(preprocessor)
+
+    native = args.categorical == "native"
+    n_num = len(encoder.num_columns)
+    categorical_idx = list(range(n_num, n_num + len(encoder.cat_columns))) if native else "auto"
+    # one-hot names contain spaces etc. that LightGBM rejects; keep Column_i there
+    feature_names = encoder.feature_names if native else "auto"
+
+    # the two models are independent; LightGBM and lbfgs both spend their time outside the GIL
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        lgb_future = pool.submit(fit_lightgbm, data, args, categorical_idx, feature_names)
+        lr_future = pool.submit(fit_logistic, data, args) if not args.skip_logistic else None
+        lgb_model = lgb_future.result()
+        lr_model = lr_future.result() if lr_future is not None else None
+    _log("Fitted models (LightGBM best iteration %d)" % lgb_model.best_iteration, start)
+
+    p_test = lgb_model.predict(data["X_test"], num_iteration=lgb_model.best_iteration)
+    _log("LightGBM test AUC: %.4f" % roc_auc_score(data["y_test"], p_test))
+
+    # calibration table fitted on the booster's own held-out (validation) scores
+    calibrator = Calibrator.fit(lgb_model.predict(data["X_valid"], num_iteration=lgb_model.best_iteration),
+                                data["y_valid"])
+    p_calibrated = calibrator(p_test)
+    for label, p in (("raw", p_test), ("calibrated", p_calibrated)):
+        _log("Test %s: ECE %.4f, Brier %.4f" % (label, expected_calibration_error(data["y_test"], p),
+                                                 brier_score(data["y_test"], p)))
+
+    if lr_model is not None:
+        _log("Logistic test AUC: %.4f" % roc_auc_score(data["y_test"], lr_model.predict_proba(data["L_test"])[:, 1]))
+        joblib.dump(Pipeline([("preprocessor", data["lr_preprocessor"]), ("model", lr_model)]),
+                    os.path.join(args.artifacts_dir, "logistic.pkl"))
+
+    raw_test = data["raw_test"]
+    records = raw_test.astype(object).where(raw_test.notna(), None).to_dict("records")
+    if not check_parity(preprocessor, encoder, records + encoder.probe_records(limit=1000)):
+        raise RuntimeError("compiled encoder does not reproduce the transformer output")
+
+    joblib.dump(preprocessor, os.path.join(args.artifacts_dir, "transformer.joblib"))
+    encoder.save(os.path.join(args.artifacts_dir, "encoder.npz"))
+    calibrator.save(os.path.join(args.artifacts_dir, "calibration.npz"))
+    lgb_model.save_model(os.path.join(args.artifacts_dir, "lightgbm.txt"), num_iteration=lgb_model.best_iteration)
+    version = write_bundle(os.path.join(args.artifacts_dir, "bundle"), encoder,
+                           lgb_model.model_to_string(num_iteration=lgb_model.best_iteration), calibrator)
+    _log("Artifact bundle %s written" % version)
+    _log("✅ Models trained and saved in '%s'" % args.artifacts_dir, start)
+
+    if args.shap_plot:
+        save_shap_plot(lgb_model, data["X_test"], encoder.feature_names,
+                       os.path.join(args.artifacts_dir, "shap_summary.png"), args.shap_sample)
+        _log("✅ SHAP summary plot saved as 'shap_summary.png'", start)
+    return lgb_model
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Train the loan eligibility models")
+    parser.add_argument("--data", default=os.getenv("DATASET_PATH", "loan_train_20000.csv"))
+    parser.add_argument("--target", default=TARGET)
+    parser.add_argument("--artifacts-dir", default=os.getenv("ARTIFACTS_DIR", "artifacts"))
+    parser.add_argument("--cache-dir", default=os.getenv("TRAIN_CACHE_DIR", ".train_cache"))
+    parser.add_argument("--drop", nargs="*", default=list(DEFAULT_DROP), help="input columns to ignore")
+    parser.add_argument("--categorical", choices=("native", "onehot"), default="native",
+                        help="LightGBM native categorical splits or one-hot columns")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--valid-size", type=float, default=0.1, help="share of train used for early stopping")
+    parser.add_argument("--rounds", type=int, default=1000)
+    parser.add_argument("--early-stopping", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=0, help="LightGBM threads (0 = all cores)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-logistic", action="store_true")
+    parser.add_argument("--shap-plot", action="store_true", help="also write shap_summary.png")
+    parser.add_argument("--shap-sample", type=int, default=2000)
+    return parser
+
+def main(argv=None):
+    return train(build_parser().parse_args(argv))
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,25 @@
+from functools import lru_cache
+from flask import current_app, has_app_context
 from werkzeug.security import generate_password_hash, check_password_hash
 
-def hash_password(pw):
-    return generate_password_hash(pw)
+DEFAULT_HASH_METHOD = "scrypt:32768:8:1"
+
+def _configured_method():
+    if has_app_context():
+        return current_app.config.get("PASSWORD_HASH_METHOD") or DEFAULT_HASH_METHOD
+    return DEFAULT_HASH_METHOD
+
+def hash_password(pw, method=None):
+    return generate_password_hash(pw, method=method or _configured_method())
 
 def verify_password(h, pw):
     return check_password_hash(h, pw)
+
+@lru_cache(maxsize=8)
+def _method_prefix(method):
+    # werkzeug expands shorthands ("pbkdf2" -> "pbkdf2:sha256:1000000"), so compare
+    # against the prefix it actually writes
+    return generate_password_hash("", method=method).split("$", 1)[0]
+
+def needs_rehash(h, method=None):
+    return h.split("$", 1)[0] != _method_prefix(method or _configured_method())
@@ -0,0 +1,118 @@
+import argparse, json, os, statistics, subprocess, sys, time
+
+# Startup time, memory and scoring latency of N concurrent workers loading the
+# model, for the file-per-artifact layout (Config paths) vs the mmap-able
+# artifact bundle. PSS splits shared pages between the processes that map them,
+# so it shows what each extra worker really costs. Latencies are medians of
+# score_records calls, without and with explanations, for one row and a batch.
+#   cd server && python -m benchmarks.bench_bundle --workers 4 --bundle models/bundle
+
+def _memory_kb():
+    out = {}
+    try:
+        with open("/proc/self/smaps_rollup") as fh:
+            for line in fh:
+                key, _, rest = line.partition(":")
+                if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                    out[key] = int(rest.split()[0])
+    except OSError:
+        import resource
+        out["Rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return out
+
+def _median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(times)
+
+def _worker(cfg, batch, repeat):
+    from app.services.model_registry import load_artifacts
+    from app.services.services_ml import score_records
+    from benchmarks.synthetic import generate, records
+    before = _memory_kb()
+    start = time.perf_counter()
+    art = load_artifacts(cfg)
+    load_ms = (time.perf_counter() - start) * 1000.0
+    # touch the scoring path once so lazily-paged arrays are counted
+    score_records(art, art.encoder.probe_records(limit=4), True, 3)
+    rows = records(generate(batch, seed=1))
+    latency = {
+        "predict_ms": _median_ms(lambda: score_records(art, rows[:1], False, 3), repeat),
+        "explain_ms": _median_ms(lambda: score_records(art, rows[:1], True, 3), repeat),
+        "batch_predict_ms": _median_ms(lambda: score_records(art, rows, False, 3), max(repeat // 20, 3)),
+        "batch_explain_ms": _median_ms(lambda: score_records(art, rows, True, 3), max(repeat // 20, 3)),
+    }
+    print(json.dumps(dict(latency, load_ms=load_ms, version=art.version)), flush=True)
+    sys.stdin.readline()  # measure only once every worker has loaded
+    after = _memory_kb()
+    print(json.dumps({"before": before, "after": after}), flush=True)
+
+def _run_layout(cfg, workers, batch, repeat):
+    env = dict(os.environ, PYTHONWARNINGS="ignore")
+    start = time.perf_counter()
+    procs = [subprocess.Popen([sys.executable, "-m", "benchmarks.bench_bundle", "--worker", json.dumps(cfg),
+                               "--batch", str(batch), "--repeat", str(repeat)],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=env)
+             for _ in range(workers)]
+    loads = [json.loads(p.stdout.readline()) for p in procs]
+    ready_s = time.perf_counter() - start
+    for p in procs:
+        p.stdin.write("\n")
+        p.stdin.flush()
+    mems = [json.loads(p.stdout.readline()) for p in procs]
+    for p in procs:
+        p.wait()
+    avg = lambda key: sum(m["after"].get(key, 0) for m in mems) / len(mems)
+    avg_load = lambda key: sum(l[key] for l in loads) / len(loads)
+    delta = lambda key: sum(m["after"].get(key, 0) - m["before"].get(key, 0) for m in mems) / len(mems)
+    return {
+        "version": loads[0]["version"],
+        "load_ms": avg_load("load_ms"),
+        "predict_ms": avg_load("predict_ms"),
+        "explain_ms": avg_load("explain_ms"),
+        "batch_predict_ms": avg_load("batch_predict_ms"),
+        "batch_explain_ms": avg_load("batch_explain_ms"),
+        "all_ready_s": ready_s,
+        "rss_mb": avg("Rss") / 1024.0,
+        "pss_mb": avg("Pss") / 1024.0,
+        "load_rss_mb": delta("Rss") / 1024.0,
+        "load_pss_mb": delta("Pss") / 1024.0,
+    }
+
+def main(argv=None):
+    from app.config import Config
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=1000, help="rows in the batch latency run")
+    parser.add_argument("--repeat", type=int, default=200, help="single-row calls per latency median")
+    parser.add_argument("--bundle", default=Config.ARTIFACT_BUNDLE_PATH)
+    parser.add_argument("--model", default=Config.MODEL_PATH)
+    parser.add_argument("--transformer", default=Config.TRANSFORMER_PATH)
+    parser.add_argument("--encoder", default=Config.ENCODER_PATH)
+    parser.add_argument("--calibration", default=Config.CALIBRATION_PATH)
+    parser.add_argument("--iso", default=Config.ISO_PATH)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.worker:
+        return _worker(json.loads(args.worker), args.batch, args.repeat)
+
+    layouts = [
+        ("files", {"MODEL_PATH": args.model, "TRANSFORMER_PATH": args.transformer, "ENCODER_PATH": args.encoder,
+                   "CALIBRATION_PATH": args.calibration, "ISO_PATH": args.iso}),
+        ("bundle", {"ARTIFACT_BUNDLE_PATH": args.bundle}),
+    ]
+    print("%d workers" % args.workers)
+    print("%-8s %-22s %10s %12s %9s %9s %13s %13s %11s %11s %15s %15s" % (
+        "layout", "version", "load ms", "all ready s", "RSS MB", "PSS MB", "load RSS MB", "load PSS MB",
+        "predict ms", "explain ms", "predict %d ms" % args.batch, "explain %d ms" % args.batch))
+    for name, cfg in layouts:
+        r = _run_layout(cfg, args.workers, args.batch, args.repeat)
+        print("%-8s %-22s %10.1f %12.2f %9.1f %9.1f %13.1f %13.1f %11.3f %11.3f %15.1f %15.1f" % (
+            name, r["version"], r["load_ms"], r["all_ready_s"], r["rss_mb"], r["pss_mb"], r["load_rss_mb"],
+            r["load_pss_mb"], r["predict_ms"], r["explain_ms"], r["batch_predict_ms"], r["batch_explain_ms"]))
+
+if __name__ == "__main__":
+    main()
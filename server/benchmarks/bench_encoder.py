@@ -0,0 +1,43 @@
+import argparse, time, joblib
+import numpy as np
+import pandas as pd
+from app.services.feature_encoder import compile_transformer, check_parity, records_to_frame
+
+# Microbenchmark: sklearn ColumnTransformer vs the compiled NumPy encoder.
+#   cd server && python -m benchmarks.bench_encoder
+
+def _per_row_us(fn, n_rows, repeat):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / (repeat * n_rows) * 1e6
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transformer", default="artifacts/transformer.joblib")
+    parser.add_argument("--csv", default="loan_test_1000.csv")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    transformer = joblib.load(args.transformer)
+    encoder = compile_transformer(transformer)
+    df = pd.read_csv(args.csv)
+    records = df.astype(object).where(df.notna(), None).to_dict("records")
+
+    print("parity (%s, %d rows): %s" % (encoder.dtype, len(records), check_parity(transformer, encoder, records)))
+
+    single = records[:1]
+    buf = np.zeros((1, encoder.n_features), dtype=encoder.dtype)
+    rows = [
+        ("sklearn single", lambda: transformer.transform(records_to_frame(transformer, single)), 1, args.repeat),
+        ("encoder single", lambda: encoder.transform(single), 1, args.repeat * 20),
+        ("encoder single (preallocated dense)", lambda: encoder.transform_dense(single, buf), 1, args.repeat * 20),
+        ("sklearn batch", lambda: transformer.transform(records_to_frame(transformer, records)), len(records), max(args.repeat // 10, 1)),
+        ("encoder batch", lambda: encoder.transform(records), len(records), args.repeat),
+    ]
+    for name, fn, n_rows, repeat in rows:
+        print("%-38s %10.2f us/row" % (name, _per_row_us(fn, n_rows, repeat)))
+
+if __name__ == "__main__":
+    main()
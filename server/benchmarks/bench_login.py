@@ -0,0 +1,48 @@
+import argparse, os, time
+from concurrent.futures import ProcessPoolExecutor
+from app.utils import hash_password, verify_password
+
+# Login verification throughput for different PASSWORD_HASH_METHOD costs,
+# inline (one request thread) vs on a process pool.
+#   cd server && python -m benchmarks.bench_login --workers 4
+
+METHODS = [
+    "scrypt:32768:8:1",
+    "scrypt:16384:8:1",
+    "pbkdf2:sha256:600000",
+    "pbkdf2:sha256:260000",
+    "pbkdf2:sha256:100000",
+]
+
+def _verify_one(args):
+    h, pw = args
+    return verify_password(h, pw)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--method", action="append", help="override the methods to compare")
+    args = parser.parse_args(argv)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        print("%-24s %12s %14s %14s" % ("method", "ms/verify", "inline/s", "pool(%d)/s" % args.workers))
+        for method in args.method or METHODS:
+            h = hash_password("correct horse", method=method)
+            work = [(h, "correct horse")] * args.logins
+
+            start = time.perf_counter()
+            for item in work:
+                _verify_one(item)
+            inline = time.perf_counter() - start
+
+            list(pool.map(_verify_one, work[:args.workers]))  # warm up workers
+            start = time.perf_counter()
+            list(pool.map(_verify_one, work))
+            pooled = time.perf_counter() - start
+
+            print("%-24s %12.2f %14.1f %14.1f" % (
+                method, inline / args.logins * 1000, args.logins / inline, args.logins / pooled))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse, io, os, shutil, tempfile, time, wave
+import numpy as np
+import speech_recognition as sr
+from app.services.voice_services import decode_audio
+
+# Upload handling I/O: the old save -> re-read path vs the in-memory decode.
+#   cd server && python -m benchmarks.bench_voice --mb 10
+
+def _io_counters():
+    # bytes moved through read()/write() syscalls by this process (Linux only)
+    try:
+        with open("/proc/self/io") as fh:
+            fields = dict(line.split(": ") for line in fh.read().splitlines())
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError):
+        return 0, 0
+
+def _make_wav(size_bytes, rate=16000):
+    frames = size_bytes // 2
+    pcm = (np.sin(np.arange(frames) * 2 * np.pi * 440 / rate) * 8000).astype("<i2")
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+def _disk_path(data, folder):
+    # what upload_audio used to do: FileStorage.save() then sr.AudioFile(path)
+    path = os.path.join(folder, "upload.wav")
+    with open(path, "wb") as fh:
+        fh.write(data)
+    with sr.AudioFile(path) as source:
+        return sr.Recognizer().record(source)
+
+def _measure(name, fn, repeat):
+    r0, w0 = _io_counters()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        audio = fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    r1, w1 = _io_counters()
+    print("%-10s %8.1f ms   read %8.2f MB   written %8.2f MB   (%d PCM bytes)" % (
+        name, elapsed * 1000, (r1 - r0) / repeat / 1e6, (w1 - w0) / repeat / 1e6, len(audio.frame_data)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=float, default=10.0, help="upload size (MAX_CONTENT_LENGTH is 10 MB)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    data = _make_wav(int(args.mb * 1024 * 1024) - 64)
+    folder = tempfile.mkdtemp()
+    try:
+        _measure("disk", lambda: _disk_path(data, folder), args.repeat)
+        _measure("memory", lambda: decode_audio(data), args.repeat)
+    finally:
+        shutil.rmtree(folder)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import argparse, json, os, platform, subprocess, sys, tempfile, time
+import numpy as np
+from benchmarks.synthetic import generate, records
+
+# Serving benchmark suite. Trains tiny artifacts on synthetic applicants, then
+# measures per-stage latency (transform / predict / calibrate / SHAP), single vs
+# batch throughput of the scoring path and end-to-end /api/predict through the
+# Flask test client on a throwaway SQLite database. Results are written as JSON
+# so runs can be compared over time.
+#   cd server && python -m benchmarks.suite --out bench.json
+#   cd server && python -m benchmarks.suite --artifacts-dir models
+
+def _summary(samples, rows):
+    ms = np.asarray(samples) * 1000.0
+    return {
+        "rows": rows,
+        "runs": len(ms),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "rows_per_s": round(rows * len(ms) / (ms.sum() / 1000.0), 1),
+    }
+
+def _time(fn, runs, warmup=2):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def _runs(budget_rows, rows, minimum=5):
+    return max(budget_rows // rows, minimum)
+
+def _metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    import lightgbm, sklearn
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "lightgbm": lightgbm.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+def train_artifacts(work_dir, rows, rounds, seed):
+    from app.training import main as train_main
+    csv = os.path.join(work_dir, "synthetic.csv")
+    generate(rows, seed).to_csv(csv, index=False)
+    art_dir = os.path.join(work_dir, "artifacts")
+    train_main(["--data", csv, "--artifacts-dir", art_dir, "--cache-dir", os.path.join(work_dir, "cache"),
+                "--rounds", str(rounds), "--early-stopping", "10", "--skip-logistic", "--seed", str(seed)])
+    return art_dir
+
+def layouts(art_dir):
+    files = {"ARTIFACT_BUNDLE_PATH": "",
+             "MODEL_PATH": os.path.join(art_dir, "lightgbm.txt"),
+             "TRANSFORMER_PATH": os.path.join(art_dir, "transformer.joblib"),
+             "ENCODER_PATH": os.path.join(art_dir, "encoder.npz"),
+             "CALIBRATION_PATH": os.path.join(art_dir, "calibration.npz"),
+             "ISO_PATH": os.path.join(art_dir, "isotonic.joblib")}
+    out = [("files", files)]
+    if os.path.exists(os.path.join(art_dir, "bundle")):
+        out.append(("bundle", {"ARTIFACT_BUNDLE_PATH": os.path.join(art_dir, "bundle")}))
+    return out
+
+def bench_stages(art, recs, batch_sizes, budget_rows, top_k):
+    from app.services.explain import top_k_contributions
+    from app.services.services_ml import score_records
+    out = []
+    for n in batch_sizes:
+        batch = recs[:n]
+        X = art.encoder.transform(batch)
+        raw = np.asarray(art.model.predict(X), dtype=float)
+        runs = _runs(budget_rows, n)
+        stages = [
+            ("transform", lambda: art.encoder.transform(batch)),
+            ("predict", lambda: art.model.predict(X)),
+            ("calibrate", lambda: art.calibrator(raw)),
+            ("shap", lambda: top_k_contributions(art.model, X, art.feature_names, top_k)),
+            ("score_records", lambda: score_records(art, batch, True, top_k)),
+            ("score_records_no_explain", lambda: score_records(art, batch, False, top_k)),
+            # degraded mode: the rule set that serves while no model is loaded
+            ("rules", lambda: art.rules.score(batch, True, top_k)),
+            ("rules_no_explain", lambda: art.rules.score(batch, False, top_k)),
+        ]
+        for stage, fn in stages:
+            if stage == "calibrate" and art.calibrator is None:
+                continue
+            out.append(dict(stage=stage, batch=n, **_summary(_time(fn, runs), n)))
+    return out
+
+def bench_throughput(art, recs, top_k):
+    # the same rows scored one request at a time vs in one vectorized call
+    from app.services.services_ml import score_records
+    out = {}
+    for explain in (True, False):
+        label = "explain" if explain else "no_explain"
+        single = _time(lambda: [score_records(art, [r], explain, top_k) for r in recs], 3, warmup=1)
+        batch = _time(lambda: score_records(art, recs, explain, top_k), 3, warmup=1)
+        out[label] = {
+            "rows": len(recs),
+            "single_rows_per_s": round(len(recs) / min(single), 1),
+            "batch_rows_per_s": round(len(recs) / min(batch), 1),
+        }
+        out[label]["speedup"] = round(out[label]["batch_rows_per_s"] / out[label]["single_rows_per_s"], 2)
+    return out
+
+def bench_e2e(cfg, recs, n_requests, batch_rows):
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    from app.config import Config
+    from app.extensions import db, write_behind
+
+    settings = dict(cfg, MODEL_RELOAD_INTERVAL=0, PASSWORD_HASH_METHOD="pbkdf2:sha256:1000")
+    app = create_app(type("BenchConfig", (Config,), settings))
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+
+    resp = client.post("/api/signup", json=dict(recs[0], username="bench", password="bench-password"))
+    with app.app_context():
+        # string subject: newer PyJWT rejects the integer identity the auth routes issue
+        token = create_access_token(identity=str(resp.get_json()["user_id"]))
+    auth = {"Authorization": "Bearer %s" % token}
+    pool = recs[:n_requests]
+
+    def run(name, fn, items, rows=1):
+        it = iter(items)
+        samples = _time(lambda: fn(next(it)), len(items) - 2)
+        write_behind.flush()
+        return dict(endpoint=name, **_summary(samples, rows))
+
+    def post(path, query="", headers=None):
+        def call(body):
+            r = client.post(path + query, json=body, headers=headers)
+            if r.status_code != 200:
+                raise RuntimeError("%s returned %d: %s" % (path, r.status_code, r.get_data(as_text=True)))
+        return call
+
+    # distinct feature vectors per request so the prediction cache only sees misses
+    overrides = [{"loan_amount": r["loan_amount"], "repayment_term_months": r["repayment_term_months"]} for r in pool]
+    batches = [recs[i:i + batch_rows] for i in range(0, len(recs) - batch_rows + 1, batch_rows)][:max(n_requests // 10, 5)]
+    out = [
+        run("/api/predict anonymous", post("/api/predict"), pool),
+        run("/api/predict anonymous explain=0", post("/api/predict", "?explain=0"), pool),
+        run("/api/predict logged-in (profile merge)", post("/api/predict", headers=auth), overrides),
+        run("/api/predict/batch (%d rows)" % batch_rows, post("/api/predict/batch"), batches, batch_rows),
+    ]
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    return out
+
+def _print(results):
+    print("\nper-stage latency")
+    print("%-8s %-26s %6s %10s %10s %10s %12s" % ("layout", "stage", "batch", "mean ms", "p50 ms", "p95 ms", "rows/s"))
+    for layout in results["layouts"]:
+        for r in layout["stages"]:
+            print("%-8s %-26s %6d %10.3f %10.3f %10.3f %12.1f" % (
+                layout["name"], r["stage"], r["batch"], r["mean_ms"], r["p50_ms"], r["p95_ms"], r["rows_per_s"]))
+    print("\nsingle vs batch (score_records)")
+    for layout in results["layouts"]:
+        for label, r in layout["throughput"].items():
+            print("%-8s %-12s %8d rows %12.1f single/s %12.1f batch/s  x%.1f" % (
+                layout["name"], label, r["rows"], r["single_rows_per_s"], r["batch_rows_per_s"], r["speedup"]))
+    print("\nend to end (Flask test client, SQLite)")
+    for r in results.get("e2e", []):
+        print("%-42s %10.3f p50 ms %10.3f p95 ms %10.1f rows/s" % (r["endpoint"], r["p50_ms"], r["p95_ms"], r["rows_per_s"]))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scoring path and /api/predict")
+    parser.add_argument("--out", help="write results JSON here (default: stdout only)")
+    parser.add_argument("--work-dir", help="keep the synthetic data, artifacts and database here")
+    parser.add_argument("--artifacts-dir", help="benchmark existing artifacts instead of training")
+    parser.add_argument("--train-rows", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=2048, help="synthetic rows to score")
+    parser.add_argument("--batch-sizes", default="1,32,1024")
+    parser.add_argument("--budget-rows", type=int, default=20000, help="rows per stage measurement (sets the run count)")
+    parser.add_argument("--throughput-rows", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=300, help="requests per end-to-end scenario")
+    parser.add_argument("--e2e-batch-rows", type=int, default=100)
+    parser.add_argument("--skip-e2e", action="store_true")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    from app.services.model_registry import load_artifacts
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="loan-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+    art_dir = args.artifacts_dir or train_artifacts(work_dir, args.train_rows, args.rounds, args.seed)
+
+    # scoring rows come from a different seed than the training data
+    recs = records(generate(max(args.rows, args.requests, args.throughput_rows), args.seed + 1))
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",") if b]
+    top_k = 3
+
+    results = {"meta": _metadata(), "params": vars(args), "work_dir": work_dir, "layouts": []}
+    for name, cfg in layouts(art_dir):
+        art = load_artifacts(cfg)
+        if not art.ready:
+            print("skipping %s layout: no model at %s" % (name, art_dir), file=sys.stderr)
+            continue
+        print("benchmarking %s layout (%s)" % (name, art.version), file=sys.stderr)
+        results["layouts"].append({
+            "name": name,
+            "version": art.version,
+            "load_ms": art.timings.get("total"),
+            "stages": bench_stages(art, recs, batch_sizes, args.budget_rows, top_k),
+            "throughput": bench_throughput(art, recs[:args.throughput_rows], top_k),
+        })
+
+    if not args.skip_e2e:
+        db_path = os.path.join(work_dir, "bench.db")
+        for path in (db_path, db_path + "-wal", db_path + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        cfg = dict(layouts(art_dir)[-1][1], SQLALCHEMY_DATABASE_URI="sqlite:///" + db_path)
+        results["e2e"] = bench_e2e(cfg, recs, args.requests, args.e2e_batch_rows)
+
+    _print(results)
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(results, fh, indent=2)
+        print("\nresults written to %s" % args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import numpy as np
+import pandas as pd
+from app.models import PROFILE_FIELDS
+
+# Synthetic applicants with the User profile schema (PROFILE_FIELDS) plus a
+# loan_decision label drawn from a simple risk score, so benchmarks can train
+# and serve artifacts without the real dataset.
+#   cd server && python -m benchmarks.synthetic synthetic.csv --rows 20000
+
+CATEGORIES = {
+    "gender": (["Male", "Female", "Other"], [0.5, 0.47, 0.03]),
+    "marital_status": (["married", "single", "divorced"], [0.61, 0.35, 0.04]),
+    "education": (["Bachelor's degree", "Master's degree", "High school", "PhD", "Uneducated"],
+                  [0.44, 0.24, 0.2, 0.06, 0.06]),
+    "job_title": (["Manager", "Farmer", "Clerk", "Small Business Owner", "Software Engineer", "Data Analyst",
+                   "Driver", "Sales Executive", "Nurse", "Teacher", "Accountant", "Unemployed"], None),
+    "employment_type": (["Private", "Govt", "Contract", "Unemployed", "Startup"], [0.62, 0.11, 0.11, 0.08, 0.08]),
+    "previous_loan_status": (["Defaulted", "Fully paid", "Ongoing"], None),
+    "loan_purpose": (["Education", "Business", "Personal", "Home", "Agriculture", "Vehicle"], None),
+    "additional_income_name": (["Rent", "Family support", "Freelance", "Investments"], None),
+}
+
+def generate(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(index=np.arange(rows))
+    for col, (values, p) in CATEGORIES.items():
+        df[col] = rng.choice(values, size=rows, p=p)
+
+    df["dependents"] = rng.integers(0, 6, rows)
+    df["age"] = rng.integers(18, 68, rows)
+    df["annual_salary"] = np.round(rng.lognormal(12.9, 0.7, rows)).astype(np.int64)
+    df["collateral_value"] = np.where(rng.random(rows) < 0.4, 0, np.round(rng.lognormal(12.2, 1.0, rows))).astype(np.int64)
+    df["savings_balance"] = np.round(rng.lognormal(10.6, 1.2, rows)).astype(np.int64)
+    df["contract_years"] = np.where(df["employment_type"] == "Contract", rng.integers(1, 6, rows), 0)
+    df["previous_loan"] = rng.random(rows) < 0.25
+    df.loc[~df["previous_loan"], "previous_loan_status"] = None
+    df["previous_loan_amount"] = np.where(df["previous_loan"], np.round(rng.lognormal(12.5, 0.8, rows)), 0).astype(np.int64)
+    df["total_emi_per_month"] = np.where(df["previous_loan"], np.round(df["previous_loan_amount"] / 36.0), 0).astype(np.int64)
+    df["loan_amount"] = np.round(rng.lognormal(13.2, 0.8, rows)).clip(20000).astype(np.int64)
+    df["repayment_term_months"] = rng.integers(6, 154, rows)
+    no_extra = rng.random(rows) < 0.22
+    df.loc[no_extra, "additional_income_name"] = None
+    df["additional_income_amount"] = np.where(no_extra, 0, np.round(rng.lognormal(9.5, 1.0, rows))).astype(np.int64)
+    df["num_credit_cards"] = rng.integers(0, 6, rows)
+    df["avg_credit_util_percent"] = np.round(rng.beta(2, 5, rows) * 100.0, 2)
+    df["late_payment_history"] = rng.random(rows) < 0.15
+    df["loan_insurance"] = rng.random(rows) < 0.3
+    df["credit_score"] = np.clip(np.round(rng.normal(700, 70, rows)), 300, 900).astype(np.int64)
+
+    # label: logistic in a few risk drivers, so the model has something to learn
+    monthly = df["annual_salary"] / 12.0
+    dti = (df["loan_amount"] / df["repayment_term_months"] + df["total_emi_per_month"]) / monthly
+    logit = (0.02 * (df["credit_score"] - 680) - 2.5 * (dti - 0.4) - 0.03 * (df["avg_credit_util_percent"] - 30)
+             - 1.0 * df["late_payment_history"] - 1.2 * (df["previous_loan_status"] == "Defaulted")
+             - 0.8 * (df["employment_type"] == "Unemployed"))
+    approved = rng.random(rows) < 1.0 / (1.0 + np.exp(-logit))
+    df["loan_decision"] = np.where(approved, "Approved", "Rejected")
+    return df[list(PROFILE_FIELDS) + ["loan_decision"]]
+
+def records(df):
+    # API-shaped dicts: NaN -> None, numpy scalars -> Python
+    features = df.drop(columns=["loan_decision"], errors="ignore")
+    return features.astype(object).where(features.notna(), None).to_dict("records")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic applicants CSV")
+    parser.add_argument("output")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    generate(args.rows, args.seed).to_csv(args.output, index=False)
+    print("%d rows written to %s" % (args.rows, args.output))
+
+if __name__ == "__main__":
+    main()
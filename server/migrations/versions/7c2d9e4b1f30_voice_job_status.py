@@ -0,0 +1,33 @@
+"""voice job status
+
+Revision ID: 7c2d9e4b1f30
+Revises: 41a08a2a552f
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2d9e4b1f30'
+down_revision = '41a08a2a552f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('voice_inputs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(length=16), nullable=True))
+        batch_op.add_column(sa.Column('error', sa.String(length=512), nullable=True))
+        batch_op.add_column(sa.Column('completed_at', sa.DateTime(), nullable=True))
+
+    # rows written before jobs existed were transcribed inline
+    op.execute("UPDATE voice_inputs SET status = 'done' WHERE status IS NULL")
+
+
+def downgrade():
+    with op.batch_alter_table('voice_inputs', schema=None) as batch_op:
+        batch_op.drop_column('completed_at')
+        batch_op.drop_column('error')
+        batch_op.drop_column('status')
@@ -0,0 +1,28 @@
+"""users listing indexes
+
+Revision ID: b5e81f2a6c47
+Revises: 7c2d9e4b1f30
+Create Date: 2026-10-18 10:03:27.552901
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e81f2a6c47'
+down_revision = '7c2d9e4b1f30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_role_id', ['role', 'id'], unique=False)
+        batch_op.create_index('ix_users_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_created_at_id')
+        batch_op.drop_index('ix_users_role_id')
@@ -0,0 +1,58 @@
+"""prediction analytics rollups
+
+Revision ID: d4f7a1c93e02
+Revises: b5e81f2a6c47
+Create Date: 2026-10-18 17:05:12.481337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f7a1c93e02'
+down_revision = 'b5e81f2a6c47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('prediction_daily_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('model_version', sa.String(length=64), nullable=False),
+    sa.Column('predictions', sa.BigInteger(), nullable=False),
+    sa.Column('approved', sa.BigInteger(), nullable=False),
+    sa.Column('probability_sum', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'model_version')
+    )
+    op.create_table('prediction_probability_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('model_version', sa.String(length=64), nullable=False),
+    sa.Column('bucket', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('predictions', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'model_version', 'bucket')
+    )
+    op.create_table('prediction_driver_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('model_version', sa.String(length=64), nullable=False),
+    sa.Column('feature', sa.String(length=128), nullable=False),
+    sa.Column('appearances', sa.BigInteger(), nullable=False),
+    sa.Column('contribution_sum', sa.Float(), nullable=False),
+    sa.Column('abs_contribution_sum', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'model_version', 'feature')
+    )
+    with op.batch_alter_table('prediction_history', schema=None) as batch_op:
+        batch_op.create_index('ix_prediction_history_user_id_created_at', ['user_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_prediction_history_model_version_created_at', ['model_version', 'created_at'], unique=False)
+
+    # existing history is folded in with: python -m app.services.analytics --rebuild
+
+
+def downgrade():
+    with op.batch_alter_table('prediction_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_prediction_history_model_version_created_at')
+        batch_op.drop_index('ix_prediction_history_user_id_created_at')
+
+    op.drop_table('prediction_driver_rollup')
+    op.drop_table('prediction_probability_rollup')
+    op.drop_table('prediction_daily_rollup')
@@ -0,0 +1,29 @@
+"""voice job token
+
+Revision ID: e8b3c5d1a9f4
+Revises: d4f7a1c93e02
+Create Date: 2026-10-18 17:40:12.508113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b3c5d1a9f4'
+down_revision = 'd4f7a1c93e02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing rows keep a NULL token: their jobs finished long ago and are no longer addressable
+    with op.batch_alter_table('voice_inputs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('job_token', sa.String(length=32), nullable=True))
+        batch_op.create_index(batch_op.f('ix_voice_inputs_job_token'), ['job_token'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('voice_inputs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_voice_inputs_job_token'))
+        batch_op.drop_column('job_token')
@@ -0,0 +1,4 @@
+import os, sys
+
+# tests import the app package the same way `cd server && python -m ...` does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,60 @@
+import os
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+from app.services.feature_encoder import check_parity, compile_transformer, records_to_frame
+from app.training import build_preprocessor
+
+SERVER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRANSFORMER = os.path.join(SERVER, "artifacts", "transformer.joblib")
+CSV = os.path.join(SERVER, "loan_test_1000.csv")
+
+def _records(df):
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+def _assert_identical(transformer, encoder, records):
+    expected = transformer.transform(records_to_frame(transformer, records))
+    got = encoder.transform(records)
+    assert got.dtype == encoder.dtype
+    assert sparse.issparse(got) == sparse.issparse(expected)
+    if sparse.issparse(got):
+        expected = sparse.csr_matrix(expected).astype(encoder.dtype)
+        got, expected = got.tocsr(), expected.tocsr()
+        got.sort_indices()
+        expected.sort_indices()
+        np.testing.assert_array_equal(got.indptr, expected.indptr)
+        np.testing.assert_array_equal(got.indices, expected.indices)
+        np.testing.assert_array_equal(got.data, expected.data)
+    else:
+        np.testing.assert_array_equal(got, np.asarray(expected).astype(encoder.dtype))
+    assert check_parity(transformer, encoder, records)
+
+@pytest.fixture(scope="module")
+def test_rows():
+    return pd.read_csv(CSV)
+
+@pytest.fixture(scope="module")
+def onehot_transformer():
+    return joblib.load(TRANSFORMER)
+
+def test_onehot_transformer_parity(onehot_transformer, test_rows):
+    encoder = compile_transformer(onehot_transformer)
+    assert not encoder.cat_ordinal
+    _assert_identical(onehot_transformer, encoder, _records(test_rows) + encoder.probe_records())
+
+def test_ordinal_transformer_parity(onehot_transformer, test_rows):
+    # same columns as the shipped transformer, refitted the way training does for native categoricals
+    numeric, categorical = [], []
+    for name, _, cols in onehot_transformer.transformers_:
+        if name == "num":
+            numeric = list(cols)
+        elif name == "cat":
+            categorical = list(cols)
+    frame = test_rows[numeric + categorical]
+    transformer = build_preprocessor(numeric, categorical, "native").fit(frame.iloc[:800])
+    encoder = compile_transformer(transformer)
+    assert encoder.cat_ordinal
+    # the last 200 rows carry categories the encoder never saw
+    _assert_identical(transformer, encoder, _records(test_rows) + encoder.probe_records())